@@ -0,0 +1,58 @@
+"""
+bench_startup.py — Temps de démarrage de main.py, check_setup.py et des agents.
+Chaque commande est lancée N fois dans un nouvel interpréteur ; la médiane
+est comparée au budget (en ms). Code de sortie 1 si un budget est dépassé.
+
+Usage : python benchmarks/bench_startup.py [--runs 10]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# (nom, arguments de l'interpréteur, budget en ms)
+SCENARIOS = [
+    ("python (référence)", ["-c", "pass"], None),
+    ("main.py --help", ["main.py", "--help"], 150),
+    ("check_setup.py", ["check_setup.py"], 150),
+    ("import des agents", ["-c", "import src.orchestration.pipeline"], 250),
+]
+
+
+def measure(args: list[str], runs: int) -> float:
+    """Médiane (ms) du temps de démarrage de `python <args>`."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=_PROJECT_ROOT,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du temps de démarrage")
+    parser.add_argument("--runs", type=int, default=10, help="Lancements par scénario")
+    args = parser.parse_args()
+
+    over_budget = False
+    print(f"{'Scénario':<24} {'Médiane':>10} {'Budget':>10}")
+    for name, cmd, budget in SCENARIOS:
+        median = measure(cmd, args.runs)
+        status = ""
+        if budget is not None:
+            status = "✅" if median <= budget else "❌"
+            over_budget |= median > budget
+        budget_str = f"{budget} ms" if budget is not None else "-"
+        print(f"{name:<24} {median:>7.1f} ms {budget_str:>10} {status}")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
 import argparse
+import json
 import os
 import sys
-from src.agents.auditor_agent import AuditorAgent
-from src.agents.fixer_agent import FixerAgent
-from src.agents.judge_agent import JudgeAgent
+from src.utils.gemini_client import check_config
 
 
 def main():
@@ -16,11 +15,103 @@ def main():
     parser = argparse.ArgumentParser(description="Refactoring Swarm - Correction automatique de code Python")
     parser.add_argument(
         "--target_dir",
-        required=True,
-        help="Dossier contenant les fichiers Python à corriger"
+        help="Dossier contenant les fichiers Python à corriger (requis sauf avec --serve)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Nombre de processus workers (mode coordinateur si > 1)"
+    )
+    parser.add_argument(
+        "--api-keys",
+        default=os.getenv("GOOGLE_API_KEYS", ""),
+        help="Clés API séparées par des virgules, réparties entre les workers"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reprendre le run précédent là où il s'est arrêté (logs/checkpoint.jsonl)"
+    )
+    parser.add_argument(
+        "--batch-audit",
+        action="store_true",
+        help="Auditer les petits fichiers par lots (une requête LLM pour plusieurs fichiers)"
+    )
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        default=1,
+        help="Nombre de corrections candidates générées en parallèle par itération (best-of-N)"
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Nombre de composantes indépendantes du graphe d'imports traitées en parallèle "
+             "(0 = automatique selon les pools d'étapes)"
+    )
+    parser.add_argument(
+        "--changed-since",
+        metavar="REF",
+        help="Ne traiter que les fichiers modifiés depuis la référence git REF ; "
+             "les autres reprennent leur résultat précédent"
+    )
+    parser.add_argument(
+        "--changed-functions",
+        action="store_true",
+        help="Avec --changed-since : signaler à l'Auditor les fonctions modifiées"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Surveiller --target_dir et retraiter les fichiers modifiés (Ctrl+C pour arrêter)"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Mode serveur : agents et caches gardés chauds, jobs reçus sur http://127.0.0.1:<port>"
+    )
+    parser.add_argument(
+        "--submit",
+        action="store_true",
+        help="Soumettre --target_dir au serveur lancé par --serve et suivre sa progression"
+    )
+    parser.add_argument(
+        "--file",
+        action="append",
+        dest="only_files",
+        help="Avec --submit : ne traiter que ce fichier de --target_dir (option répétable)"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=int(os.getenv("SWARM_SERVE_PORT", "8765")),
+        help="Port du mode serveur (--serve / --submit)"
+    )
+    # Arguments internes du mode worker (passés par le coordinateur)
+    parser.add_argument("--files-from", help=argparse.SUPPRESS)
+    parser.add_argument("--results-file", help=argparse.SUPPRESS)
     args = parser.parse_args()
 
+    # ══════════════════════════════════════════════════════════════════════
+    #  MODE SERVEUR
+    # ══════════════════════════════════════════════════════════════════════
+
+    if args.serve:
+        config_error = check_config()
+        if config_error:
+            print(f"❌ ERREUR : {config_error}")
+            sys.exit(1)
+        from src.orchestration.server import serve
+        serve(args.port)
+        sys.exit(0)
+
+    if not args.target_dir:
+        parser.error("l'argument --target_dir est requis")
+    if args.changed_functions and not args.changed_since:
+        parser.error("--changed-functions nécessite --changed-since")
+
     # ══════════════════════════════════════════════════════════════════════
     #  VALIDATION DU DOSSIER CIBLE
     # ══════════════════════════════════════════════════════════════════════
@@ -31,6 +122,13 @@ def main():
         print(f"❌ ERREUR : Le dossier {target_dir} n'existe pas.")
         sys.exit(1)
 
+    # Client léger : le serveur fait le travail, aucun agent chargé ici
+    if args.submit:
+        from src.orchestration.server import submit
+        sys.exit(submit(target_dir, files=args.only_files, port=args.port,
+                        batch_audit=args.batch_audit, candidates=args.candidates,
+                        parallel=args.parallel))
+
     # Lister les fichiers Python (exclure les tests)
     try:
         all_files = [
@@ -41,13 +139,60 @@ def main():
         print(f"❌ ERREUR : Permission refusée pour accéder à {target_dir}")
         sys.exit(1)
 
+    # Mode worker : uniquement les fichiers assignés par le coordinateur
+    if args.files_from:
+        with open(args.files_from, "r", encoding="utf-8") as f:
+            all_files = json.load(f)
+
+    # Run limité au diff git (et aux fichiers qui importent un fichier modifié) :
+    # les autres reprennent leur résultat précédent. Un worker reçoit une liste
+    # déjà limitée par le coordinateur.
+    carried = []
+    if args.changed_since and not args.files_from:
+        from src.orchestration.git_scope import changed_files, carry_forward, with_dependents, GitScopeError
+        try:
+            changed = changed_files(target_dir, args.changed_since)
+        except GitScopeError as e:
+            print(f"❌ ERREUR : --changed-since {args.changed_since} : {e}")
+            sys.exit(1)
+        scope = with_dependents(target_dir, all_files, changed)
+        unchanged = [f for f in all_files if f not in scope]
+        all_files = [f for f in all_files if f in scope]
+        carried = carry_forward(target_dir, unchanged)
+        impacted = len(scope - changed)
+        print(f"🔀 Depuis {args.changed_since} : {len(all_files) - impacted} fichier(s) modifié(s)"
+              f"{f' + {impacted} qui les importent' if impacted else ''}, "
+              f"{len(carried)}/{len(unchanged)} résultat(s) repris pour les autres")
+        if not all_files:
+            print(f"✅ Aucun fichier Python modifié depuis {args.changed_since}")
+            sys.exit(0)
+
     if not all_files:
         print(f"⚠️  Aucun fichier Python à traiter dans {target_dir}")
         print("✅ Traitement terminé (0 fichier)")
         sys.exit(0)
 
+    # Configuration de l'API vérifiée ici (et non à l'import du client)
+    config_error = check_config()
+    if config_error:
+        print(f"❌ ERREUR : {config_error}")
+        sys.exit(1)
+
+    # Imports des agents après le parsing : `--help` et les erreurs
+    # d'arguments ne paient pas leur coût
+    from src.orchestration.pipeline import run_files, print_final_report, compute_exit_code
+    from src.orchestration.checkpoint import Checkpoint
+    from src.orchestration.sharding import ShardCoordinator, write_results_file
+    from src.orchestration.git_scope import changed_functions, save_results, source_digests
+    from src.utils.tools import SANDBOX_OUTPUT_DIR
+
+    focus = None
+    if args.changed_functions:
+        focus = {f: changed_functions(target_dir, f, args.changed_since) for f in all_files}
+    digests = source_digests(target_dir, all_files)
+
     # ══════════════════════════════════════════════════════════════════════
-    #  INITIALISATION DES AGENTS
+    #  INITIALISATION
     # ══════════════════════════════════════════════════════════════════════
     
     print(f"\n{'='*70}")
@@ -55,85 +200,56 @@ def main():
     print(f"{'='*70}")
     print(f"📂 Dossier cible : {target_dir}")
     print(f"📄 {len(all_files)} fichier(s) à traiter")
+    if args.workers > 1 and not args.files_from and not args.watch:
+        print(f"⚙️  Mode coordinateur : {args.workers} workers")
     print(f"{'='*70}\n")
 
-    auditor = AuditorAgent()
-    fixer = FixerAgent()
-    judge = JudgeAgent()
-
     # ══════════════════════════════════════════════════════════════════════
-    #  TRAITEMENT DE CHAQUE FICHIER
+    #  TRAITEMENT DES FICHIERS
     # ══════════════════════════════════════════════════════════════════════
     
-    files_passed = 0
-    files_failed = 0
-
-    for idx, filename in enumerate(all_files, 1):
-        file_path = os.path.join(target_dir, filename)
-        
-        print(f"\n{'='*70}")
-        print(f"📄 [{idx}/{len(all_files)}] {filename}")
-        print(f"{'='*70}")
+    if args.watch:
+        from src.orchestration.watcher import watch
+        results = watch(target_dir, all_files, batch_audit=args.batch_audit,
+                        num_candidates=args.candidates, parallel_components=args.parallel)
+        output_dir = SANDBOX_OUTPUT_DIR
+    elif args.workers > 1 and not args.files_from:
+        api_keys = [k.strip() for k in args.api_keys.split(",") if k.strip()]
+        worker_args = ["--batch-audit"] if args.batch_audit else []
+        worker_args += ["--candidates", str(args.candidates), "--parallel", str(args.parallel)]
+        if args.changed_functions:
+            worker_args += ["--changed-since", args.changed_since, "--changed-functions"]
+        coordinator = ShardCoordinator(target_dir, args.workers, api_keys, resume=args.resume,
+                                       worker_args=worker_args)
+        results = coordinator.run(all_files)
+        output_dir = os.path.join(SANDBOX_OUTPUT_DIR, "shard_*")
+    else:
+        results_by_file = {}
 
-        # Indiquer au Judge quel fichier on traite (pour tests ciblés)
-        judge.set_current_file(filename)
+        def on_result(result):
+            # Mode worker : résultats persistés après chaque fichier (ou revalidation)
+            results_by_file[result["file"]] = result
+            if args.results_file:
+                write_results_file(args.results_file, list(results_by_file.values()))
 
-        try:
-            # ─── ÉTAPE 1 : AUDIT ──────────────────────────────────────────
-            analysis_feedback = auditor.analyze_file(file_path)
-            
-            # ─── ÉTAPE 2 : CORRECTION ─────────────────────────────────────
-            fixed_path = fixer.fix_code(file_path, analysis_feedback)
-
-            # ─── ÉTAPE 3 : BOUCLE DE VALIDATION (max 3 itérations) ───────
-            for iteration in range(3):
-                print(f"\n🔁 Itération {iteration+1}/3 pour {filename}")
-                
-                # Tester le fichier corrigé
-                success, feedback = judge.run_tests(os.path.dirname(fixed_path))
-
-                if success:
-                    print(f"✅ {filename} validé !")
-                    files_passed += 1
-                    break
-                else:
-                    if iteration == 2:  # Dernière itération
-                        print(f"⚠️  {filename} : max itérations atteint")
-                        files_failed += 1
-                        break
-                    
-                    print(f"🔧 Nouvelle tentative de correction...")
-                    fixed_path = fixer.fix_code(fixed_path, feedback)
-            
-            print(f"\n✓ Fichier sauvegardé : {fixed_path}")
-
-        except Exception as e:
-            print(f"\n❌ ERREUR lors du traitement de {filename} : {e}")
-            files_failed += 1
-            continue
+        checkpoint = Checkpoint(target_dir, resume=args.resume)
+        results = run_files(target_dir, all_files, on_result=on_result, checkpoint=checkpoint,
+                            batch_audit=args.batch_audit, num_candidates=args.candidates,
+                            parallel_components=args.parallel, focus=focus)
+        output_dir = SANDBOX_OUTPUT_DIR
 
     # ══════════════════════════════════════════════════════════════════════
     #  RAPPORT FINAL
     # ══════════════════════════════════════════════════════════════════════
     
-    print(f"\n{'='*70}")
-    print(f"🏁 TRAITEMENT TERMINÉ")
-    print(f"{'='*70}")
-    print(f"✅ Fichiers validés     : {files_passed}/{len(all_files)}")
-    print(f"⚠️  Fichiers avec erreurs : {files_failed}/{len(all_files)}")
-    print(f"📊 Logs disponibles     : logs/experiment_data.json")
-    print(f"📁 Code corrigé         : sandbox/")
-    print(f"{'='*70}\n")
+    # Mode --watch exclu : ses fichiers ont changé depuis le relevé des empreintes
+    if not args.files_from and not args.watch:
+        save_results(target_dir, results, digests)
+    results = results + carried
 
-    # Codes de sortie pour le Bot de Correction
-    if files_failed == 0:
-        sys.exit(0)  # Succès total
-    elif files_passed > 0:
-        sys.exit(0)  # Succès partiel (acceptable)
-    else:
-        sys.exit(1)  # Échec total
+    print_final_report(results, output_dir)
+    sys.exit(compute_exit_code(results))
 
 
 if __name__ == "__main__":
     main()
-
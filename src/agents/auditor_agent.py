@@ -7,12 +7,19 @@ ACTION: ANALYSIS uniquement
 import json
 import os
 import sys
+import uuid
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from src.utils.tools import read_file, run_pylint
+from src.utils.tools import read_file, run_pylint, count_pylint_messages
+from src.utils.output_capture import excerpt
 from src.utils.logger import log_experiment, ActionType
-from src.utils.gemini_client import call_gemini, MODEL_NAME
+from src.utils.gemini_client import call_gemini, call_gemini_stream
+from src.utils.stream_checks import JSONIssuesCheck
+from src.utils.model_router import route
+from src.utils.stages import stage
+from src.utils.prompt_builder import PromptBuilder, dedupe_pylint_messages, estimate_tokens
+from src.utils.json_parser import parse_json_response, validate, JSONParseError
 
 
 AUDITOR_SYSTEM_PROMPT = """\
@@ -57,15 +64,34 @@ IMPORTANT :
 """
 
 
+AUDIT_SCHEMA = {
+    "issues": {"type": list, "required": True, "items": dict},
+    "pylint_score_before": {"type": (int, float)},
+    "summary": {"type": str},
+    "semantic_analysis": {"type": str, "default": ""}
+}
+
+BATCH_SCHEMA = {
+    "files": {"type": dict, "required": True}
+}
+
+# ─── Mode batch : plusieurs petits fichiers dans une seule requête ──────────
+SMALL_FILE_TOKENS = 400       # au-delà, le fichier est analysé seul
+BATCH_TOKEN_BUDGET = 4000     # taille max (code + pylint) d'une requête batch
+BATCH_MAX_FILES = 12
+
+
 class AuditorAgent:
     """Agent d'analyse statique et sémantique du code"""
 
     def __init__(self):
         self.agent_name = "Auditor_Agent"
 
-    def analyze_file(self, file_path: str) -> dict:
+    def analyze_file(self, file_path: str, focus: list[str] = None) -> dict:
         """
         Analyse complète d'un fichier Python.
+        `focus` : parties modifiées (fonctions ou lignes, mode --changed-since)
+        à examiner en priorité.
         
         Returns:
             dict: {
@@ -107,7 +133,17 @@ class AuditorAgent:
         # ══════════════════════════════════════════════════════════════════
         
         filename = os.path.basename(file_path)
+
+        prompt_builder = PromptBuilder("AUDITOR")
+        pylint_context = prompt_builder.section(
+            "pylint", pylint_messages, max_tokens=300, compact=dedupe_pylint_messages
+        )
         
+        focus_context = ""
+        if focus:
+            focus_context = ("\nParties modifiées récemment (à examiner en priorité, sans ignorer "
+                             f"le reste) : {', '.join(focus)}\n")
+
         user_prompt = f"""\
 Analyse ce code Python en profondeur :
 
@@ -119,8 +155,8 @@ Fichier : {filename}
 Score pylint actuel : {score_before}/10
 
 Messages pylint (pour contexte) :
-{pylint_messages[:1000]}
-
+{pylint_context}
+{focus_context}
 Analyse SÉMANTIQUE requise :
 1. Regarde les NOMS de fonctions/variables
 2. Déduis l'INTENTION du code
@@ -129,9 +165,18 @@ Analyse SÉMANTIQUE requise :
 
 Retourne ton analyse complète en JSON.
 """
+        prompt_stats = prompt_builder.finish(user_prompt)
 
+        model = route("audit", pylint_score=score_before)
+        # Problèmes extraits au fil du streaming, réponse hors format abandonnée
+        stream_check = JSONIssuesCheck()
+        stream_stats = {}
         try:
-            raw_response = call_gemini(AUDITOR_SYSTEM_PROMPT, user_prompt)
+            with stage("audit"):
+                raw_response, stream_stats = call_gemini_stream(AUDITOR_SYSTEM_PROMPT, user_prompt,
+                                                                check=stream_check, json_mode=True,
+                                                                model_name=model)
+            stream_stats["stream_first_issue_s"] = stream_check.first_issue_s
             print(f"[AUDITOR] Réponse LLM reçue ({len(raw_response)} chars)")
         except Exception as e:
             print(f"[AUDITOR] ⚠️  Erreur API : {e}")
@@ -139,44 +184,24 @@ Retourne ton analyse complète en JSON.
             raw_response = self._create_fallback_analysis(filename, score_before, pylint_messages)
 
         # ══════════════════════════════════════════════════════════════════
-        #  ÉTAPE 4 : LOGGING DE L'INTERACTION
-        # ══════════════════════════════════════════════════════════════════
-        
-        log_experiment(
-            agent_name=self.agent_name,
-            model_used=MODEL_NAME,
-            action=ActionType.ANALYSIS,
-            details={
-                "file_analyzed": file_path,
-                "input_prompt": user_prompt,
-                "output_response": raw_response,
-                "pylint_score_before": score_before,
-                "pylint_messages_summary": pylint_messages[:500]
-            },
-            status="SUCCESS"
-        )
-
-        # ══════════════════════════════════════════════════════════════════
-        #  ÉTAPE 5 : PARSING DE LA RÉPONSE JSON
+        #  ÉTAPE 4 : PARSING ET VALIDATION DE LA RÉPONSE JSON
         # ══════════════════════════════════════════════════════════════════
         
+        json_repaired = False
         try:
-            # Nettoyer les balises markdown
-            cleaned = raw_response.strip()
-            if cleaned.startswith("```json"):
-                cleaned = cleaned[7:]
-            if cleaned.startswith("```"):
-                cleaned = cleaned[3:]
-            if cleaned.endswith("```"):
-                cleaned = cleaned[:-3]
-            cleaned = cleaned.strip()
-
-            analysis = json.loads(cleaned)
+            analysis, json_repaired = parse_json_response(raw_response, AUDIT_SCHEMA)
+            if json_repaired:
+                print("[AUDITOR] 🩹 JSON réparé localement")
             
-        except json.JSONDecodeError as e:
+        except JSONParseError as e:
             print(f"[AUDITOR] ⚠️  Erreur parsing JSON : {e}")
-            # Fallback : plan minimal
+            # Fallback : problèmes déjà extraits pendant le streaming, sinon plan minimal
             analysis = {
+                "issues": stream_check.issues,
+                "pylint_score_before": score_before,
+                "summary": "Analyse partielle (problèmes reçus en streaming)",
+                "semantic_analysis": "Non disponible"
+            } if stream_check.issues else {
                 "issues": [
                     {
                         "id": 1,
@@ -194,20 +219,199 @@ Retourne ton analyse complète en JSON.
                 "semantic_analysis": "Non disponible"
             }
 
+        # ══════════════════════════════════════════════════════════════════
+        #  ÉTAPE 5 : LOGGING DE L'INTERACTION
+        # ══════════════════════════════════════════════════════════════════
+        
+        log_experiment(
+            agent_name=self.agent_name,
+            model_used=model,
+            action=ActionType.ANALYSIS,
+            details={
+                "file_analyzed": file_path,
+                "input_prompt": user_prompt,
+                "output_response": raw_response,
+                "pylint_score_before": score_before,
+                "pylint_messages_summary": excerpt(pylint_messages, 500),
+                "pylint_messages_count": count_pylint_messages(pylint_messages),
+                "code_length": len(code),
+                "prompt_tokens": prompt_stats["prompt_tokens"],
+                "prompt_tokens_saved": prompt_stats["prompt_tokens_saved"],
+                "json_repaired": json_repaired,
+                **stream_stats
+            },
+            status="SUCCESS"
+        )
+
         # ══════════════════════════════════════════════════════════════════
         #  ÉTAPE 6 : VALIDATION ET ENRICHISSEMENT
         # ══════════════════════════════════════════════════════════════════
         
-        # S'assurer que les champs obligatoires existent
-        if "pylint_score_before" not in analysis:
+        analysis = self._finalize(analysis, score_before)
+        print(f"[AUDITOR] ✅ {len(analysis['issues'])} problème(s) identifié(s)")
+        
+        return analysis
+
+    # ══════════════════════════════════════════════════════════════════════
+    #  MODE BATCH : PETITS FICHIERS REGROUPÉS
+    # ══════════════════════════════════════════════════════════════════════
+
+    def analyze_files_batch(self, file_paths: list[str]) -> dict:
+        """
+        Analyse les petits fichiers par lots (une requête LLM par lot, dans la
+        limite de BATCH_TOKEN_BUDGET). La réponse est découpée par fichier ;
+        un fichier absent ou invalide dans la réponse est ré-analysé seul.
+        Les fichiers trop gros sont ignorés (à analyser avec analyze_file).
+
+        Returns:
+            dict: {file_path: analyse}
+        """
+        # ─── Préparation : code + pylint de chaque petit fichier ─────────
+        entries = []
+        for file_path in file_paths:
+            try:
+                code = read_file(file_path)
+            except FileNotFoundError:
+                continue
+            if estimate_tokens(code) > SMALL_FILE_TOKENS:
+                continue
+            pylint_result = run_pylint(file_path)
+            pylint_context = excerpt(dedupe_pylint_messages(pylint_result["messages"]), 600)
+            entries.append({
+                "path": file_path,
+                "filename": os.path.basename(file_path),
+                "code": code,
+                "score": pylint_result["score"],
+                "pylint": pylint_context,
+                "tokens": estimate_tokens(code) + estimate_tokens(pylint_context)
+            })
+
+        # ─── Regroupement glouton jusqu'au budget ─────────────────────────
+        batches, current, current_tokens = [], [], 0
+        for entry in entries:
+            if current and (current_tokens + entry["tokens"] > BATCH_TOKEN_BUDGET
+                            or len(current) >= BATCH_MAX_FILES):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(entry)
+            current_tokens += entry["tokens"]
+        if current:
+            batches.append(current)
+
+        results = {}
+        for batch in batches:
+            if len(batch) == 1:
+                results[batch[0]["path"]] = self.analyze_file(batch[0]["path"])
+            else:
+                results.update(self._analyze_batch(batch))
+        return results
+
+    def _analyze_batch(self, batch: list[dict]) -> dict:
+        """Une requête pour tout le lot, puis démultiplexage par fichier."""
+        batch_id = uuid.uuid4().hex[:8]
+        names = ", ".join(e["filename"] for e in batch)
+        print(f"\n[AUDITOR] 📦 Lot {batch_id} : {len(batch)} fichiers ({names})")
+
+        sections = "\n".join(f"""\
+=== FICHIER : {e["filename"]} (score pylint : {e["score"]}/10) ===
+```python
+{e["code"]}
+```
+Messages pylint :
+{e["pylint"]}
+""" for e in batch)
+
+        user_prompt = f"""\
+Analyse ces {len(batch)} fichiers Python INDÉPENDANTS, chacun séparément :
+
+{sections}
+Pour CHAQUE fichier, applique l'analyse SÉMANTIQUE requise (noms, intention,
+comportement réel, bugs logiques).
+
+Retourne UN SEUL objet JSON de la forme :
+{{"files": {{"<nom_fichier.py>": <analyse au FORMAT DE RÉPONSE OBLIGATOIRE>, ...}}}}
+"""
+
+        model = route("audit", pylint_score=min(e["score"] for e in batch))
+        per_file = {}
+        json_repaired = False
+        raw_response, error = "", None
+        try:
+            with stage("audit"):
+                raw_response = call_gemini(AUDITOR_SYSTEM_PROMPT, user_prompt, json_mode=True,
+                                           model_name=model)
+            print(f"[AUDITOR] Réponse LLM reçue ({len(raw_response)} chars)")
+            data, json_repaired = parse_json_response(raw_response, BATCH_SCHEMA)
+            per_file = data["files"]
+        except Exception as e:
+            error = e
+            print(f"[AUDITOR] ⚠️  Lot {batch_id} inexploitable ({e}), analyse fichier par fichier")
+
+        # Log de la requête du lot elle-même : réponse brute, ou erreur avant le repli
+        log_experiment(
+            agent_name=self.agent_name,
+            model_used=model,
+            action=ActionType.ANALYSIS,
+            details={
+                "files_analyzed": [e["path"] for e in batch],
+                "input_prompt": user_prompt,
+                "output_response": raw_response,
+                "batch_id": batch_id,
+                "batch_size": len(batch),
+                "json_repaired": json_repaired,
+                **({"error": f"{type(error).__name__}: {error}"} if error else {})
+            },
+            status="FAILURE" if error else "SUCCESS"
+        )
+
+        results = {}
+        for entry in batch:
+            file_entry = per_file.get(entry["filename"])
+            try:
+                if not isinstance(file_entry, dict):
+                    raise JSONParseError(f"entrée de type {type(file_entry).__name__}")
+                analysis = validate(file_entry, AUDIT_SCHEMA)
+            except (JSONParseError, ValueError, TypeError) as e:
+                # Repli par fichier : ce fichier n'est pas (ou mal) dans la réponse
+                print(f"[AUDITOR] ⚠️  {entry['filename']} absent ou invalide dans le lot ({e})")
+                results[entry["path"]] = self.analyze_file(entry["path"])
+                continue
+
+            # Log par fichier : sa part de la réponse (prompt commun dédoublonné par le blob store)
+            log_experiment(
+                agent_name=self.agent_name,
+                model_used=model,
+                action=ActionType.ANALYSIS,
+                details={
+                    "file_analyzed": entry["path"],
+                    "input_prompt": user_prompt,
+                    "output_response": json.dumps(analysis, ensure_ascii=False),
+                    "pylint_score_before": entry["score"],
+                    "pylint_messages_summary": excerpt(entry["pylint"], 500),
+                    "batch_id": batch_id,
+                    "batch_size": len(batch),
+                    "json_repaired": json_repaired
+                },
+                status="SUCCESS"
+            )
+            results[entry["path"]] = self._finalize(analysis, entry["score"])
+            print(f"[AUDITOR] ✅ {entry['filename']} : {len(analysis['issues'])} problème(s) identifié(s)")
+
+        return results
+
+    # ══════════════════════════════════════════════════════════════════════
+    #  UTILITAIRES
+    # ══════════════════════════════════════════════════════════════════════
+
+    @staticmethod
+    def _finalize(analysis: dict, score_before: float) -> dict:
+        """S'assurer que les champs obligatoires existent"""
+        if analysis.get("pylint_score_before") is None:
             analysis["pylint_score_before"] = score_before
         if "issues" not in analysis:
             analysis["issues"] = []
-        if "summary" not in analysis:
+        if not analysis.get("summary"):
             analysis["summary"] = f"{len(analysis['issues'])} problème(s) détecté(s)"
-
-        print(f"[AUDITOR] ✅ {len(analysis['issues'])} problème(s) identifié(s)")
-        
         return analysis
 
     # ══════════════════════════════════════════════════════════════════════
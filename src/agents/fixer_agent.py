@@ -9,12 +9,22 @@ WORKFLOW RETRY :
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from src.utils.tools import read_file, write_file
+from src.utils.tools import (read_file, write_file, copy_to_sandbox, SANDBOX_ROOT, SANDBOX_OUTPUT_DIR,
+                             RESOURCE_ERROR_HINTS)
+from src.utils.output_capture import excerpt
 from src.utils.logger import log_experiment, ActionType
-from src.utils.gemini_client import call_gemini, MODEL_NAME
+from src.utils.gemini_client import call_gemini, call_gemini_stream
+from src.utils.stream_checks import python_code_check
+from src.utils.model_router import route
+from src.utils.stages import stage
+from src.utils.json_parser import parse_json_response
+from src.utils.prompt_builder import (
+    PromptBuilder, compress_traceback, strip_comments_and_docstrings
+)
 
 
 FIXER_SYSTEM_PROMPT = """\
@@ -66,14 +76,33 @@ RÈGLES :
 """
 
 
+DEBUG_SCHEMA = {
+    "error_type": {"type": str, "default": "Unknown"},
+    "root_cause": {"type": str, "required": True},
+    "affected_lines": {"type": list, "default": []},
+    "fix_strategy": {"type": str, "required": True}
+}
+
+
+# Mode best-of-N : une température par candidat (diversité des corrections)
+CANDIDATE_TEMPERATURES = [0.2, 0.7, 1.0, 0.4, 0.9]
+
+
 class FixerAgent:
     """Agent de correction de code avec phase DEBUG séparée"""
 
     def __init__(self):
         self.agent_name = "Fixer_Agent"
 
-    def fix_code(self, file_path: str, feedback: dict) -> str:
-        """Corrige un fichier selon le feedback."""
+    def fix_code(self, file_path: str, feedback: dict, output_path: str = None,
+                 iteration: int = 0) -> str:
+        """
+        Corrige un fichier selon le feedback.
+        `output_path` : destination explicite (dossier d'itération du workspace),
+        sinon sandbox/<nom du fichier>.
+        `iteration` : numéro de la tentative (0 = première correction), utilisé
+        pour escalader vers un modèle plus fort.
+        """
         
         print(f"\n[FIXER] Correction de : {file_path}")
 
@@ -100,10 +129,11 @@ class FixerAgent:
             print("[FIXER] Mode : RETRY (analyse DEBUG puis correction)")
             
             # ─── ÉTAPE 1 : ANALYSER L'ERREUR (ACTION: DEBUG) ─────────────
-            diagnostic = self._analyze_error(file_path, code, error_logs)
+            diagnostic = self._analyze_error(file_path, code, error_logs, iteration,
+                                             resource_error=feedback.get("resource_error"))
             
             # ─── ÉTAPE 2 : CORRIGER BASÉ SUR LE DIAGNOSTIC (ACTION: FIX) ─
-            corrected_code = self._fix_with_diagnostic(file_path, code, diagnostic, error_logs)
+            corrected_code = self._fix_with_diagnostic(file_path, code, diagnostic, error_logs, iteration)
             
         else:
             # ══════════════════════════════════════════════════════════════
@@ -111,48 +141,111 @@ class FixerAgent:
             # ══════════════════════════════════════════════════════════════
             
             print(f"[FIXER] Mode : FIRST FIX ({len(issues)} problème(s))")
-            corrected_code = self._fix_with_issues(file_path, code, issues, feedback)
+            corrected_code = self._fix_with_issues(file_path, code, issues, feedback, iteration)
 
         # ══════════════════════════════════════════════════════════════════
         #  ÉCRITURE DU FICHIER CORRIGÉ
         # ══════════════════════════════════════════════════════════════════
         
-        output_path = self._write_corrected_file(filename, file_path, corrected_code)
+        output_path = self._write_corrected_file(filename, file_path, corrected_code, output_path)
         return output_path
 
+    # ══════════════════════════════════════════════════════════════════════
+    #  MODE BEST-OF-N : PLUSIEURS CANDIDATS EN PARALLÈLE
+    # ══════════════════════════════════════════════════════════════════════
+
+    def fix_candidates(self, file_path: str, feedback: dict, output_paths: list[str],
+                       iteration: int = 0) -> list[str]:
+        """
+        Génère len(output_paths) corrections en parallèle (températures
+        différentes) et écrit la i-ème dans output_paths[i].
+        En mode RETRY, la phase DEBUG n'est faite qu'une fois pour tous.
+        Retourne les chemins écrits.
+        """
+        print(f"\n[FIXER] Correction de : {file_path} ({len(output_paths)} candidats)")
+
+        try:
+            code = read_file(file_path)
+        except FileNotFoundError:
+            print(f"[FIXER] ⚠️  Fichier introuvable : {file_path}")
+            return []
+
+        filename = os.path.basename(file_path)
+        issues = feedback.get("issues", [])
+        error_logs = feedback.get("error_logs")
+        diagnostic = None
+        if error_logs is not None:
+            diagnostic = self._analyze_error(file_path, code, error_logs, iteration,
+                                             resource_error=feedback.get("resource_error"))
+
+        def generate(i):
+            temperature = CANDIDATE_TEMPERATURES[i % len(CANDIDATE_TEMPERATURES)]
+            if diagnostic is not None:
+                corrected = self._fix_with_diagnostic(file_path, code, diagnostic, error_logs, iteration,
+                                                      temperature=temperature, candidate=i)
+            else:
+                corrected = self._fix_with_issues(file_path, code, issues, feedback, iteration,
+                                                  temperature=temperature, candidate=i)
+            return self._write_corrected_file(filename, file_path, corrected, output_paths[i])
+
+        with ThreadPoolExecutor(max_workers=len(output_paths)) as executor:
+            return list(executor.map(generate, range(len(output_paths))))
+
     # ══════════════════════════════════════════════════════════════════════
     #  MÉTHODE : ANALYSER L'ERREUR (ACTION: DEBUG)
     # ══════════════════════════════════════════════════════════════════════
 
-    def _analyze_error(self, file_path: str, code: str, error_logs: str) -> dict:
-        """Phase DEBUG : analyser la stacktrace pour diagnostiquer"""
+    def _analyze_error(self, file_path: str, code: str, error_logs: str, iteration: int = 0,
+                       resource_error: str = None) -> dict:
+        """
+        Phase DEBUG : analyser la stacktrace pour diagnostiquer.
+        `resource_error` : exécution tuée par le sandbox (timeout, cpu_limit...).
+        """
         
         print("[FIXER] 🔍 Phase DEBUG : analyse de l'erreur...")
+
+        filename = os.path.basename(file_path)
+        prompt_builder = PromptBuilder("FIXER")
+        traceback_context = prompt_builder.section(
+            "error_logs", error_logs, max_tokens=800,
+            compact=lambda t: compress_traceback(t, [filename, f"test_{filename}"])
+        )
+        # Code fourni pour contexte uniquement : commentaires/docstrings inutiles
+        code_context = prompt_builder.section("code", code, compact=strip_comments_and_docstrings)
         
+        resource_context = ""
+        if resource_error:
+            resource_context = (f"⚠️ EXÉCUTION ARRÊTÉE PAR LE SANDBOX : "
+                                f"{RESOURCE_ERROR_HINTS.get(resource_error, resource_error)}\n\n")
+
         user_prompt = f"""\
-Analyse cette stacktrace pour diagnostiquer le problème :
+{resource_context}Analyse cette stacktrace pour diagnostiquer le problème :
 
 ```
-{error_logs}
+{traceback_context}
 ```
 
 Code actuel :
 ```python
-{code}
+{code_context}
 ```
 
 Donne ton diagnostic en JSON.
 """
+        prompt_stats = prompt_builder.finish(user_prompt)
 
         api_error = None
         raw_response = None
         diagnostic = {}
+        json_repaired = False
         status = "SUCCESS"
+        model = route("debug", iteration=iteration)
 
         try:
-            raw_response = call_gemini(DEBUG_ANALYSIS_PROMPT, user_prompt)
-            cleaned = raw_response.strip().replace("```json", "").replace("```", "").strip()
-            diagnostic = json.loads(cleaned)
+            with stage("fix"):
+                raw_response = call_gemini(DEBUG_ANALYSIS_PROMPT, user_prompt, json_mode=True,
+                                           model_name=model)
+            diagnostic, json_repaired = parse_json_response(raw_response, DEBUG_SCHEMA)
             print(f"[FIXER] Diagnostic : {diagnostic.get('root_cause', 'N/A')[:80]}")
         except Exception as e:
             print(f"[FIXER] ⚠️  Erreur API DEBUG : {e}")
@@ -170,14 +263,18 @@ Donne ton diagnostic en JSON.
         # ═══ LOGGING ACTION: DEBUG ═══
         log_experiment(
             agent_name=self.agent_name,
-            model_used=MODEL_NAME,
+            model_used=model,
             action=ActionType.DEBUG,  # ← ACTION DEBUG !
             details={
                 "file_debugged": file_path,
                 "input_prompt": user_prompt,
                 "output_response": raw_response if raw_response else json.dumps(diagnostic),
-                "error_logs_analyzed": error_logs[:500],
+                "error_logs_analyzed": excerpt(error_logs, 500),
+                "resource_error": resource_error,
                 "diagnostic": diagnostic,
+                "prompt_tokens": prompt_stats["prompt_tokens"],
+                "prompt_tokens_saved": prompt_stats["prompt_tokens_saved"],
+                "json_repaired": json_repaired,
                 "api_error": api_error
             },
             status=status
@@ -189,10 +286,18 @@ Donne ton diagnostic en JSON.
     #  MÉTHODE : CORRIGER AVEC DIAGNOSTIC (ACTION: FIX après DEBUG)
     # ══════════════════════════════════════════════════════════════════════
 
-    def _fix_with_diagnostic(self, file_path: str, code: str, diagnostic: dict, error_logs: str) -> str:
+    def _fix_with_diagnostic(self, file_path: str, code: str, diagnostic: dict, error_logs: str,
+                             iteration: int = 0, temperature: float = None, candidate: int = None) -> str:
         """Applique la correction basée sur le diagnostic"""
         
         print("[FIXER] 🔧 Phase FIX : correction basée sur diagnostic...")
+
+        filename = os.path.basename(file_path)
+        prompt_builder = PromptBuilder("FIXER")
+        traceback_context = prompt_builder.section(
+            "error_logs", error_logs, max_tokens=400,
+            compact=lambda t: compress_traceback(t, [filename, f"test_{filename}"])
+        )
         
         user_prompt = f"""\
 Corrige ce code basé sur le diagnostic de débogage :
@@ -202,7 +307,7 @@ DIAGNOSTIC :
 
 ERREURS ORIGINALES :
 ```
-{error_logs[:500]}
+{traceback_context}
 ```
 
 CODE ACTUEL :
@@ -212,14 +317,20 @@ CODE ACTUEL :
 
 Applique la stratégie de correction et retourne le code complet corrigé (sans balises markdown).
 """
+        prompt_stats = prompt_builder.finish(user_prompt)
 
         api_error = None
         raw_response = None
         corrected_code = code  # Fallback
+        stream_stats = {}
         status = "SUCCESS"
+        model = route("fix", iteration=iteration)
 
         try:
-            raw_response = call_gemini(FIXER_RETRY_PROMPT, user_prompt)
+            with stage("fix"):
+                raw_response, stream_stats = call_gemini_stream(FIXER_RETRY_PROMPT, user_prompt,
+                                                                check=python_code_check, model_name=model,
+                                                                temperature=temperature)
             corrected_code = self._clean_code_response(raw_response)
             print(f"[FIXER] Correction appliquée ({len(corrected_code)} chars)")
         except Exception as e:
@@ -231,7 +342,7 @@ Applique la stratégie de correction et retourne le code complet corrigé (sans
         # ═══ LOGGING ACTION: FIX (après DEBUG) ═══
         log_experiment(
             agent_name=self.agent_name,
-            model_used=MODEL_NAME,
+            model_used=model,
             action=ActionType.FIX,
             details={
                 "file_fixed": file_path,
@@ -239,8 +350,13 @@ Applique la stratégie de correction et retourne le code complet corrigé (sans
                 "output_response": raw_response if raw_response else "ERROR",
                 "diagnostic_used": diagnostic,
                 "is_retry": True,
+                "candidate": candidate,
+                "temperature": temperature,
+                **stream_stats,
                 "code_length_before": len(code),
                 "code_length_after": len(corrected_code),
+                "prompt_tokens": prompt_stats["prompt_tokens"],
+                "prompt_tokens_saved": prompt_stats["prompt_tokens_saved"],
                 "api_error": api_error
             },
             status=status
@@ -252,10 +368,16 @@ Applique la stratégie de correction et retourne le code complet corrigé (sans
     #  MÉTHODE : CORRIGER AVEC ISSUES (ACTION: FIX direct)
     # ══════════════════════════════════════════════════════════════════════
 
-    def _fix_with_issues(self, file_path: str, code: str, issues: list, feedback: dict) -> str:
+    def _fix_with_issues(self, file_path: str, code: str, issues: list, feedback: dict,
+                         iteration: int = 0, temperature: float = None, candidate: int = None) -> str:
         """Première correction basée sur les issues de l'Auditor"""
         
         semantic_analysis = feedback.get("semantic_analysis", "")
+
+        prompt_builder = PromptBuilder("FIXER")
+        issues_context = prompt_builder.section(
+            "issues", json.dumps(issues, indent=2, ensure_ascii=False), max_tokens=1500
+        )
         
         user_prompt = f"""\
 Corrige ce code Python :
@@ -265,20 +387,27 @@ Corrige ce code Python :
 ```
 
 Problèmes identifiés :
-{json.dumps(issues, indent=2, ensure_ascii=False)}
+{issues_context}
 
 Analyse sémantique : {semantic_analysis}
 
 Retourne le code complet corrigé (sans balises markdown).
 """
+        prompt_stats = prompt_builder.finish(user_prompt)
 
         api_error = None
         raw_response = None
         corrected_code = code
+        stream_stats = {}
         status = "SUCCESS"
+        model = route("fix", pylint_score=feedback.get("pylint_score_before"), issues=issues,
+                      iteration=iteration)
 
         try:
-            raw_response = call_gemini(FIXER_SYSTEM_PROMPT, user_prompt)
+            with stage("fix"):
+                raw_response, stream_stats = call_gemini_stream(FIXER_SYSTEM_PROMPT, user_prompt,
+                                                                check=python_code_check, model_name=model,
+                                                                temperature=temperature)
             corrected_code = self._clean_code_response(raw_response)
             print(f"[FIXER] Correction appliquée ({len(corrected_code)} chars)")
         except Exception as e:
@@ -290,7 +419,7 @@ Retourne le code complet corrigé (sans balises markdown).
         # ═══ LOGGING ACTION: FIX ═══
         log_experiment(
             agent_name=self.agent_name,
-            model_used=MODEL_NAME,
+            model_used=model,
             action=ActionType.FIX,
             details={
                 "file_fixed": file_path,
@@ -298,8 +427,13 @@ Retourne le code complet corrigé (sans balises markdown).
                 "output_response": raw_response if raw_response else "ERROR",
                 "issues_addressed": [i.get("id") for i in issues],
                 "is_retry": False,
+                "candidate": candidate,
+                "temperature": temperature,
+                **stream_stats,
                 "code_length_before": len(code),
                 "code_length_after": len(corrected_code),
+                "prompt_tokens": prompt_stats["prompt_tokens"],
+                "prompt_tokens_saved": prompt_stats["prompt_tokens_saved"],
                 "api_error": api_error
             },
             status=status
@@ -311,19 +445,29 @@ Retourne le code complet corrigé (sans balises markdown).
     #  UTILITAIRES
     # ══════════════════════════════════════════════════════════════════════
 
-    def _write_corrected_file(self, filename: str, original_path: str, code: str) -> str:
+    def _write_corrected_file(self, filename: str, original_path: str, code: str,
+                              output_path: str = None) -> str:
         """Écrit le fichier corrigé dans sandbox/"""
         
-        if original_path.startswith("sandbox"):
+        output_dir = os.path.abspath(SANDBOX_OUTPUT_DIR)
+        if output_path:
+            output_path = os.path.abspath(output_path)
+        elif os.path.abspath(original_path).startswith(output_dir + os.sep):
             output_path = original_path
         else:
-            output_path = os.path.join("sandbox", filename)
+            output_path = os.path.join(output_dir, filename)
 
         try:
-            write_file(output_path, code)
-            print(f"[FIXER] ✅ Fichier écrit : {output_path}")
+            if output_path != original_path and read_file(original_path) == code:
+                # Code inchangé : lien vers l'entrée plutôt qu'une copie
+                copy_to_sandbox(original_path, os.path.relpath(output_path, SANDBOX_ROOT))
+                print(f"[FIXER] ✅ Fichier inchangé, lié : {output_path}")
+            elif write_file(output_path, code):
+                print(f"[FIXER] ✅ Fichier écrit : {output_path}")
+            else:
+                print(f"[FIXER] ✅ Fichier inchangé (écriture ignorée) : {output_path}")
         except PermissionError:
-            safe_output = os.path.join("sandbox", filename)
+            safe_output = os.path.join(output_dir, filename)
             write_file(safe_output, code)
             output_path = safe_output
 
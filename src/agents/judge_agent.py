@@ -8,12 +8,22 @@ judge_agent.py — The Judge (CORRIGÉ : utilise GENERATION pour les tests)
 import json
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from src.utils.tools import read_file, write_file, run_pylint, run_pytest
+from src.utils.tools import (read_file, write_file, run_pylint, run_pytest, SANDBOX_OUTPUT_DIR,
+                             RESOURCE_ERROR_HINTS)
+from src.utils.sandbox import sandbox_manager
 from src.utils.logger import log_experiment, ActionType
-from src.utils.gemini_client import call_gemini, MODEL_NAME
+from src.utils.gemini_client import call_gemini
+from src.utils.model_router import route
+from src.utils.stages import stage
+from src.utils.prompt_builder import PromptBuilder, compress_traceback
+from src.utils.json_parser import parse_json_response
+from src.utils.test_impact import changed_symbols, select_tests, MODULE_LEVEL
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -67,6 +77,15 @@ FORMAT :
 """
 
 
+VERDICT_SCHEMA = {
+    "verdict": {"type": str, "required": True, "choices": {"PASS", "FAIL"}},
+    "pylint_score_after": {"type": (int, float)},
+    "tests_passed": {"type": bool},
+    "details": {"type": str, "default": ""},
+    "next_action": {"type": str, "default": ""}
+}
+
+
 class JudgeAgent:
     """Agent qui génère des tests sémantiques, les exécute, et donne le verdict"""
 
@@ -75,14 +94,112 @@ class JudgeAgent:
         self.last_scores = {}
         self.current_file = None
         self.generated_tests_cache = {}
+        self.last_tested_code = {}  # code validé à l'itération précédente (sélection des tests)
+        self.tests_source = {}  # code source pour lequel les tests gardés ont été générés
+        self.output_dir = SANDBOX_OUTPUT_DIR  # modules voisins déjà corrigés (imports des tests)
+        self._tests_locks = {}  # fichier -> verrou (une seule génération de tests à la fois)
+        self._locks_guard = threading.Lock()
 
     def set_current_file(self, filepath):
         """Définit le fichier en cours de traitement"""
         self.current_file = os.path.basename(filepath)
 
-    def run_tests(self, sandbox_dir: str) -> tuple[bool, dict]:
+    def get_file_state(self, filepath: str) -> dict:
+        """État réutilisable d'un fichier (tests générés, dernier score)"""
+        filename = os.path.basename(filepath)
+        return {
+            "test_file": self.generated_tests_cache.get(filename),
+            "last_score": self.last_scores.get(filename)
+        }
+
+    def restore_file_state(self, filepath: str, state: dict):
+        """Restaure l'état sauvegardé par get_file_state (reprise d'un run)"""
+        filename = os.path.basename(filepath)
+        test_file = state.get("test_file")
+        if test_file and os.path.isfile(test_file):
+            self.generated_tests_cache[filename] = test_file
+        if state.get("last_score") is not None:
+            self.last_scores[filename] = state["last_score"]
+
+    def reset_file(self, filepath: str, source: str = None):
+        """
+        Nouveau traitement d'un fichier (agents gardés chauds entre deux runs) :
+        score et code précédents oubliés. Les tests générés ne sont gardés que
+        si aucun d'eux ne vise une fonction modifiée depuis : un corps de
+        fonction changé sans changer sa signature est le plus souvent voulu,
+        et d'anciens tests pousseraient le Fixer à annuler la modification.
+        """
+        filename = os.path.basename(filepath)
+        self.last_scores.pop(filename, None)
+        self.last_tested_code.pop(filename, None)
+        if not self._tests_still_valid(filename, source):
+            self.generated_tests_cache.pop(filename, None)
+            self.tests_source.pop(filename, None)
+
+    def _tests_still_valid(self, filename: str, source: str) -> bool:
+        previous = self.tests_source.get(filename)
+        test_file = self.generated_tests_cache.get(filename)
+        if source is None or previous is None or not (test_file and os.path.isfile(test_file)):
+            return False
+        changed = changed_symbols(previous, source)
+        if not changed:
+            return changed is not None
+        try:
+            impacted = select_tests(read_file(test_file), changed)
+        except (OSError, UnicodeDecodeError):
+            return False
+        if impacted is None or impacted:
+            names = sorted("code de niveau module" if s == MODULE_LEVEL else s for s in changed)
+            print(f"[JUDGE] ♻️  Tests de {filename} régénérés : {', '.join(names)} modifié(s)")
+            return False
+        return True
+
+    def remember_tests(self, fixed_path: str, source: str = None):
+        """
+        Garde les tests promus à côté du fichier corrigé pour un prochain
+        traitement, avec le code source (`source`) pour lequel ils ont été générés.
+        """
+        filename = os.path.basename(fixed_path)
+        test_path = os.path.join(os.path.dirname(fixed_path), f"test_{filename}")
+        if source is not None and os.path.isfile(test_path):
+            self.generated_tests_cache[filename] = test_path
+            self.tests_source[filename] = source
+
+    def prepare_tests(self, filepath: str) -> str:
         """
-        Pipeline complet :
+        Génère (une seule fois) les tests du fichier, avant une évaluation
+        parallèle ; les candidats ne font ensuite que les réutiliser.
+        """
+        return self._generate_or_get_tests(os.path.abspath(filepath))
+
+    def evaluate_candidate(self, filepath: str) -> dict:
+        """
+        Évaluation sans LLM d'un candidat (mode best-of-N) :
+        syntaxe → pylint → tests générés. Sans effet sur last_scores.
+        """
+        filepath = os.path.abspath(filepath)
+        evaluation = {"path": filepath, "syntax_ok": False, "score": 0.0,
+                      "tests_passed": False, "output": ""}
+        try:
+            compile(read_file(filepath), filepath, "exec")
+        except (SyntaxError, ValueError, FileNotFoundError) as e:
+            evaluation["output"] = f"Syntax gate : {e}"
+            return evaluation
+        evaluation["syntax_ok"] = True
+
+        evaluation["score"] = run_pylint(filepath)["score"]
+        # Tests préparés avant l'évaluation : un échec de génération n'est pas relancé par candidat
+        test_file = self._generate_or_get_tests(filepath, generate=False)
+        if test_file and os.path.isfile(test_file):
+            pytest_result = run_pytest(test_file, extra_paths=[self.output_dir])
+            evaluation["tests_passed"] = pytest_result["passed"]
+            evaluation["output"] = pytest_result["output"]
+        return evaluation
+
+    def run_tests(self, target: str) -> tuple[bool, dict]:
+        """
+        Pipeline complet sur `target` (fichier, ou dossier contenant le
+        fichier courant) :
         1. Génère les tests (ACTION: GENERATION)
         2. Exécute les tests
         3. Retourne le verdict (ACTION: ANALYSIS)
@@ -90,44 +207,56 @@ class JudgeAgent:
         if not self.current_file:
             return False, {"issues": [], "error_logs": "No file specified"}
 
-        sandbox_abs = os.path.abspath(sandbox_dir)
-        filepath = self._find_file(sandbox_abs, self.current_file)
+        filepath = os.path.abspath(target)
+        if os.path.isdir(filepath):
+            filepath = os.path.join(filepath, self.current_file)
         
-        if not filepath:
+        if not os.path.isfile(filepath):
             return False, {"issues": [], "error_logs": f"{self.current_file} not found"}
 
         # ═══════════════════════════════════════════════════════════════════
-        #  ÉTAPE 1 : GÉNÉRER LES TESTS (ACTION: GENERATION)
+        #  ÉTAPES 1-3 : TESTS (GÉNÉRATION + PYTEST) ∥ PYLINT
         # ═══════════════════════════════════════════════════════════════════
-        
-        test_file = self._generate_or_get_tests(filepath)
+        # Deux branches indépendantes : pylint s'exécute pendant la
+        # génération des tests (si non en cache) puis pendant pytest.
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            tests_future = executor.submit(self._timed, self._generate_and_run_tests, filepath)
+            pylint_future = executor.submit(self._timed, run_pylint, filepath)
+            pylint_result, pylint_time = pylint_future.result()
+            (test_file, pytest_result), tests_time = tests_future.result()
+        wall_time = time.perf_counter() - started
+        metrics = {
+            "validation_wall_s": round(wall_time, 3),
+            "validation_latency_saved_s": round(max(pylint_time + tests_time - wall_time, 0.0), 3)
+        }
 
-        # ═══════════════════════════════════════════════════════════════════
-        #  ÉTAPE 2 : EXÉCUTER PYLINT
-        # ═══════════════════════════════════════════════════════════════════
-        
-        pylint_result = run_pylint(filepath)
         score_after = pylint_result["score"]
-        score_before = self.last_scores.get(filepath, 0.0)
-        self.last_scores[filepath] = score_after
+        score_before = self.last_scores.get(self.current_file, 0.0)
+        self.last_scores[self.current_file] = score_after
         
         print(f"[JUDGE] Pylint : {score_after}/10 (avant : {score_before}/10)")
 
-        # ═══════════════════════════════════════════════════════════════════
-        #  ÉTAPE 3 : EXÉCUTER PYTEST
-        # ═══════════════════════════════════════════════════════════════════
-        
-        if test_file and os.path.isfile(test_file):
-            print(f"[JUDGE] Pytest : {os.path.basename(test_file)}...", end=" ")
-            pytest_result = run_pytest(test_file)
+        if pytest_result is not None:
+            metrics["tests_selected"] = pytest_result.get("selected_tests")
+            metrics["test_usage"] = pytest_result.get("usage")
+            resource_error = pytest_result.get("resource_error")
             tests_passed = pytest_result["passed"]
             pytest_output = pytest_result["output"]
-            print("✅ PASS" if tests_passed else "❌ FAIL")
+            print(f"[JUDGE] Pytest : {os.path.basename(test_file)}... "
+                  f"{'✅ PASS' if tests_passed else '❌ FAIL'}")
+            if resource_error:
+                print(f"[JUDGE] 🛑 Tests arrêtés par le sandbox : {resource_error}")
         else:
             print(f"[JUDGE] ⚠️  Tests non générés, validation sur pylint uniquement")
+            resource_error = None
             tests_passed = True
             pytest_output = "No tests generated"
 
+        print(f"[JUDGE] ⏱️  Validation : {metrics['validation_wall_s']:.2f}s "
+              f"({metrics['validation_latency_saved_s']:.2f}s gagnées en parallèle)")
+
         # ═══════════════════════════════════════════════════════════════════
         #  ÉTAPE 4 : VERDICT VIA LLM (ACTION: ANALYSIS)
         # ═══════════════════════════════════════════════════════════════════
@@ -137,7 +266,8 @@ class JudgeAgent:
             score_before=score_before,
             score_after=score_after,
             tests_passed=tests_passed,
-            pytest_output=pytest_output
+            pytest_output=pytest_output,
+            metrics=metrics
         )
 
         # ═══════════════════════════════════════════════════════════════════
@@ -145,9 +275,25 @@ class JudgeAgent:
         # ═══════════════════════════════════════════════════════════════════
         
         if verdict["verdict"] == "PASS":
-            return True, {"issues": [], "summary": "All passed"}
+            return True, {"issues": [], "summary": "All passed", "pylint_score_after": score_after}
+        elif resource_error:
+            # Boucle infinie / allocation démesurée : erreur distincte pour le Fixer
+            return False, {
+                "pylint_score_after": score_after,
+                "resource_error": resource_error,
+                "issues": [{
+                    "id": 1,
+                    "file": self.current_file,
+                    "type": "resource_exhaustion",
+                    "severity": "critical",
+                    "description": f"Exécution arrêtée : {RESOURCE_ERROR_HINTS.get(resource_error, resource_error)}",
+                    "suggestion": "Supprimer la boucle infinie / récursion ou l'allocation excessive"
+                }],
+                "error_logs": pytest_output
+            }
         else:
             return False, {
+                "pylint_score_after": score_after,
                 "issues": [{
                     "id": 1,
                     "file": self.current_file,
@@ -159,22 +305,81 @@ class JudgeAgent:
                 "error_logs": pytest_output if not tests_passed else None
             }
 
+    def _generate_and_run_tests(self, filepath: str) -> tuple:
+        """
+        Branche « tests » de run_tests : (fichier de test, résultat pytest ou None).
+        Après une correction, les tests qui touchent les fonctions modifiées
+        sont lancés d'abord (arrêt au premier échec) ; la suite complète
+        n'est relancée que pour confirmer un succès.
+        """
+        filename = os.path.basename(filepath)
+        code = read_file(filepath)
+        previous_code = self.last_tested_code.get(filename)
+        self.last_tested_code[filename] = code
+
+        test_file = self._generate_or_get_tests(filepath)
+        if not (test_file and os.path.isfile(test_file)):
+            return test_file, None
+
+        # Les modules voisins déjà corrigés restent importables depuis le workspace
+        extra_paths = [self.output_dir]
+        if previous_code is not None:
+            changed = changed_symbols(previous_code, code)
+            selection = select_tests(read_file(test_file), changed)
+            if selection:
+                print(f"[JUDGE] 🎯 {len(selection)} test(s) impacté(s) par "
+                      f"{', '.join(sorted(changed))}")
+                impacted = run_pytest(test_file, extra_paths=extra_paths,
+                                      selection=selection, fail_fast=True)
+                if not impacted["passed"]:
+                    impacted["selected_tests"] = len(selection)
+                    return test_file, impacted
+
+        return test_file, run_pytest(test_file, extra_paths=extra_paths)
+
+    @staticmethod
+    def _timed(func, *args):
+        """(résultat de func(*args), durée en secondes)"""
+        started = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - started
+
     # ═══════════════════════════════════════════════════════════════════════
     #  MÉTHODE : GÉNÉRER LES TESTS SÉMANTIQUES (ACTION: GENERATION)
     # ═══════════════════════════════════════════════════════════════════════
 
-    def _generate_or_get_tests(self, filepath: str) -> str:
-        """Génère les tests sémantiques (ou retourne ceux déjà générés)"""
-        
-        # Vérifier le cache
-        if filepath in self.generated_tests_cache:
-            return self.generated_tests_cache[filepath]
+    def _tests_lock(self, filename: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._tests_locks.setdefault(filename, threading.Lock())
 
+    def _generate_or_get_tests(self, filepath: str, generate: bool = True) -> str:
+        """
+        Génère les tests sémantiques (ou retourne ceux déjà générés).
+        `generate=False` : seulement les tests déjà générés (None sinon).
+        """
+        with self._tests_lock(os.path.basename(filepath)):
+            return self._generate_or_get_tests_locked(filepath, generate)
+
+    def _generate_or_get_tests_locked(self, filepath: str, generate: bool) -> str:
         filename = os.path.basename(filepath)
         module_name = filename.replace(".py", "")
         test_filename = f"test_{filename}"
         test_path = os.path.join(os.path.dirname(filepath), test_filename)
 
+        # Vérifier le cache (tests générés dans une itération précédente)
+        cached = self.generated_tests_cache.get(filename)
+        if cached:
+            if os.path.isfile(test_path):
+                # Déjà lié dans ce dossier (itération / candidat retenu)
+                if not os.path.isfile(cached):
+                    self.generated_tests_cache[filename] = test_path
+                return test_path
+            if os.path.isfile(cached):
+                sandbox_manager.stage(cached, test_path)
+                return test_path
+        if not generate:
+            return None
+
         print(f"\n[JUDGE] 📝 Génération de tests sémantiques pour {filename}...")
 
         # Lire le code source
@@ -202,8 +407,10 @@ Retourne UNIQUEMENT le code pytest (sans balises markdown).
         raw_response = None
         status = "SUCCESS"
 
+        model = route("test_generation")
         try:
-            raw_response = call_gemini(TEST_GENERATION_PROMPT, user_prompt)
+            with stage("judge"):
+                raw_response = call_gemini(TEST_GENERATION_PROMPT, user_prompt, model_name=model)
             test_code = self._clean_code_response(raw_response)
             write_file(test_path, test_code)
             print(f"[JUDGE] ✅ Tests générés : {test_filename}")
@@ -221,7 +428,7 @@ Retourne UNIQUEMENT le code pytest (sans balises markdown).
         
         log_experiment(
             agent_name=self.agent_name,
-            model_used=MODEL_NAME,
+            model_used=model,
             action=ActionType.GENERATION,  # ← GENERATION pour les tests !
             details={
                 "file_tested": filepath,
@@ -234,7 +441,7 @@ Retourne UNIQUEMENT le code pytest (sans balises markdown).
         )
         
         if test_path:
-            self.generated_tests_cache[filepath] = test_path
+            self.generated_tests_cache[filename] = test_path
         
         return test_path
 
@@ -242,8 +449,15 @@ Retourne UNIQUEMENT le code pytest (sans balises markdown).
     #  MÉTHODE : OBTENIR LE VERDICT (ACTION: ANALYSIS)
     # ═══════════════════════════════════════════════════════════════════════
 
-    def _get_verdict(self, filename, score_before, score_after, tests_passed, pytest_output):
+    def _get_verdict(self, filename, score_before, score_after, tests_passed, pytest_output,
+                     metrics=None):
         """Demande au LLM de donner le verdict final"""
+
+        prompt_builder = PromptBuilder("JUDGE")
+        pytest_context = prompt_builder.section(
+            "pytest", pytest_output, max_tokens=250,
+            compact=lambda t: compress_traceback(t, [filename, f"test_{filename}"])
+        )
         
         user_prompt = f"""\
 Fichier : {filename}
@@ -252,19 +466,23 @@ Pylint APRÈS : {score_after}/10
 Tests pytest : {'✅ PASS' if tests_passed else '❌ FAIL'}
 
 Sortie pytest (extrait) :
-{pytest_output[:500]}
+{pytest_context}
 
 Donne ton verdict en JSON.
 """
+        prompt_stats = prompt_builder.finish(user_prompt)
 
         api_error = None
         raw_response = None
+        json_repaired = False
         status = "SUCCESS"
 
+        model = route("verdict")
         try:
-            raw_response = call_gemini(JUDGE_VERDICT_PROMPT, user_prompt)
-            cleaned = raw_response.strip().replace("```json", "").replace("```", "").strip()
-            verdict_data = json.loads(cleaned)
+            with stage("judge"):
+                raw_response = call_gemini(JUDGE_VERDICT_PROMPT, user_prompt, json_mode=True,
+                                           model_name=model)
+            verdict_data, json_repaired = parse_json_response(raw_response, VERDICT_SCHEMA)
         except Exception as e:
             api_error = str(e)
             raw_response = f"ERROR: {e}"
@@ -284,7 +502,7 @@ Donne ton verdict en JSON.
         
         log_experiment(
             agent_name=self.agent_name,
-            model_used=MODEL_NAME,
+            model_used=model,
             action=ActionType.ANALYSIS,  # ← ANALYSIS pour le verdict
             details={
                 "file_judged": filename,
@@ -294,6 +512,10 @@ Donne ton verdict en JSON.
                 "pylint_score_after": score_after,
                 "tests_passed": tests_passed,
                 "verdict": verdict_data.get("verdict", "UNKNOWN"),
+                "prompt_tokens": prompt_stats["prompt_tokens"],
+                "prompt_tokens_saved": prompt_stats["prompt_tokens_saved"],
+                "json_repaired": json_repaired,
+                **(metrics or {}),
                 "api_error": api_error
             },
             status=status
@@ -305,17 +527,6 @@ Donne ton verdict en JSON.
     #  UTILITAIRES
     # ═══════════════════════════════════════════════════════════════════════
 
-    @staticmethod
-    def _find_file(sandbox_abs, filename):
-        """Trouve le fichier dans le sandbox"""
-        filepath = os.path.join(sandbox_abs, filename)
-        if os.path.isfile(filepath):
-            return filepath
-        filepath = os.path.join(sandbox_abs, "dataset_test", filename)
-        if os.path.isfile(filepath):
-            return filepath
-        return None
-
     @staticmethod
     def _clean_code_response(response: str) -> str:
         """Nettoie la réponse LLM pour extraire le code"""
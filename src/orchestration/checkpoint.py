@@ -0,0 +1,85 @@
+"""
+checkpoint.py — État durable par fichier pour reprendre un run interrompu.
+Journal JSONL en ajout seul : chaque étape terminée (audit, correction,
+verdict) ajoute une ligne, la reprise rejoue le journal.
+"""
+
+import json
+import os
+import threading
+
+CHECKPOINT_FILE = os.getenv("SWARM_CHECKPOINT_FILE", os.path.join("logs", "checkpoint.jsonl"))
+
+
+class Checkpoint:
+    """
+    États successifs d'un fichier :
+        audited  → analyse de l'Auditor disponible
+        fixed    → fichier corrigé écrit, `iteration` = prochaine validation
+        judged   → verdict du Judge pour `iteration` (success, feedback)
+        done     → résultat final disponible
+    """
+
+    def __init__(self, target_dir: str, resume: bool = False, path: str = CHECKPOINT_FILE):
+        self.path = path
+        self.target_dir = os.path.abspath(target_dir)
+        self.files = {}
+        self._lock = threading.Lock()
+
+        if resume and self._load():
+            done = sum(1 for s in self.files.values() if s.get("stage") == "done")
+            print(f"[CHECKPOINT] Reprise : {len(self.files)} fichier(s) suivis, {done} terminé(s)")
+            return
+
+        # Nouveau run : le journal repart de zéro
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"target_dir": self.target_dir}) + "\n")
+
+    def get(self, filename: str) -> dict:
+        """État courant d'un fichier (dict vide si jamais vu)."""
+        with self._lock:
+            return dict(self.files.get(filename, {}))
+
+    def update(self, filename: str, **fields) -> None:
+        """Enregistre durablement les champs d'une étape terminée."""
+        line = json.dumps({"file": filename, **fields}, ensure_ascii=False, default=str)
+        with self._lock:
+            self.files.setdefault(filename, {}).update(fields)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _load(self) -> bool:
+        """Rejoue le journal. Retourne False s'il est absent ou d'un autre dossier."""
+        if not os.path.exists(self.path):
+            print(f"[CHECKPOINT] ⚠️  Aucun checkpoint ({self.path}), démarrage à zéro")
+            return False
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            content = f.read()
+        lines = content.splitlines()
+
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except json.JSONDecodeError:
+            header = {}
+        if header.get("target_dir") != self.target_dir:
+            print(f"[CHECKPOINT] ⚠️  Checkpoint d'un autre dossier cible, démarrage à zéro")
+            return False
+
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Dernière ligne tronquée par le crash
+            filename = record.pop("file", None)
+            if filename:
+                self.files.setdefault(filename, {}).update(record)
+
+        # Isoler une éventuelle ligne tronquée des prochains ajouts
+        if content and not content.endswith("\n"):
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n")
+        return True
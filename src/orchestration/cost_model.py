@@ -0,0 +1,182 @@
+"""
+cost_model.py — Estimation du coût (secondes) de traitement d'un fichier.
+- Pré-passe peu coûteuse : taille du code, score pylint, nombre de messages
+  pylint (le résultat pylint est mis en cache et resservi à l'Auditor)
+- Modèle linéaire appris sur les durées passées du log d'expérience, tiré
+  vers des coefficients a priori tant que l'historique est maigre
+- Ordonnancement « le plus long d'abord » des composantes du graphe
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from src.utils.logger import read_experiment_log
+from src.utils.stages import CPU_COUNT
+from src.utils.tools import run_pylint, count_pylint_messages
+
+FEATURES = ("base", "kchars", "pylint_deficit", "pylint_messages")
+# A priori : 20 s par fichier, +8 s par millier de caractères,
+# +3 s par point pylint manquant, +0,5 s par message pylint
+PRIOR_WEIGHTS = (20.0, 8.0, 3.0, 0.5)
+# Poids de l'a priori, en nombre d'observations équivalentes
+PRIOR_STRENGTH = 3.0
+# Deux entrées d'un même fichier séparées de plus que ça : runs différents
+SESSION_GAP_S = 600
+
+_LOG_FILE_KEYS = ("file_analyzed", "file_fixed", "file_debugged", "file_tested", "file_judged")
+
+
+def file_features(file_path: str, with_pylint: bool = True) -> dict:
+    """
+    Caractéristiques d'un fichier pour le modèle. Sans pylint (coordinateur
+    du mode shardé, dont le cache ne profiterait pas aux workers), score et
+    messages sont laissés à None et remplacés par la moyenne historique.
+    """
+    try:
+        size = os.path.getsize(file_path)
+    except OSError:
+        size = 0
+    features = {"kchars": size / 1000, "pylint_deficit": None, "pylint_messages": None}
+    if with_pylint:
+        result = run_pylint(file_path)
+        if result["returncode"] != -1:
+            features["pylint_deficit"] = max(10.0 - result["score"], 0.0)
+            features["pylint_messages"] = count_pylint_messages(result["messages"])
+    return features
+
+
+class CostModel:
+    """Régression linéaire (ridge vers PRIOR_WEIGHTS) durée ~ caractéristiques"""
+
+    def __init__(self, samples: list[tuple[dict, float]] = None):
+        self.samples = samples or []
+        # Valeur de remplacement d'une caractéristique inconnue : moyenne historique
+        self.means = {}
+        for name, default in (("pylint_deficit", 5.0), ("pylint_messages", 10.0)):
+            known = [f[name] for f, _ in self.samples if f.get(name) is not None]
+            self.means[name] = sum(known) / len(known) if known else default
+        self.weights = self._fit()
+
+    @classmethod
+    def from_log(cls, log_file: str = None) -> "CostModel":
+        return cls(historical_samples(read_experiment_log(log_file, rehydrate=False)))
+
+    def predict(self, features: dict) -> float:
+        return max(sum(w * x for w, x in zip(self.weights, self._vector(features))), 1.0)
+
+    def _vector(self, features: dict) -> list[float]:
+        return [1.0] + [
+            features[name] if features.get(name) is not None else self.means[name]
+            for name in FEATURES[1:]
+        ]
+
+    def _fit(self) -> tuple:
+        """
+        Minimise Σ(durée - w·x)² + PRIOR_STRENGTH·‖w - a priori‖² (équations
+        normales, 4 inconnues). Coefficients négatifs ramenés à 0 : un fichier
+        plus gros ou plus mauvais n'est jamais estimé plus rapide.
+        """
+        if not self.samples:
+            return PRIOR_WEIGHTS
+        n = len(FEATURES)
+        a = [[PRIOR_STRENGTH if i == j else 0.0 for j in range(n)] for i in range(n)]
+        b = [PRIOR_STRENGTH * w for w in PRIOR_WEIGHTS]
+        for features, duration in self.samples:
+            x = self._vector(features)
+            for i in range(n):
+                b[i] += x[i] * duration
+                for j in range(n):
+                    a[i][j] += x[i] * x[j]
+        weights = _solve(a, b)
+        return tuple(max(w, 0.0) for w in weights) if weights else PRIOR_WEIGHTS
+
+
+def _solve(a: list[list[float]], b: list[float]):
+    """Élimination de Gauss avec pivot partiel (None si système singulier)."""
+    n = len(b)
+    m = [row[:] + [b[i]] for i, row in enumerate(a)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        if abs(m[pivot][col]) < 1e-12:
+            return None
+        m[col], m[pivot] = m[pivot], m[col]
+        for r in range(col + 1, n):
+            factor = m[r][col] / m[col][col]
+            for c in range(col, n + 1):
+                m[r][c] -= factor * m[col][c]
+    x = [0.0] * n
+    for i in reversed(range(n)):
+        x[i] = (m[i][n] - sum(m[i][j] * x[j] for j in range(i + 1, n))) / m[i][i]
+    return x
+
+
+def historical_samples(entries: list[dict]) -> list[tuple[dict, float]]:
+    """
+    (caractéristiques, durée) par traitement de fichier passé. Un traitement
+    commence à l'audit du fichier et se termine à sa dernière entrée avant
+    l'audit suivant (ou un silence de plus de SESSION_GAP_S). Les audits par
+    lots sont ignorés : leur durée inclut l'attente du reste du lot.
+    """
+    by_file = {}
+    for entry in entries:
+        details = entry.get("details", {})
+        path = next((details[k] for k in _LOG_FILE_KEYS if isinstance(details.get(k), str)), None)
+        try:
+            when = datetime.fromisoformat(entry.get("timestamp", ""))
+        except ValueError:
+            continue
+        if path:
+            by_file.setdefault(re.split(r"[\\/]", path)[-1], []).append((when, entry))
+
+    samples = []
+    for timeline in by_file.values():
+        timeline.sort(key=lambda item: item[0])
+        session = []
+        for when, entry in timeline + [(None, None)]:
+            starts_new = entry is None or entry.get("action") == "CODE_ANALYSIS" or (
+                session and (when - session[-1][0]).total_seconds() > SESSION_GAP_S)
+            if starts_new and session:
+                sample = _session_sample(session)
+                if sample:
+                    samples.append(sample)
+                session = []
+            if entry is not None:
+                session.append((when, entry))
+    return samples
+
+
+def _session_sample(session: list):
+    first = session[0][1]
+    details = first.get("details", {})
+    if first.get("action") != "CODE_ANALYSIS" or "batch_id" in details or len(session) < 2:
+        return None
+    size = details.get("code_length")
+    if size is None:  # logs antérieurs : taille relevée par le Fixer
+        size = next((e["details"]["code_length_before"] for _, e in session
+                     if isinstance(e.get("details", {}).get("code_length_before"), int)), None)
+    score = details.get("pylint_score_before")
+    if size is None or not isinstance(score, (int, float)):
+        return None
+    features = {
+        "kchars": size / 1000,
+        "pylint_deficit": max(10.0 - score, 0.0),
+        "pylint_messages": details.get("pylint_messages_count")
+    }
+    return features, (session[-1][0] - session[0][0]).total_seconds()
+
+
+def estimate_costs(target_dir: str, filenames: list[str], with_pylint: bool = True,
+                   model: CostModel = None) -> dict:
+    """{fichier: coût estimé en secondes} ; pylint lancé en parallèle (étape lint)."""
+    model = model or CostModel.from_log()
+    paths = [os.path.join(target_dir, f) for f in filenames]
+    with ThreadPoolExecutor(max_workers=CPU_COUNT) as executor:
+        features = list(executor.map(lambda p: file_features(p, with_pylint), paths))
+    return {f: model.predict(feat) for f, feat in zip(filenames, features)}
+
+
+def longest_first(components: list[list[str]], costs: dict) -> list[list[str]]:
+    """Composantes triées par coût total décroissant (ordre interne conservé)."""
+    return sorted(components, key=lambda c: (-sum(costs.get(f, 0.0) for f in c), c))
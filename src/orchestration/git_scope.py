@@ -0,0 +1,161 @@
+"""
+git_scope.py — Runs limités aux fichiers modifiés (--changed-since <ref>).
+- Fichiers Python de target_dir modifiés depuis `ref` (git local : commits,
+  modifications non commitées et fichiers non suivis), plus les fichiers qui
+  les importent : leur résultat précédent a été validé contre l'ancien code
+- Fonctions modifiées d'un fichier (diff AST avec sa version à `ref`, ou
+  lignes des hunks si le code ne se parse pas), transmises à l'Auditor
+- Résultats du dernier run par fichier, repris pour les fichiers hors diff
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+
+from src.orchestration.import_graph import build_import_graph, dependents
+from src.utils.test_impact import changed_symbols, MODULE_LEVEL
+
+RESULTS_FILE = os.path.join("logs", "last_results.json")
+
+_HUNK = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@", re.MULTILINE)
+_results_lock = threading.Lock()
+
+
+class GitScopeError(RuntimeError):
+    """Dossier hors dépôt git, référence inconnue ou git absent."""
+
+
+def _git(target_dir: str, *args) -> str:
+    try:
+        result = subprocess.run(["git", *args], cwd=target_dir, capture_output=True, text=True,
+                                encoding="utf-8", timeout=60)
+    except FileNotFoundError as e:
+        raise GitScopeError("git n'est pas installé") from e
+    except subprocess.TimeoutExpired as e:
+        raise GitScopeError(f"git {args[0]} : timeout") from e
+    if result.returncode != 0:
+        raise GitScopeError(result.stderr.strip() or f"git {args[0]} a échoué")
+    return result.stdout
+
+
+def changed_files(target_dir: str, ref: str) -> set:
+    """Fichiers (noms relatifs à target_dir, premier niveau) modifiés depuis `ref`."""
+    _git(target_dir, "rev-parse", "--show-toplevel")  # erreur explicite hors dépôt
+    try:
+        _git(target_dir, "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}")
+    except GitScopeError as e:
+        raise GitScopeError(f"référence git inconnue : {ref}") from e
+    diff = _git(target_dir, "diff", "--name-only", "--relative", "--diff-filter=ACMR", ref, "--", ".")
+    untracked = _git(target_dir, "ls-files", "--others", "--exclude-standard", "--", ".")
+    return {path for path in (diff + untracked).splitlines() if path and "/" not in path}
+
+
+def with_dependents(target_dir: str, filenames: list[str], changed: set) -> set:
+    """
+    Fichiers de `changed` présents dans `filenames`, plus ceux de `filenames`
+    qui en dépendent par imports locaux (transitivement).
+    """
+    graph = build_import_graph(target_dir, filenames)
+    scope = {f for f in changed if f in graph}
+    pending = list(scope)
+    while pending:
+        for dependent in dependents(graph, pending.pop()) - scope:
+            scope.add(dependent)
+            pending.append(dependent)
+    return scope
+
+
+def changed_functions(target_dir: str, filename: str, ref: str) -> list[str]:
+    """
+    Ce qui a changé dans `filename` depuis `ref`, pour orienter l'Auditor :
+    noms de fonctions / méthodes / classes, sinon plages de lignes.
+    Liste vide si le fichier est nouveau ou si git ne répond pas.
+    """
+    try:
+        base_code = _git(target_dir, "show", f"{ref}:./{filename}")
+        with open(os.path.join(target_dir, filename), "r", encoding="utf-8") as f:
+            code = f.read()
+    except (GitScopeError, OSError, UnicodeDecodeError):
+        return []
+
+    symbols = changed_symbols(base_code, code)
+    if symbols:
+        return sorted("code de niveau module" if s == MODULE_LEVEL else s for s in symbols)
+
+    # Code non parsable (ou AST identique) : lignes touchées d'après les hunks du diff
+    try:
+        diff = _git(target_dir, "diff", "-U0", ref, "--", filename)
+    except GitScopeError:
+        return []
+    ranges = []
+    for start, count in _HUNK.findall(diff):
+        start, count = int(start), int(count or 1)
+        if count:
+            ranges.append(f"lignes {start}-{start + count - 1}" if count > 1 else f"ligne {start}")
+    return ranges
+
+
+# ══════════════════════════════════════════════════════════════════════════
+#  RÉSULTATS REPRIS D'UN RUN À L'AUTRE
+# ══════════════════════════════════════════════════════════════════════════
+
+def _digest(path: str):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _load_history() -> dict:
+    if not os.path.exists(RESULTS_FILE):
+        return {}
+    try:
+        with open(RESULTS_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def save_results(target_dir: str, results: list[dict], digests: dict) -> None:
+    """
+    Mémorise le résultat de chaque fichier traité avec l'empreinte du source
+    traité (`digests`, relevées avant le run) ; les autres fichiers gardent
+    leur résultat précédent.
+    """
+    target_dir = os.path.abspath(target_dir)
+    with _results_lock:
+        history = _load_history()
+        files = history.setdefault(target_dir, {})
+        for result in results:
+            if not result.get("carried_forward") and digests.get(result["file"]):
+                files[result["file"]] = {"result": result, "digest": digests[result["file"]]}
+
+        os.makedirs(os.path.dirname(RESULTS_FILE) or ".", exist_ok=True)
+        tmp_path = f"{RESULTS_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, RESULTS_FILE)
+
+
+def source_digests(target_dir: str, filenames: list[str]) -> dict:
+    """Empreintes des sources avant le run (clé de reprise des résultats)."""
+    return {f: _digest(os.path.join(target_dir, f)) for f in filenames}
+
+
+def carry_forward(target_dir: str, filenames: list[str]) -> list[dict]:
+    """
+    Résultats précédents des fichiers hors diff, seulement si le source n'a
+    pas changé depuis qu'ils ont été obtenus.
+    """
+    files = _load_history().get(os.path.abspath(target_dir), {})
+    carried = []
+    for filename in filenames:
+        entry = files.get(filename)
+        if entry and entry.get("digest") == _digest(os.path.join(target_dir, filename)):
+            carried.append({**entry["result"], "carried_forward": True})
+    return carried
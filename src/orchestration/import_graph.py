@@ -0,0 +1,130 @@
+"""
+import_graph.py — Graphe des imports entre les fichiers du dossier cible.
+- Dépendances locales de chaque module (ast, repli regex si le code est cassé)
+- Composantes indépendantes (traitables en parallèle)
+- Ordre topologique : les dépendances sont corrigées avant leurs dépendants
+- Empreinte de l'API publique, pour ne revalider un dépendant que si
+  l'API corrigée d'une dépendance a changé
+"""
+
+import ast
+import hashlib
+import os
+import re
+
+_IMPORT_LINE = re.compile(r"^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w., ]+))", re.MULTILINE)
+
+
+def build_import_graph(target_dir: str, filenames: list[str]) -> dict:
+    """{fichier: ensemble des fichiers du lot qu'il importe}."""
+    modules = {os.path.splitext(f)[0]: f for f in filenames}
+    graph = {}
+    for filename in filenames:
+        try:
+            with open(os.path.join(target_dir, filename), "r", encoding="utf-8") as f:
+                code = f.read()
+        except (OSError, UnicodeDecodeError):
+            code = ""
+        graph[filename] = {
+            modules[name] for name in _imported_modules(code)
+            if name in modules and modules[name] != filename
+        }
+    return graph
+
+
+def _imported_modules(code: str) -> set:
+    """Premiers composants des modules importés (`a.b` → `a`)."""
+    names = set()
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        # Fichier bogué : les lignes d'import restent en général lisibles
+        for from_name, import_names in _IMPORT_LINE.findall(code):
+            for name in [from_name] if from_name else import_names.split(","):
+                names.add(name.strip().split(" ")[0].split(".")[0])
+        return names
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level <= 1:
+            names.add(node.module.split(".")[0])
+    return names
+
+
+def connected_components(graph: dict) -> list[list[str]]:
+    """Groupes de fichiers sans import entre groupes (triés, plus gros d'abord)."""
+    neighbours = {f: set(deps) for f, deps in graph.items()}
+    for f, deps in graph.items():
+        for dep in deps:
+            neighbours[dep].add(f)
+
+    components = []
+    seen = set()
+    for start in sorted(graph):
+        if start in seen:
+            continue
+        component, pending = [], [start]
+        seen.add(start)
+        while pending:
+            current = pending.pop()
+            component.append(current)
+            for n in neighbours[current] - seen:
+                seen.add(n)
+                pending.append(n)
+        components.append(component)
+    return sorted(components, key=lambda c: (-len(c), sorted(c)))
+
+
+def topological_order(graph: dict, files: list[str]) -> list[str]:
+    """
+    Dépendances avant dépendants (Kahn). Un cycle est rompu en prenant le
+    fichier du cycle qui a le moins de dépendances restantes.
+    """
+    files = sorted(files)
+    remaining = {f: set(graph.get(f, ())) & set(files) for f in files}
+    order = []
+    while remaining:
+        ready = [f for f in files if f in remaining and not remaining[f]]
+        if not ready:
+            ready = [min(remaining, key=lambda f: (len(remaining[f]), f))]
+        for f in ready:
+            del remaining[f]
+            order.append(f)
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+
+def dependents(graph: dict, filename: str) -> set:
+    """Fichiers qui importent `filename`."""
+    return {f for f, deps in graph.items() if filename in deps}
+
+
+def api_fingerprint(code: str):
+    """
+    Empreinte de l'API publique d'un module : noms et signatures des
+    fonctions, classes, méthodes et noms de niveau module non privés.
+    None si le code ne se parse pas.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+
+    def signature(func):
+        return f"{func.name}({ast.dump(func.args)})"
+
+    api = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith("_"):
+            api.append(signature(node))
+        elif isinstance(node, ast.ClassDef) and not node.name.startswith("_"):
+            methods = [signature(item) for item in node.body
+                       if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                       and (not item.name.startswith("_") or item.name == "__init__")]
+            api.append(f"class {node.name}: " + ", ".join(methods))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            api.extend(t.id for t in targets if isinstance(t, ast.Name) and not t.id.startswith("_"))
+    return hashlib.sha256("\n".join(sorted(api)).encode("utf-8")).hexdigest()
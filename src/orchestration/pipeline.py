@@ -0,0 +1,441 @@
+"""
+pipeline.py — Traitement d'un fichier par le trio Auditor → Fixer → Judge.
+Utilisé par main.py (mode séquentiel) et par les workers du mode shardé.
+"""
+
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.agents.auditor_agent import AuditorAgent
+from src.agents.fixer_agent import FixerAgent
+from src.agents.judge_agent import JudgeAgent
+from src.utils.fix_store import FixStore, FIX_STORE_ENABLED
+from src.utils.hedging import file_latency, hedge_counters, report as report_hedging
+from src.utils.stages import configure_stages
+from src.utils.tools import read_file, write_file, SANDBOX_OUTPUT_DIR
+from src.utils.workspace import Workspace
+from src.orchestration.import_graph import (build_import_graph, connected_components, topological_order,
+                                            dependents, api_fingerprint)
+from src.orchestration.cost_model import estimate_costs, longest_first
+
+MAX_ITERATIONS = 3
+
+# Mode batch : nombre de fichiers dont les petits sont pré-audités ensemble
+BATCH_WINDOW = 32
+
+
+class ProcessingCancelled(Exception):
+    """Le fichier a été modifié pendant son traitement (mode --watch)."""
+
+
+def process_file(file_path: str, auditor, fixer, judge, checkpoint=None, analysis=None,
+                 num_candidates: int = 1, fix_store=None, cancelled=None, focus=None,
+                 output_dir: str = None) -> dict:
+    """
+    Audit, correction puis boucle de validation (max MAX_ITERATIONS).
+    Chaque itération travaille dans son propre dossier (Workspace) ; la
+    meilleure version est promue dans le sandbox à la fin.
+    Avec un `checkpoint`, chaque étape terminée est enregistrée et les
+    résultats LLM déjà obtenus sont réutilisés à la reprise.
+    `analysis` : audit déjà obtenu (mode batch), l'Auditor n'est pas rappelé.
+    `num_candidates` > 1 : chaque correction est choisie parmi N candidats.
+    `fix_store` : un code déjà corrigé et validé (même AST normalisé) est
+    réutilisé sans Auditor ni Fixer ; les nouvelles corrections validées y
+    sont enregistrées.
+    `cancelled(filename)` : vérifié entre les étapes ; s'il devient vrai, le
+    traitement s'arrête sans promotion (résultat marqué "cancelled").
+    `focus` : parties modifiées du fichier, signalées à l'Auditor.
+    `output_dir` : dossier de sortie (SANDBOX_OUTPUT_DIR par défaut ; un par
+    job en mode serveur), aussi utilisé par le Judge pour les imports voisins.
+
+    Returns:
+        dict: {"file", "passed", "fixed_path", "iterations", "error", "fix_reused", "cancelled"}
+    """
+    filename = os.path.basename(file_path)
+    result = {
+        "file": filename,
+        "passed": False,
+        "fixed_path": None,
+        "iterations": 0,
+        "error": None,
+        "fix_reused": False,
+        "cancelled": False
+    }
+
+    state = checkpoint.get(filename) if checkpoint else {}
+    if state.get("stage") == "done":
+        print(f"[CHECKPOINT] ⏭️  {filename} déjà traité, résultat réutilisé")
+        return state["result"]
+    # Seulement audité (pré-audit par lots, ou run interrompu juste après) : rien
+    # n'a encore été corrigé ni testé, le fichier repart comme un nouveau
+    started = state.get("stage") not in (None, "audited")
+
+    def save(**fields):
+        if checkpoint:
+            checkpoint.update(filename, **fields)
+
+    def check_cancelled():
+        if cancelled and cancelled(filename):
+            raise ProcessingCancelled(filename)
+
+    # Indiquer au Judge quel fichier on traite (pour tests ciblés)
+    judge.set_current_file(filename)
+    source_code = _source_of(file_path)
+    if not started:
+        judge.reset_file(filename, source=source_code)
+
+    output_dir = output_dir or SANDBOX_OUTPUT_DIR
+    judge.output_dir = output_dir
+    workspace = Workspace(filename, output_dir=output_dir, resume=started)
+    workspace.records = state.get("workspace", [])
+
+    def fix(source_path, feedback, k):
+        if num_candidates > 1:
+            return _fix_best_of_n(fixer, judge, workspace, source_path, feedback, k, num_candidates)
+        return fixer.fix_code(source_path, feedback, output_path=workspace.new_iteration(k), iteration=k)
+
+    original_code = None
+    stored_fix = None
+    result["fix_reused"] = state.get("fix_reused", False)
+    try:
+        check_cancelled()
+        # ─── ÉTAPE 0 : CORRECTION DÉJÀ CONNUE ? ──────────────────────────
+        if fix_store and not started:
+            original_code = read_file(file_path)
+            stored_fix = fix_store.lookup(original_code)
+
+        if stored_fix is not None:
+            # Ni Auditor ni Fixer : directement la validation par le Judge
+            print(f"[FIX STORE] ♻️  Correction déjà validée réutilisée pour {filename}")
+            fix_store.record_hit(original_code)
+            result["fix_reused"] = True
+            fixed_path = workspace.new_iteration(0)
+            write_file(fixed_path, stored_fix)
+            iteration = 0
+            save(stage="fixed", analysis={"issues": [], "summary": "Correction réutilisée"},
+                 fixed_path=fixed_path, iteration=0, fix_reused=True)
+        else:
+            # ─── ÉTAPE 1 : AUDIT ──────────────────────────────────────────
+            analysis_feedback = state.get("analysis")
+            if analysis_feedback is None:
+                analysis_feedback = analysis or auditor.analyze_file(file_path, focus=focus)
+                save(stage="audited", analysis=analysis_feedback)
+            elif analysis is None:
+                print(f"[CHECKPOINT] Audit réutilisé pour {filename}")
+            check_cancelled()
+
+            # ─── ÉTAPE 2 : CORRECTION ─────────────────────────────────────
+            fixed_path = state.get("fixed_path")
+            if fixed_path and os.path.isfile(fixed_path):
+                print(f"[CHECKPOINT] Correction réutilisée : {fixed_path}")
+                judge.restore_file_state(fixed_path, state.get("judge_state", {}))
+                iteration = state.get("iteration", 0)
+            else:
+                fixed_path = fix(file_path, analysis_feedback, 0)
+                iteration = 0
+                save(stage="fixed", fixed_path=fixed_path, iteration=0)
+
+        # Verdict déjà rendu avant l'interruption : pas de nouvel appel au Judge
+        pending = state if state.get("stage") == "judged" else None
+
+        # ─── ÉTAPE 3 : BOUCLE DE VALIDATION ──────────────────────────────
+        while True:
+            check_cancelled()
+            result["iterations"] = iteration + 1
+
+            if pending:
+                success, feedback = pending["success"], pending["feedback"]
+                pending = None
+            else:
+                print(f"\n🔁 Itération {iteration+1}/{MAX_ITERATIONS} pour {filename}")
+                # Tester le fichier corrigé
+                success, feedback = judge.run_tests(fixed_path)
+                workspace.record(iteration, success, feedback.get("pylint_score_after"))
+                save(stage="judged", iteration=iteration, success=success, feedback=feedback,
+                     judge_state=judge.get_file_state(fixed_path), workspace=workspace.records)
+
+            if success:
+                print(f"✅ {filename} validé !")
+                result["passed"] = True
+                break
+            if iteration == MAX_ITERATIONS - 1:  # Dernière itération
+                print(f"⚠️  {filename} : max itérations atteint")
+                break
+
+            print(f"🔧 Nouvelle tentative de correction...")
+            check_cancelled()
+            fixed_path = fix(fixed_path, feedback, iteration + 1)
+            iteration += 1
+            save(stage="fixed", fixed_path=fixed_path, iteration=iteration)
+
+    except ProcessingCancelled:
+        print(f"\n⏹️  {filename} modifié pendant son traitement : abandon")
+        result["cancelled"] = True
+        result["error"] = "annulé (fichier modifié)"
+        workspace.cleanup()
+        return result
+    except Exception as e:
+        print(f"\n❌ ERREUR lors du traitement de {filename} : {e}")
+        result["error"] = str(e)
+
+    # ─── ÉTAPE 4 : PROMOTION DE LA MEILLEURE ITÉRATION ───────────────────
+    result["fixed_path"] = workspace.promote()
+    if result["fixed_path"]:
+        print(f"\n✓ Fichier sauvegardé : {result['fixed_path']}")
+        judge.remember_tests(result["fixed_path"], source=source_code)
+    workspace.cleanup()
+
+    if fix_store and result["passed"] and not result["fix_reused"] and original_code is not None:
+        fix_store.record(original_code, read_file(result["fixed_path"]), filename)
+
+    save(stage="done", result=result)
+    return result
+
+
+def _fix_best_of_n(fixer, judge, workspace, source_path: str, feedback: dict, k: int, n: int) -> str:
+    """
+    Mode best-of-N : N corrections générées en parallèle, validées en
+    parallèle sans LLM (syntaxe, pylint, tests générés) ; la meilleure
+    devient l'itération `k` du workspace.
+    """
+    cand_paths = [workspace.candidate_path(k, i) for i in range(n)]
+    written = fixer.fix_candidates(source_path, feedback, cand_paths, iteration=k)
+    if not written:
+        raise FileNotFoundError(source_path)
+
+    # Tests générés une seule fois, puis liés dans chaque dossier candidat
+    judge.prepare_tests(written[0])
+    with ThreadPoolExecutor(max_workers=len(written)) as executor:
+        evaluations = list(executor.map(judge.evaluate_candidate, written))
+
+    for i, ev in enumerate(evaluations):
+        status = "✅" if ev["tests_passed"] else ("❌" if ev["syntax_ok"] else "💥")
+        print(f"[BEST-OF-N] {status} Candidat {i} : pylint {ev['score']:.2f}/10")
+    best_index = max(range(len(evaluations)),
+                     key=lambda i: (evaluations[i]["syntax_ok"], evaluations[i]["tests_passed"],
+                                    evaluations[i]["score"]))
+    print(f"[BEST-OF-N] 🏆 Candidat {best_index} retenu")
+    return workspace.adopt_candidate(k, evaluations[best_index]["path"])
+
+
+def run_files(target_dir: str, filenames: list[str], on_result=None, checkpoint=None,
+              batch_audit: bool = False, num_candidates: int = 1,
+              parallel_components: int = 1, agents: tuple = None, fix_store=None,
+              pools=None, cancelled=None, focus: dict = None, output_dir: str = None) -> list[dict]:
+    """
+    Traite `filenames` (relatifs à `target_dir`) dans l'ordre du graphe
+    d'imports : un module est corrigé après les modules locaux qu'il importe.
+    Les composantes indépendantes du graphe sont traitées par
+    `parallel_components` threads (chacun avec ses propres agents) ; 0 =
+    automatique, borné par l'admission des pools d'étapes (src/utils/stages.py).
+    `on_result(result)` est appelé après chaque fichier terminé (ou revalidé).
+    `batch_audit` : les petits fichiers sont audités par lots, fenêtre de
+    BATCH_WINDOW fichiers par fenêtre, juste avant le traitement de la
+    fenêtre (audits enregistrés aussitôt dans le checkpoint).
+    `num_candidates` : nombre de corrections candidates par itération.
+    Les composantes les plus coûteuses (estimation de src/orchestration/
+    cost_model.py) passent en premier, pour ne pas finir par la plus longue.
+    Mode serveur : `agents` (trio Auditor, Fixer, Judge), `fix_store` et
+    `pools` sont gardés d'un job à l'autre au lieu d'être recréés.
+    `cancelled(filename)` (mode --watch) : un fichier annulé n'est pas publié.
+    `focus` : {fichier: parties modifiées} (mode --changed-since).
+    `output_dir` : dossier de sortie du run (SANDBOX_OUTPUT_DIR par défaut).
+    Avec SWARM_LLM_HEDGE=1, la latence par fichier est rapportée avec et
+    sans les requêtes LLM doublées (src/utils/hedging.py).
+    """
+    graph = build_import_graph(target_dir, filenames)
+    components = [topological_order(graph, c) for c in connected_components(graph)]
+    edges = sum(len(deps) for deps in graph.values())
+    if edges:
+        print(f"[GRAPH] 🔗 {edges} import(s) local(aux), {len(components)} composante(s) indépendante(s)")
+
+    pools = pools or configure_stages()
+    # Pré-passe : le pylint lancé ici est mis en cache et resservi à l'Auditor
+    costs = estimate_costs(target_dir, filenames)
+    components = longest_first(components, costs)
+    if costs:
+        longest = max(costs, key=costs.get)
+        print(f"[SCHED] ⏳ Coût estimé : ~{sum(costs.values()):.0f}s au total, "
+              f"plus long d'abord ({longest} : ~{costs[longest]:.0f}s)")
+    if fix_store is None and FIX_STORE_ENABLED:
+        fix_store = FixStore()
+    agents = agents or (AuditorAgent(), FixerAgent(), JudgeAgent())
+    total = len(filenames)
+    results = []
+    latencies = []
+    hedges_before = hedge_counters()
+    started = itertools.count(1)
+    lock = threading.Lock()
+
+    # Pré-audit par lots sur l'ordre global (les composantes sont souvent d'un seul fichier)
+    batch = None
+    if batch_audit:
+        batch = _WindowedAudit(agents[0], target_dir, [f for c in components for f in c],
+                               checkpoint, fix_store)
+
+    def publish(result):
+        with lock:
+            if not any(r is result for r in results):
+                results.append(result)
+            if on_result:
+                on_result(result)
+
+    def run_component(files, component_agents=None):
+        auditor, fixer, judge = component_agents or (AuditorAgent(), FixerAgent(), JudgeAgent())
+        done = {}  # fichier -> résultat, pour les revalidations
+        for filename in files:
+            file_path = os.path.join(target_dir, filename)
+
+            with lock:
+                idx = next(started)
+            print(f"\n{'='*70}")
+            print(f"📄 [{idx}/{total}] {filename}")
+            print(f"{'='*70}")
+
+            original_api = _api_of(file_path)
+            with file_latency(filename) as latency:
+                result = process_file(file_path, auditor, fixer, judge, checkpoint,
+                                      analysis=batch.analysis_for(filename) if batch else None,
+                                      num_candidates=num_candidates, fix_store=fix_store,
+                                      cancelled=cancelled, focus=(focus or {}).get(filename),
+                                      output_dir=output_dir)
+            if result.get("cancelled"):
+                continue
+            with lock:
+                latencies.append(latency)
+            done[filename] = result
+            publish(result)
+
+            # Dépendants déjà traités (cycle, reprise) : revalidés seulement si l'API a changé
+            if result["fixed_path"] and _api_of(result["fixed_path"]) != original_api:
+                for dependent in sorted(dependents(graph, filename) & done.keys()):
+                    _revalidate(done[dependent], filename, judge, checkpoint)
+                    publish(done[dependent])
+
+    # Admission : au plus admission_limit() fichiers en vol, les suivants attendent
+    workers = min(parallel_components or pools.admission_limit(), pools.admission_limit(),
+                  len(components))
+    if workers > 1:
+        print(f"[GRAPH] ⚙️  {workers} composantes traitées en parallèle")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(run_component, components))
+    else:
+        for files in components:
+            run_component(files, agents)
+
+    pools.report()
+    report_hedging(latencies, since=hedges_before)
+    return results
+
+
+class _WindowedAudit:
+    """
+    Pré-audit par lots fenêtre par fenêtre : la fenêtre d'un fichier est
+    auditée quand le premier de ses fichiers va être traité. Sont exclus les
+    fichiers déjà audités (checkpoint) et ceux dont la correction est déjà
+    dans le fix store (ni Auditor ni Fixer pour eux).
+    """
+
+    def __init__(self, auditor, target_dir: str, order: list[str], checkpoint=None, fix_store=None):
+        self.auditor = auditor
+        self.target_dir = target_dir
+        self.checkpoint = checkpoint
+        self.fix_store = fix_store
+        self.windows = [order[i:i + BATCH_WINDOW] for i in range(0, len(order), BATCH_WINDOW)]
+        self.window_of = {f: i for i, window in enumerate(self.windows) for f in window}
+        # Un verrou par fenêtre : les autres fenêtres ne sont pas bloquées pendant l'appel LLM
+        self.locks = [threading.Lock() for _ in self.windows]
+        self.audited = set()
+        self.analyses = {}
+
+    def analysis_for(self, filename: str):
+        """Audit par lot de `filename` (None : à auditer seul)."""
+        index = self.window_of.get(filename)
+        if index is None:
+            return None
+        with self.locks[index]:
+            if index not in self.audited:
+                self.audited.add(index)
+                self._audit(self.windows[index])
+            return self.analyses.pop(filename, None)
+
+    def _audit(self, window: list[str]) -> None:
+        pending = [f for f in window if self._needs_audit(f)]
+        if not pending:
+            return
+        paths = {os.path.join(self.target_dir, f): f for f in pending}
+        for path, analysis in self.auditor.analyze_files_batch(list(paths)).items():
+            filename = paths[path]
+            self.analyses[filename] = analysis
+            if self.checkpoint:
+                self.checkpoint.update(os.path.basename(filename), stage="audited", analysis=analysis)
+
+    def _needs_audit(self, filename: str) -> bool:
+        if self.checkpoint and self.checkpoint.get(os.path.basename(filename)):
+            return False  # déjà audité, corrigé ou terminé lors d'un run précédent
+        if self.fix_store:
+            code = _source_of(os.path.join(self.target_dir, filename))
+            if code is not None and self.fix_store.lookup(code) is not None:
+                return False
+        return True
+
+
+def _api_of(path: str):
+    """Empreinte de l'API publique d'un fichier (None s'il est illisible ou invalide)."""
+    try:
+        return api_fingerprint(read_file(path))
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _source_of(path: str):
+    """Code source d'un fichier (None s'il est illisible)."""
+    try:
+        return read_file(path)
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _revalidate(result: dict, changed_dependency: str, judge, checkpoint=None) -> None:
+    """Relance le Judge sur un dépendant déjà promu après un changement d'API."""
+    if not result["fixed_path"]:
+        return
+    print(f"[GRAPH] 🔁 API de {changed_dependency} modifiée : revalidation de {result['file']}")
+    judge.set_current_file(result["file"])
+    passed, _ = judge.run_tests(result["fixed_path"])
+    result["passed"] = passed
+    result["revalidated"] = True
+    if checkpoint:
+        checkpoint.update(result["file"], stage="done", result=result)
+
+
+def print_final_report(results: list[dict], output_dir: str) -> None:
+    """Affiche le rapport final (format identique au mode mono-processus)."""
+    total = len(results)
+    files_passed = sum(1 for r in results if r["passed"])
+    files_failed = total - files_passed
+
+    print(f"\n{'='*70}")
+    print(f"🏁 TRAITEMENT TERMINÉ")
+    print(f"{'='*70}")
+    print(f"✅ Fichiers validés     : {files_passed}/{total}")
+    print(f"⚠️  Fichiers avec erreurs : {files_failed}/{total}")
+    print(f"♻️  Corrections réutilisées : {sum(1 for r in results if r.get('fix_reused'))}/{total}")
+    carried = sum(1 for r in results if r.get("carried_forward"))
+    if carried:
+        print(f"⏭️  Résultats repris      : {carried}/{total} (fichiers hors diff)")
+    print(f"📊 Logs disponibles     : logs/experiment_data.json")
+    print(f"📁 Code corrigé         : {output_dir}")
+    print(f"{'='*70}\n")
+
+
+def compute_exit_code(results: list[dict]) -> int:
+    """Codes de sortie pour le Bot de Correction."""
+    files_passed = sum(1 for r in results if r["passed"])
+    if files_passed == len(results):
+        return 0  # Succès total
+    if files_passed > 0:
+        return 0  # Succès partiel (acceptable)
+    return 1  # Échec total
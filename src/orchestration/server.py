@@ -0,0 +1,358 @@
+"""
+server.py — Mode serveur : agents, client LLM, moteur pylint et caches
+gardés chauds entre les jobs, plus le client léger qui leur soumet du travail.
+API HTTP locale (127.0.0.1 uniquement) :
+    POST /jobs               {"target_dir", "files"?, "candidates"?, "batch_audit"?, "parallel"?}
+    GET  /jobs/<id>          état et résultats du job
+    GET  /jobs/<id>/events   progression en continu (une ligne JSON par événement)
+    GET  /health             jobs en attente / en cours
+Les jobs sont traités dans l'ordre d'arrivée, SERVE_MAX_JOBS à la fois. Les
+pools d'étapes sont partagés : les limites LLM / CPU valent pour l'ensemble
+des jobs. Chaque job écrit dans son propre dossier (sandbox/jobs/<id>) : deux
+jobs qui traitent un fichier de même nom ne se marchent pas dessus.
+Seules les requêtes locales sont acceptées (Host 127.0.0.1 / localhost, pas
+d'Origin étrangère, POST en application/json) : une page web ne peut pas
+soumettre de job. Le pipeline n'est importé qu'au démarrage du serveur, pas par le client.
+"""
+
+import itertools
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = int(os.getenv("SWARM_SERVE_PORT", "8765"))
+# Jobs traités simultanément (chacun avec son trio d'agents)
+SERVE_MAX_JOBS = int(os.getenv("SWARM_SERVE_JOBS", "1"))
+# Jobs en attente au-delà desquels une soumission est refusée (503)
+SERVE_QUEUE_LIMIT = int(os.getenv("SWARM_SERVE_QUEUE", "64"))
+# Jobs terminés gardés en mémoire pour /jobs/<id>
+MAX_FINISHED_JOBS = 100
+# Dossier de sortie de chaque job, sous le sandbox
+JOBS_DIR_NAME = "jobs"
+
+_TERMINAL_EVENTS = ("done", "failed")
+
+
+class Job:
+    """Un job : fichiers à traiter, événements de progression et résultats"""
+
+    def __init__(self, job_id: str, target_dir: str, files: list[str], options: dict):
+        self.id = job_id
+        self.target_dir = target_dir
+        self.files = files
+        self.options = options
+        self.status = "queued"
+        self.results = []
+        self.events = []
+        self.submitted = time.perf_counter()
+        self.started = None
+        self._changed = threading.Condition()
+
+    def emit(self, event: str, **fields) -> None:
+        with self._changed:
+            self.events.append({
+                "event": event, "job": self.id,
+                "t": round(time.perf_counter() - self.submitted, 3), **fields
+            })
+            self._changed.notify_all()
+
+    def stream(self):
+        """Événements passés puis à venir, jusqu'à la fin du job."""
+        sent = 0
+        while True:
+            with self._changed:
+                while sent == len(self.events):
+                    self._changed.wait()
+                pending = self.events[sent:]
+            sent += len(pending)
+            for event in pending:
+                yield event
+                if event["event"] in _TERMINAL_EVENTS:
+                    return
+
+    def summary(self) -> dict:
+        return {
+            "job": self.id, "status": self.status, "target_dir": self.target_dir,
+            "files": self.files, "results": self.results
+        }
+
+
+class JobServer:
+    """File de jobs servie par SERVE_MAX_JOBS threads aux agents chauds"""
+
+    def __init__(self, max_jobs: int = SERVE_MAX_JOBS):
+        self.max_jobs = max(max_jobs, 1)
+        self.jobs = {}
+        self.pending = queue.Queue()
+        self.running = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def warm_up(self) -> None:
+        """Imports, client LLM, workers pylint, pools d'étapes et fix store."""
+        from src.agents.auditor_agent import AuditorAgent
+        from src.agents.fixer_agent import FixerAgent
+        from src.agents.judge_agent import JudgeAgent
+        from src.utils.fix_store import FixStore, FIX_STORE_ENABLED
+        from src.utils.gemini_client import warm_up as warm_up_llm
+        from src.utils.stages import configure_stages, CPU_COUNT
+        from src.utils.tools import enable_warm_lint
+
+        warm_up_llm()
+        enable_warm_lint(CPU_COUNT)
+        self.pools = configure_stages()
+        self.fix_store = FixStore() if FIX_STORE_ENABLED else None
+        for _ in range(self.max_jobs):
+            agents = (AuditorAgent(), FixerAgent(), JudgeAgent())
+            threading.Thread(target=self._work, args=(agents,), daemon=True).start()
+
+    def submit(self, payload: dict) -> Job:
+        """Crée et met en file un job (ValueError si la requête est invalide)."""
+        target_dir = payload.get("target_dir")
+        if not isinstance(target_dir, str) or not os.path.isdir(target_dir):
+            raise ValueError(f"Le dossier {target_dir} n'existe pas.")
+        files = payload.get("files") or _python_files(target_dir)
+        if not isinstance(files, list) or not all(_is_module_name(f) for f in files):
+            raise ValueError("\"files\" doit être une liste de noms de fichiers .py (sans chemin)")
+        missing = [f for f in files if not os.path.isfile(os.path.join(target_dir, f))]
+        if missing:
+            raise ValueError(f"Fichier(s) introuvable(s) : {', '.join(missing)}")
+        if not files:
+            raise ValueError(f"Aucun fichier Python à traiter dans {target_dir}")
+        if self.pending.qsize() >= SERVE_QUEUE_LIMIT:
+            raise OverflowError(f"File d'attente pleine ({SERVE_QUEUE_LIMIT} jobs)")
+
+        options = {
+            "batch_audit": bool(payload.get("batch_audit", False)),
+            "num_candidates": int(payload.get("candidates", 1)),
+            "parallel_components": int(payload.get("parallel", 1))
+        }
+        with self._lock:
+            job = Job(f"job-{next(self._ids)}", os.path.abspath(target_dir), files, options)
+            self.jobs[job.id] = job
+            self._prune()
+        job.emit("queued", files=len(files), position=self.pending.qsize() + 1)
+        self.pending.put(job)
+        print(f"[SERVER] 📥 {job.id} : {len(files)} fichier(s) de {job.target_dir}")
+        return job
+
+    def health(self) -> dict:
+        with self._lock:
+            return {"status": "ok", "queued": self.pending.qsize(), "running": self.running,
+                    "max_jobs": self.max_jobs}
+
+    def _work(self, agents: tuple) -> None:
+        while True:
+            job = self.pending.get()
+            with self._lock:
+                self.running += 1
+            try:
+                self._run(job, agents)
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+    def _run(self, job: Job, agents: tuple) -> None:
+        from src.orchestration.pipeline import run_files, compute_exit_code
+        from src.utils.tools import SANDBOX_OUTPUT_DIR, _assert_in_sandbox
+
+        job.status = "running"
+        job.started = time.perf_counter()
+        queue_wait_s = round(job.started - job.submitted, 3)
+        job.emit("started", queue_wait_s=queue_wait_s)
+
+        def on_result(result):
+            job.emit("file", **{k: result.get(k) for k in ("file", "passed", "iterations", "error",
+                                                           "fix_reused")})
+
+        try:
+            # Sortie propre au job (un dossier restant d'un serveur précédent est remplacé)
+            output_dir = _assert_in_sandbox(os.path.join(SANDBOX_OUTPUT_DIR, JOBS_DIR_NAME, job.id))
+            shutil.rmtree(output_dir, ignore_errors=True)
+            os.makedirs(output_dir)
+            job.results = run_files(job.target_dir, job.files, on_result=on_result,
+                                    agents=agents, fix_store=self.fix_store, pools=self.pools,
+                                    output_dir=output_dir, **job.options)
+        except Exception as e:  # un job en échec ne doit pas arrêter le serveur
+            job.status = "failed"
+            job.emit("failed", error=f"{type(e).__name__}: {e}")
+            print(f"[SERVER] ❌ {job.id} : {e}")
+            return
+
+        job.status = "done"
+        elapsed_s = round(time.perf_counter() - job.started, 3)
+        job.emit("done", exit_code=compute_exit_code(job.results), total=len(job.results),
+                 passed=sum(1 for r in job.results if r["passed"]), elapsed_s=elapsed_s,
+                 queue_wait_s=queue_wait_s, output_dir=output_dir)
+        print(f"[SERVER] ✅ {job.id} terminé en {elapsed_s:.1f}s")
+
+    def _prune(self) -> None:
+        finished = [j for j in self.jobs.values() if j.status in ("done", "failed")]
+        for job in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self.jobs[job.id]
+
+
+def _is_module_name(name) -> bool:
+    """Nom de fichier .py simple : ni chemin, ni "..", ni séparateur."""
+    return (isinstance(name, str) and name.endswith(".py") and len(name) > 3
+            and ".." not in name and not any(sep in name for sep in ("/", "\\", "\0")))
+
+
+def _python_files(target_dir: str) -> list[str]:
+    """Même sélection que main.py : fichiers .py hors tests."""
+    return sorted(f for f in os.listdir(target_dir) if f.endswith(".py") and not f.startswith("test_"))
+
+
+# ══════════════════════════════════════════════════════════════════════════
+#  API HTTP
+# ══════════════════════════════════════════════════════════════════════════
+
+def _make_handler(server: JobServer, port: int):
+    local_hosts = {f"{host}:{port}" for host in (SERVE_HOST, "localhost")}
+    local_origins = {f"http://{host}" for host in local_hosts}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _foreign_request(self):
+            """
+            Raison du refus d'une requête non locale, sinon None. Host : DNS
+            rebinding ; Origin : page web (le client CLI n'en envoie pas).
+            """
+            if self.headers.get("Host") not in local_hosts:
+                return "Host non autorisé"
+            origin = self.headers.get("Origin")
+            if origin is not None and origin not in local_origins:
+                return "Origin non autorisée"
+            return None
+
+        def do_GET(self):
+            refused = self._foreign_request()
+            if refused:
+                return self._json(403, {"error": refused})
+            parts = self.path.strip("/").split("/")
+            if parts == ["health"]:
+                return self._json(200, server.health())
+            job = server.jobs.get(parts[1]) if len(parts) >= 2 and parts[0] == "jobs" else None
+            if job is None:
+                return self._json(404, {"error": "job inconnu"})
+            if parts[2:] == ["events"]:
+                return self._stream(job)
+            return self._json(200, job.summary())
+
+        def do_POST(self):
+            refused = self._foreign_request()
+            if refused:
+                return self._json(403, {"error": refused})
+            if self.path.rstrip("/") != "/jobs":
+                return self._json(404, {"error": "route inconnue"})
+            # Un formulaire ou un fetch "simple" (text/plain) ne peut pas poser ce type sans preflight
+            content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if content_type != "application/json":
+                return self._json(415, {"error": "Content-Type application/json requis"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                job = server.submit(json.loads(self.rfile.read(length) or b"{}"))
+            except OverflowError as e:
+                return self._json(503, {"error": str(e)})
+            except (ValueError, TypeError) as e:
+                return self._json(400, {"error": str(e)})
+            return self._json(202, {"job": job.id, "files": job.files})
+
+        def _json(self, code: int, body: dict):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _stream(self, job: Job):
+            # Sans Content-Length : la connexion est fermée à la fin du job
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            try:
+                for event in job.stream():
+                    self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client parti, le job continue
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            pass  # une ligne par requête noierait les logs du pipeline
+
+    return Handler
+
+
+def serve(port: int = SERVE_PORT, max_jobs: int = SERVE_MAX_JOBS) -> None:
+    """Démarre le serveur (bloquant, Ctrl+C pour arrêter)."""
+    started = time.perf_counter()
+    server = JobServer(max_jobs)
+    server.warm_up()
+    httpd = ThreadingHTTPServer((SERVE_HOST, port), _make_handler(server, port))
+    httpd.daemon_threads = True
+    print(f"[SERVER] 🚀 En écoute sur http://{SERVE_HOST}:{port} "
+          f"({server.max_jobs} job(s) simultané(s), prêt en {time.perf_counter() - started:.1f}s)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[SERVER] 🛑 Arrêt")
+    finally:
+        httpd.server_close()
+        from src.utils.tools import disable_warm_lint
+        disable_warm_lint()
+
+
+# ══════════════════════════════════════════════════════════════════════════
+#  CLIENT
+# ══════════════════════════════════════════════════════════════════════════
+
+def submit(target_dir: str, files: list[str] = None, port: int = SERVE_PORT, **options) -> int:
+    """
+    Soumet un job au serveur local et affiche sa progression.
+    Retourne le code de sortie du job (1 si le serveur est injoignable).
+    """
+    base_url = f"http://{SERVE_HOST}:{port}"
+    payload = {"target_dir": os.path.abspath(target_dir), "files": files, **options}
+    request = urllib.request.Request(f"{base_url}/jobs", data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            job_id = json.load(response)["job"]
+        with urllib.request.urlopen(f"{base_url}/jobs/{job_id}/events") as events:
+            for line in events:
+                event = json.loads(line)
+                _print_event(event)
+                if event["event"] in _TERMINAL_EVENTS:
+                    return event.get("exit_code", 1)
+    except urllib.error.HTTPError as e:
+        print(f"❌ ERREUR : {json.load(e).get('error', e.reason)}")
+        return 1
+    except urllib.error.URLError:
+        print(f"❌ ERREUR : aucun serveur sur {base_url} (lancer `python main.py --serve`)")
+        return 1
+    print("❌ ERREUR : connexion au serveur interrompue")
+    return 1
+
+
+def _print_event(event: dict) -> None:
+    kind = event["event"]
+    if kind == "queued":
+        print(f"[CLIENT] 📥 {event['job']} : {event['files']} fichier(s), position {event['position']}")
+    elif kind == "started":
+        print(f"[CLIENT] ▶️  Démarré (attente : {event['queue_wait_s']:.1f}s)")
+    elif kind == "file":
+        status = "✅" if event["passed"] else "⚠️ "
+        reused = " ♻️" if event.get("fix_reused") else ""
+        print(f"[CLIENT] {status} {event['file']} ({event['iterations']} itération(s)){reused}")
+    elif kind == "done":
+        print(f"[CLIENT] 🏁 {event['passed']}/{event['total']} fichier(s) validé(s) en "
+              f"{event['elapsed_s']:.1f}s — code corrigé : {event['output_dir']}")
+    elif kind == "failed":
+        print(f"[CLIENT] ❌ Job en échec : {event['error']}")
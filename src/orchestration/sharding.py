@@ -0,0 +1,174 @@
+"""
+sharding.py — Mode coordinateur : répartit les fichiers sur N processus workers.
+Chaque worker a son sous-arbre sandbox/, son segment de log et (optionnel) sa
+propre clé API. Le coordinateur fusionne les résultats et réassigne les
+fichiers non terminés d'un worker qui a crashé.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+from src.orchestration.import_graph import build_import_graph, connected_components
+from src.orchestration.cost_model import estimate_costs, longest_first
+from src.utils.logger import merge_log_segments
+
+SEGMENTS_DIR = os.path.join("logs", "segments")
+MAIN_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "main.py"))
+MAX_ATTEMPTS = 3
+
+
+def shard_files(filenames: list[str], num_shards: int, graph: dict = None,
+                costs: dict = None) -> list[list[str]]:
+    """
+    Répartition déterministe en `num_shards` lots. Avec le graphe d'imports,
+    une composante (modules qui s'importent) reste dans un même lot : les
+    plus grosses d'abord, chacune dans le lot le moins chargé. Avec `costs`
+    (secondes estimées par fichier), la charge d'un lot est son coût estimé
+    et les composantes les plus coûteuses sont placées en premier.
+    """
+    shards = [[] for _ in range(num_shards)]
+    groups = connected_components(graph) if graph else [[f] for f in sorted(filenames)]
+    if costs:
+        groups = longest_first(groups, costs)
+
+    def load(i):
+        return sum(costs.get(f, 0.0) for f in shards[i]) if costs else len(shards[i])
+
+    balanced = bool(graph or costs)
+    for idx, group in enumerate(groups):
+        target = min(range(num_shards), key=lambda i: (load(i), i)) if balanced else idx % num_shards
+        shards[target].extend(group)
+    return [s for s in shards if s]
+
+
+def read_results_file(path: str) -> list[dict]:
+    """Lit le fichier de résultats d'un worker (liste vide si absent/illisible)."""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return []
+
+
+def write_results_file(path: str, results: list[dict]) -> None:
+    """Écriture atomique : un worker tué en cours d'écriture ne corrompt rien."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class ShardCoordinator:
+    """Lance les workers, surveille les crashs et fusionne les résultats"""
+
+    def __init__(self, target_dir: str, num_workers: int, api_keys: list[str] = None,
+                 resume: bool = False, worker_args: list[str] = None):
+        self.target_dir = target_dir
+        self.num_workers = num_workers
+        self.api_keys = api_keys or []
+        self.resume = resume
+        self.worker_args = worker_args or []  # options transmises telles quelles
+        self.segment_files = []
+
+    def run(self, filenames: list[str]) -> list[dict]:
+        os.makedirs(SEGMENTS_DIR, exist_ok=True)
+
+        running = {}  # worker_id -> (process, shard_index, attempt, files)
+        graph = build_import_graph(self.target_dir, filenames)
+        # Sans pylint : le cache du coordinateur ne profiterait pas aux workers
+        costs = estimate_costs(self.target_dir, filenames, with_pylint=False)
+        for shard_index, files in enumerate(shard_files(filenames, self.num_workers, graph, costs)):
+            self._launch(running, shard_index, 1, files)
+
+        results = {}
+        try:
+            while running:
+                time.sleep(0.5)
+                for worker_id in list(running):
+                    process, shard_index, attempt, files = running[worker_id]
+                    if process.poll() is None:
+                        continue
+                    del running[worker_id]
+
+                    done = read_results_file(self._results_path(worker_id))
+                    for r in done:
+                        results[r["file"]] = r
+
+                    unfinished = [f for f in files if f not in results]
+                    if not unfinished:
+                        print(f"[COORD] ✅ Worker {worker_id} terminé ({len(files)} fichier(s))")
+                        continue
+
+                    print(f"[COORD] ⚠️  Worker {worker_id} arrêté (code {process.returncode}), "
+                          f"{len(unfinished)} fichier(s) non terminé(s)")
+                    if attempt < MAX_ATTEMPTS:
+                        self._launch(running, shard_index, attempt + 1, unfinished)
+                    else:
+                        for f in unfinished:
+                            results[f] = {
+                                "file": f,
+                                "passed": False,
+                                "fixed_path": None,
+                                "iterations": 0,
+                                "error": f"Worker crash ({MAX_ATTEMPTS} tentatives)"
+                            }
+        finally:
+            for process, _, _, _ in running.values():
+                process.kill()
+            merged = merge_log_segments(self.segment_files)
+            print(f"[COORD] 📊 {merged} entrée(s) de log fusionnée(s)")
+
+        return [results[f] for f in sorted(results)]
+
+    # ══════════════════════════════════════════════════════════════════════
+    #  UTILITAIRES
+    # ══════════════════════════════════════════════════════════════════════
+
+    def _launch(self, running: dict, shard_index: int, attempt: int, files: list[str]) -> None:
+        """Démarre un worker sur `files` (sous-processus main.py)."""
+        worker_id = f"shard{shard_index}-a{attempt}"
+        files_path = os.path.join(SEGMENTS_DIR, f"{worker_id}.files.json")
+        with open(files_path, "w", encoding="utf-8") as f:
+            json.dump(files, f)
+
+        segment = os.path.join(SEGMENTS_DIR, f"{worker_id}.log.json")
+        self.segment_files.append(segment)
+
+        env = dict(os.environ)
+        env["SWARM_WORKER_ID"] = worker_id
+        env["SWARM_LOG_FILE"] = segment
+        env["SWARM_SANDBOX_SUBDIR"] = f"shard_{shard_index}"
+        # Checkpoint par shard : une relance reprend le travail du worker crashé
+        env["SWARM_CHECKPOINT_FILE"] = os.path.join(SEGMENTS_DIR, f"shard{shard_index}.checkpoint.jsonl")
+        if self.api_keys:
+            env["GOOGLE_API_KEY"] = self.api_keys[shard_index % len(self.api_keys)]
+
+        cmd = [
+            sys.executable, MAIN_SCRIPT,
+            "--target_dir", self.target_dir,
+            "--files-from", files_path,
+            "--results-file", self._results_path(worker_id),
+            *self.worker_args
+        ]
+        if self.resume or attempt > 1:
+            cmd.append("--resume")
+
+        # Un fichier de résultats d'un run précédent ne doit pas compter comme fait
+        if os.path.exists(self._results_path(worker_id)):
+            os.remove(self._results_path(worker_id))
+        log_path = os.path.join(SEGMENTS_DIR, f"{worker_id}.out.txt")
+        with open(log_path, "w", encoding="utf-8") as out:
+            process = subprocess.Popen(cmd, env=env, stdout=out, stderr=subprocess.STDOUT)
+
+        print(f"[COORD] 🚀 Worker {worker_id} : {len(files)} fichier(s) (sortie : {log_path})")
+        running[worker_id] = (process, shard_index, attempt, files)
+
+    @staticmethod
+    def _results_path(worker_id: str) -> str:
+        return os.path.join(SEGMENTS_DIR, f"{worker_id}.results.json")
@@ -0,0 +1,253 @@
+"""
+watcher.py — Mode --watch : retraite en continu les fichiers modifiés.
+- Surveillance de target_dir par inotify (ctypes, Linux), sinon par scrutation
+- Anti-rebond : un lot part après WATCH_DEBOUNCE_S sans nouvelle modification
+- Un fichier modifié pendant son traitement est annulé puis remis en file
+- Agents, pylint, fix store et tests générés restent chauds d'un lot à l'autre
+"""
+
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+# Délai sans modification avant de lancer un lot (s)
+WATCH_DEBOUNCE_S = float(os.getenv("SWARM_WATCH_DEBOUNCE_S", "0.5"))
+# Période de scrutation quand inotify n'est pas disponible (s)
+WATCH_POLL_S = float(os.getenv("SWARM_WATCH_POLL_S", "1.0"))
+
+
+def _is_target(filename: str) -> bool:
+    """Même sélection que main.py : fichiers .py hors tests."""
+    return filename.endswith(".py") and not filename.startswith("test_")
+
+
+# ══════════════════════════════════════════════════════════════════════════
+#  SURVEILLANCE DU DOSSIER
+# ══════════════════════════════════════════════════════════════════════════
+
+class InotifyWatcher:
+    """inotify via la libc : réveil immédiat à chaque écriture terminée"""
+
+    name = "inotify"
+    # IN_CLOSE_WRITE | IN_MOVED_TO (écriture atomique par renommage des éditeurs)
+    _MASK = 0x00000008 | 0x00000080
+    _IN_NONBLOCK = os.O_NONBLOCK
+    _IN_CLOEXEC = 0o2000000
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, target_dir: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(self._IN_NONBLOCK | self._IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        if libc.inotify_add_watch(self.fd, os.fsencode(target_dir), self._MASK) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch")
+
+    def wait(self, timeout: float) -> set:
+        """Fichiers écrits pendant au plus `timeout` secondes."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed, offset = set(), 0
+        while offset + self._EVENT.size <= len(data):
+            _, _, _, length = self._EVENT.unpack_from(data, offset)
+            offset += self._EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if _is_target(name):
+                changed.add(name)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Repli portable : comparaison (mtime, taille) toutes les WATCH_POLL_S secondes"""
+
+    name = "scrutation"
+
+    def __init__(self, target_dir: str):
+        self.target_dir = target_dir
+        self.snapshot = self._scan()
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        for entry in os.scandir(self.target_dir):
+            if _is_target(entry.name) and entry.is_file():
+                stat = entry.stat()
+                snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: float) -> set:
+        time.sleep(max(timeout, WATCH_POLL_S))
+        current = self._scan()
+        changed = {f for f, sig in current.items() if self.snapshot.get(f) != sig}
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(target_dir: str):
+    """inotify si disponible (Linux), sinon scrutation."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(target_dir)
+        except (OSError, AttributeError):
+            pass  # libc sans inotify, limite de watches atteinte...
+    return PollingWatcher(target_dir)
+
+
+# ══════════════════════════════════════════════════════════════════════════
+#  BOUCLE DE RETRAITEMENT
+# ══════════════════════════════════════════════════════════════════════════
+
+class WatchSession:
+    """
+    Fichiers modifiés → lots anti-rebondis → run_files dans un thread de
+    traitement, avec les mêmes agents et caches d'un lot à l'autre.
+    """
+
+    def __init__(self, target_dir: str, run_options: dict):
+        from src.agents.auditor_agent import AuditorAgent
+        from src.agents.fixer_agent import FixerAgent
+        from src.agents.judge_agent import JudgeAgent
+        from src.utils.fix_store import FixStore, FIX_STORE_ENABLED
+        from src.utils.stages import configure_stages, CPU_COUNT
+        from src.utils.tools import enable_warm_lint
+
+        self.target_dir = target_dir
+        self.run_options = run_options
+        enable_warm_lint(CPU_COUNT)
+        self.pools = configure_stages()
+        self.fix_store = FixStore() if FIX_STORE_ENABLED else None
+        self.agents = (AuditorAgent(), FixerAgent(), JudgeAgent())
+
+        self.results = {}        # fichier -> dernier résultat
+        self.processed = {}      # fichier -> empreinte du contenu traité
+        self.dirty = set()       # modifiés, en anti-rebond
+        self.ready = set()       # prêts pour le prochain lot
+        self.in_flight = set()
+        self.cancel = set()
+        self.last_change = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+
+    def run(self, initial_files: list[str]) -> dict:
+        """Traite `initial_files` puis chaque modification, jusqu'à Ctrl+C."""
+        watcher = create_watcher(self.target_dir)
+        print(f"[WATCH] 👀 Surveillance de {self.target_dir} ({watcher.name}, "
+              f"anti-rebond {WATCH_DEBOUNCE_S}s) — Ctrl+C pour arrêter")
+        worker = threading.Thread(target=self._process_batches, daemon=True)
+        worker.start()
+        self._enqueue(initial_files)
+        try:
+            while True:
+                self._on_changes(watcher.wait(WATCH_DEBOUNCE_S))
+        except KeyboardInterrupt:
+            print("\n[WATCH] 🛑 Arrêt")
+        finally:
+            watcher.close()
+            with self._lock:
+                self._stop = True
+                self.cancel.update(self.in_flight)
+            self._wake.set()
+            worker.join()
+        return self.results
+
+    def _on_changes(self, changed: set) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if changed:
+                self.dirty |= changed
+                self.last_change = now
+                # Modifié en cours de traitement : annulé, repris au prochain lot
+                for filename in changed & self.in_flight:
+                    if filename not in self.cancel:
+                        print(f"[WATCH] ⏹️  {filename} modifié pendant son traitement")
+                    self.cancel.add(filename)
+            if self.dirty and now - self.last_change >= WATCH_DEBOUNCE_S:
+                batch, self.dirty = self.dirty, set()
+            else:
+                batch = set()
+        if batch:
+            self._enqueue(batch)
+
+    def _enqueue(self, files) -> None:
+        files = {f for f in files if os.path.isfile(os.path.join(self.target_dir, f))}
+        with self._lock:
+            self.ready |= files
+        if files:
+            self._wake.set()
+
+    def _process_batches(self) -> None:
+        from src.orchestration.pipeline import run_files
+
+        while True:
+            self._wake.wait()
+            with self._lock:
+                self._wake.clear()
+                if self._stop:
+                    return
+                batch = sorted(f for f in self.ready if self._content_changed(f))
+                self.ready.clear()
+                self.in_flight = set(batch)
+                self.cancel -= self.in_flight
+            if not batch:
+                continue
+
+            print(f"\n[WATCH] 🔄 {len(batch)} fichier(s) à retraiter : {', '.join(batch)}")
+            digests = {f: self._digest(f) for f in batch}
+            started = time.perf_counter()
+            results = run_files(self.target_dir, batch, agents=self.agents, fix_store=self.fix_store,
+                                pools=self.pools, cancelled=self._is_cancelled, **self.run_options)
+            with self._lock:
+                for result in results:
+                    self.results[result["file"]] = result
+                    self.processed[result["file"]] = digests[result["file"]]
+                self.in_flight = set()
+
+            passed = sum(1 for r in results if r["passed"])
+            print(f"[WATCH] ✅ {passed}/{len(results)} validé(s) en {time.perf_counter() - started:.1f}s"
+                  f" — en attente de modifications")
+
+    def _is_cancelled(self, filename: str) -> bool:
+        with self._lock:
+            return filename in self.cancel
+
+    def _content_changed(self, filename: str) -> bool:
+        """Un enregistrement sans modification du contenu ne relance rien."""
+        return self.processed.get(filename) != self._digest(filename)
+
+    def _digest(self, filename: str):
+        try:
+            with open(os.path.join(self.target_dir, filename), "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+
+
+def watch(target_dir: str, initial_files: list[str], **run_options) -> list[dict]:
+    """Mode --watch (bloquant) ; retourne le dernier résultat de chaque fichier."""
+    from src.utils.tools import disable_warm_lint, SANDBOX_OUTPUT_DIR
+
+    if os.path.abspath(target_dir) == os.path.abspath(SANDBOX_OUTPUT_DIR):
+        raise ValueError("--watch sur le dossier de sortie du sandbox retraiterait ses propres corrections")
+    try:
+        return list(WatchSession(target_dir, run_options).run(initial_files).values())
+    finally:
+        disable_warm_lint()
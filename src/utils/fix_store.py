@@ -0,0 +1,120 @@
+"""
+fix_store.py — Mémoire des corrections validées, entre fichiers et entre runs.
+La clé est une empreinte du code d'entrée normalisé (AST sans docstrings,
+ou tokens sans commentaires si le code ne se parse pas) : un même extrait
+bogué sous un autre nom, d'autres commentaires ou une autre mise en page
+retrouve la correction déjà validée par le Judge.
+"""
+
+import ast
+import hashlib
+import io
+import json
+import os
+import threading
+import tokenize
+from datetime import datetime
+
+FIX_STORE_FILE = os.path.join("logs", "fix_store.json")
+FIX_STORE_ENABLED = os.getenv("SWARM_FIX_STORE", "1") != "0"
+
+
+def code_fingerprint(code: str):
+    """Empreinte normalisée d'un module (None si le code n'est même pas tokenisable)."""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return _token_fingerprint(code)
+
+    for node in ast.walk(tree):
+        body = getattr(node, "body", None)
+        if (isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+                and body and isinstance(body[0], ast.Expr)
+                and isinstance(body[0].value, ast.Constant) and isinstance(body[0].value.value, str)):
+            node.body = body[1:] or [ast.Pass()]
+    return "ast:" + hashlib.sha256(ast.dump(tree).encode("utf-8")).hexdigest()
+
+
+def _token_fingerprint(code: str):
+    """Repli pour du code non parsable : tokens significatifs, sans commentaires ni blancs."""
+    ignored = {tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.ENDMARKER}
+    try:
+        tokens = [
+            (tok.type, tok.string) for tok in tokenize.generate_tokens(io.StringIO(code).readline)
+            if tok.type not in ignored
+        ]
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+    return "tok:" + hashlib.sha256(repr(tokens).encode("utf-8")).hexdigest()
+
+
+class FixStore:
+    """Corrections validées indexées par empreinte du code d'entrée (logs/fix_store.json)"""
+
+    def __init__(self, path: str = FIX_STORE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = self._load()  # empreinte -> {"fixed_code", "source_file", "hits", "created"}
+
+    def lookup(self, code: str):
+        """Code corrigé déjà validé pour ce code d'entrée, ou None."""
+        fingerprint = code_fingerprint(code)
+        with self._lock:
+            entry = self.entries.get(fingerprint) if fingerprint else None
+        return entry["fixed_code"] if entry else None
+
+    def record_hit(self, code: str) -> None:
+        """Compte une réutilisation (statistique persistée)."""
+        fingerprint = code_fingerprint(code)
+        with self._lock:
+            if fingerprint in self.entries:
+                self.entries[fingerprint]["hits"] += 1
+        self._save()
+
+    def record(self, original_code: str, fixed_code: str, source_file: str) -> None:
+        """Enregistre une correction validée par le Judge."""
+        fingerprint = code_fingerprint(original_code)
+        if not fingerprint:
+            return
+        with self._lock:
+            self.entries[fingerprint] = {
+                "fixed_code": fixed_code,
+                "source_file": source_file,
+                "hits": self.entries.get(fingerprint, {}).get("hits", 0),
+                "created": datetime.now().isoformat()
+            }
+        self._save()
+
+    # ══════════════════════════════════════════════════════════════════════
+    #  PERSISTANCE
+    # ══════════════════════════════════════════════════════════════════════
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (json.JSONDecodeError, OSError):
+            return {}
+
+    def _save(self) -> None:
+        """
+        Écriture atomique, fusionnée avec le fichier sur disque : les workers
+        du mode shardé partagent le même store.
+        """
+        with self._lock:
+            merged = self._load()
+            for fingerprint, entry in self.entries.items():
+                on_disk = merged.get(fingerprint)
+                if on_disk:
+                    entry["hits"] = max(entry["hits"], on_disk.get("hits", 0))
+                merged[fingerprint] = entry
+            self.entries = merged
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(merged, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
@@ -2,54 +2,236 @@
 gemini_client.py — Wrapper pour l'API Google Gemini (CORRIGÉ)
 """
 
+import importlib.util
 import os
-import sys
+import threading
+import time
 
-try:
-    import google.generativeai as genai
-except ImportError:
-    print("[ERREUR] Le package 'google-generativeai' n'est pas installé.")
-    print("         Lancez : pip install google-generativeai")
-    sys.exit(1)
+from src.utils.hedging import hedged
+from src.utils.prompt_builder import estimate_tokens
 
-from dotenv import load_dotenv
-
-# Charge les variables d'environnement depuis .env
+# Le SDK (import coûteux) et la configuration sont chargés au premier appel :
+# `main.py --help`, les outils hors-ligne et les imports d'agents restent rapides.
 _PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-load_dotenv(os.path.join(_PROJECT_ROOT, ".env"))
+_genai = None
+_init_lock = threading.Lock()
+_models = {}  # nom -> GenerativeModel
+
+
+class GeminiConfigError(RuntimeError):
+    """SDK absent ou GOOGLE_API_KEY non configurée."""
+
+
+def _load_env() -> None:
+    """Charge les variables d'environnement depuis .env (sans écraser l'existant)."""
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(_PROJECT_ROOT, ".env"))
+
+
+def check_config():
+    """
+    Vérifie la configuration sans importer le SDK.
+    Retourne None si tout est prêt, sinon le message d'erreur à afficher.
+    """
+    _load_env()
+    try:
+        sdk_found = importlib.util.find_spec("google.generativeai") is not None
+    except ModuleNotFoundError:  # paquet parent "google" absent
+        sdk_found = False
+    if not sdk_found:
+        return ("Le package 'google-generativeai' n'est pas installé.\n"
+                "         Lancez : pip install google-generativeai")
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key or api_key.startswith("AIzaSy..."):
+        return ("GOOGLE_API_KEY non configurée dans .env\n"
+                "         Copiez .env.example vers .env et ajoutez votre clé.")
+    return None
+
+
+def _get_genai():
+    """Importe et configure le SDK au premier appel (thread-safe)."""
+    global _genai
+    if _genai is None:
+        with _init_lock:
+            if _genai is None:
+                error = check_config()
+                if error:
+                    raise GeminiConfigError(error)
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+                _genai = genai
+    return _genai
+
 
-# ─── Configuration de l'API ─────────────────────────────────────────────────
-_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not _API_KEY or _API_KEY.startswith("AIzaSy..."):
-    print("[ERREUR] GOOGLE_API_KEY non configurée dans .env")
-    print("         Copiez .env.example vers .env et ajoutez votre clé.")
-    sys.exit(1)
+def _get_model(model_name: str):
+    """Modèle créé une fois par nom puis réutilisé (client gardé chaud)."""
+    model = _models.get(model_name)
+    if model is None:
+        # Créer le modèle SANS system_instruction
+        model = _models.setdefault(model_name, _get_genai().GenerativeModel(model_name=model_name))
+    return model
+
+
+def warm_up() -> None:
+    """Charge le SDK et le modèle par défaut avant le premier appel (mode serveur)."""
+    _get_model(MODEL_NAME)
 
-genai.configure(api_key=_API_KEY)
 
 # ─── Modèle utilisé ─────────────────────────────────────────────────────────
 MODEL_NAME = "models/gemini-2.5-flash"
 
 
+# Sortie structurée (response_mime_type) : absente des anciennes versions du SDK
+_JSON_MODE_SUPPORTED = True
+
+# Streaming : la réponse est vérifiée au fil des chunks et abandonnée dès
+# qu'elle sort du format attendu (SWARM_LLM_STREAMING=0 pour désactiver)
+STREAMING_ENABLED = os.getenv("SWARM_LLM_STREAMING", "1") != "0"
+MAX_STREAM_ATTEMPTS = 2
+
+
+class StreamAborted(Exception):
+    """Réponse abandonnée en cours de streaming (hors format)."""
+
+
 # ─── Fonction principale d'appel ────────────────────────────────────────────
-def call_gemini(system_prompt: str, user_prompt: str) -> str:
+def call_gemini(system_prompt: str, user_prompt: str, json_mode: bool = False,
+                model_name: str = None, temperature: float = None) -> str:
     """
     Appelle Gemini avec un system_prompt et un user_prompt.
     Retourne la réponse brute sous forme de chaîne.
+    `json_mode` : demande une réponse application/json à l'API (si supporté).
+    `model_name` : modèle choisi par le routeur (MODEL_NAME par défaut).
+    `temperature` : variation des candidats en mode best-of-N.
     
     CORRIGÉ : system_instruction va dans generate_content(), pas dans le modèle
     """
-    # Créer le modèle SANS system_instruction
-    model = genai.GenerativeModel(model_name=MODEL_NAME)
+    response = _generate(system_prompt, user_prompt, json_mode, model_name, temperature)
+    return _response_text(response)
+
+
+def call_gemini_stream(system_prompt: str, user_prompt: str, check=None, json_mode: bool = False,
+                       model_name: str = None, temperature: float = None) -> tuple[str, dict]:
+    """
+    Variante streaming de call_gemini.
+    `check(texte_reçu)` est appelé à chaque chunk et retourne None (continuer),
+    "useful" (contenu exploitable reçu) ou la raison d'un abandon ; un abandon
+    relance la requête (la dernière tentative va jusqu'au bout).
+
+    Returns:
+        (réponse complète, métriques : stream_first_chunk_s, stream_first_useful_s,
+         stream_aborts, stream_wasted_tokens)
+    """
+    stats = {"stream_first_chunk_s": None, "stream_first_useful_s": None,
+             "stream_aborts": 0, "stream_wasted_tokens": 0}
+    if not STREAMING_ENABLED or check is None:
+        return call_gemini(system_prompt, user_prompt, json_mode, model_name, temperature), stats
+
+    started = time.perf_counter()  # délais mesurés depuis la première tentative
+    for attempt in range(1, MAX_STREAM_ATTEMPTS + 1):
+        try:
+            text = _consume_stream(
+                _generate(system_prompt, user_prompt, json_mode, model_name, temperature, stream=True),
+                check, stats, started, can_abort=attempt < MAX_STREAM_ATTEMPTS
+            )
+        except StreamAborted as e:
+            stats["stream_aborts"] += 1
+            stats["stream_wasted_tokens"] += e.args[1]
+            print(f"[LLM] ✋ Réponse abandonnée en streaming ({e.args[0]}), nouvel essai")
+            continue
+        return text, stats
+
+
+# ─── Utilitaires ────────────────────────────────────────────────────────────
+def _generate(system_prompt, user_prompt, json_mode, model_name, temperature, stream=False):
+    """
+    generate_content avec repli si le SDK ne connaît pas response_mime_type,
+    doublé si la réponse tarde (src/utils/hedging.py).
+    """
+    model = _get_model(model_name or MODEL_NAME)
 
     # Combiner system_prompt + user_prompt dans le contenu
     full_prompt = f"{system_prompt}\n\n{user_prompt}"
 
-    # Générer la réponse
-    response = model.generate_content(full_prompt)
+    generation_config = {}
+    if temperature is not None:
+        generation_config["temperature"] = temperature
+    if json_mode and _JSON_MODE_SUPPORTED:
+        generation_config["response_mime_type"] = "application/json"
+    kwargs = {"stream": True} if stream else {}
+
+    # Latence apprise séparément par modèle et selon le streaming (premier chunk)
+    key = f"{model_name or MODEL_NAME}{' (stream)' if stream else ''}"
+    return hedged(key, lambda: _send(model, full_prompt, generation_config, kwargs))
+
+
+def _send(model, full_prompt: str, generation_config: dict, kwargs: dict):
+    """Une requête generate_content (un appel doublé en envoie deux)."""
+    global _JSON_MODE_SUPPORTED
+
+    generation_config = dict(generation_config)
+    if "response_mime_type" in generation_config and not _JSON_MODE_SUPPORTED:
+        generation_config.pop("response_mime_type")
+    try:
+        return model.generate_content(full_prompt, generation_config=generation_config or None, **kwargs)
+    except (TypeError, ValueError):
+        if "response_mime_type" not in generation_config:
+            raise
+        # SDK trop ancien : champ inconnu de GenerationConfig
+        _JSON_MODE_SUPPORTED = False
+        generation_config.pop("response_mime_type")
+        return model.generate_content(full_prompt, generation_config=generation_config or None, **kwargs)
+
 
-    # Extraction du texte de la réponse
+def _response_text(response) -> str:
+    """Texte d'une réponse (ou d'un chunk) ; chaîne vide si aucun contenu."""
     if response.candidates and response.candidates[0].content.parts:
         return response.candidates[0].content.parts[0].text
-    
     return ""
+
+
+def _cancel_stream(response, chunks) -> None:
+    """
+    Annule un flux en cours : réponse, itérateur gRPC/HTTP sous-jacent du SDK
+    (`_iterator`) et itérateur des chunks, selon ce que chacun expose.
+    """
+    for stream in (response, getattr(response, "_iterator", None), chunks):
+        for method_name in ("cancel", "close"):
+            method = getattr(stream, method_name, None)
+            if callable(method):
+                try:
+                    method()
+                except Exception:
+                    pass
+
+
+def _consume_stream(response, check, stats: dict, started: float, can_abort: bool = True) -> str:
+    """
+    Accumule les chunks en appelant `check` ; lève StreamAborted(raison,
+    tokens gaspillés) si `check` refuse la réponse et que `can_abort`.
+    """
+    try:
+        chunks = iter(response)
+    except TypeError:
+        # Réponse non itérable (SDK sans streaming) : réponse complète
+        return _response_text(response)
+
+    text = ""
+    for chunk in chunks:
+        text += _response_text(chunk)
+        elapsed = round(time.perf_counter() - started, 3)
+        if stats["stream_first_chunk_s"] is None:
+            stats["stream_first_chunk_s"] = elapsed
+        verdict = check(text)
+        if verdict == "useful":
+            if stats["stream_first_useful_s"] is None:
+                stats["stream_first_useful_s"] = elapsed
+        elif verdict and can_abort:
+            # Flux annulé : le reste de la réponse n'est pas téléchargé
+            _cancel_stream(response, chunks)
+            raise StreamAborted(verdict, estimate_tokens(text))
+
+    # Réponse courte, jugée seulement une fois complète
+    if stats["stream_first_useful_s"] is None and text.strip():
+        stats["stream_first_useful_s"] = round(time.perf_counter() - started, 3)
+    return text
@@ -0,0 +1,290 @@
+"""
+hedging.py — Requêtes LLM doublées pour couper la queue de latence.
+Un appel qui dépasse le percentile HEDGE_PERCENTILE des latences récentes
+(apprises par modèle, streaming ou non) est relancé une seconde fois ; la
+première réponse gagne, l'autre est abandonnée. Le quota consommé par ces
+doublons est borné :
+- au plus HEDGE_BUDGET doublon(s) par appel (ratio sur tous les appels)
+- au plus HEDGE_MAX_INFLIGHT doublons en cours en même temps
+- une place libre dans l'étape du pipeline de l'appelant (audit, fix,
+  judge), gardée tant que l'une des deux requêtes tourne
+- aucun doublon pendant HEDGE_COOLDOWN_S après une erreur de quota
+La latence par fichier est relevée avec et sans doublons (estimation à
+partir de la durée qu'aurait eue la requête d'origine).
+"""
+
+import collections
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from src.utils.stages import try_extra_slot
+
+# Doublons désactivés par défaut (SWARM_LLM_HEDGE=1 pour activer)
+HEDGE_ENABLED = os.getenv("SWARM_LLM_HEDGE", "0") != "0"
+# Délai avant doublon : ce percentile des latences récentes
+HEDGE_PERCENTILE = float(os.getenv("SWARM_HEDGE_PERCENTILE", "95"))
+# Doublons autorisés par appel LLM (0.1 = au plus 10 % de requêtes en plus)
+HEDGE_BUDGET = float(os.getenv("SWARM_HEDGE_BUDGET", "0.1"))
+HEDGE_MAX_INFLIGHT = int(os.getenv("SWARM_HEDGE_MAX_INFLIGHT", "2"))
+HEDGE_COOLDOWN_S = 60.0
+# Latences gardées par clé, et minimum avant d'en déduire un délai
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+_QUOTA_MARKERS = ("429", "resourceexhausted", "quota", "rate limit")
+
+
+def percentile(values, p: float):
+    """Percentile `p` (rang le plus proche) ; None si `values` est vide."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class _Tracker:
+    """Latences récentes par clé et compteurs de doublons (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = collections.defaultdict(lambda: collections.deque(maxlen=HEDGE_WINDOW))
+        self.counters = {"calls": 0, "hedges": 0, "hedge_wins": 0, "over_budget": 0}
+        self.inflight = 0
+        self.quota_until = 0.0
+
+    def record(self, key: str, latency: float) -> None:
+        with self._lock:
+            self.latencies[key].append(latency)
+
+    def delay(self, key: str):
+        """Délai avant doublon pour `key`, ou None tant qu'il n'est pas appris."""
+        with self._lock:
+            self.counters["calls"] += 1
+            samples = list(self.latencies[key])
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return percentile(samples, HEDGE_PERCENTILE)
+
+    def reserve(self) -> bool:
+        """Place pour un doublon (budget, doublons en cours, quota) ?"""
+        with self._lock:
+            allowed = (self.counters["hedges"] < HEDGE_BUDGET * self.counters["calls"]
+                       and self.inflight < HEDGE_MAX_INFLIGHT
+                       and time.monotonic() >= self.quota_until)
+            if allowed:
+                self.counters["hedges"] += 1
+                self.inflight += 1
+            else:
+                self.counters["over_budget"] += 1
+            return allowed
+
+    def refuse(self) -> None:
+        with self._lock:
+            self.counters["over_budget"] += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.inflight -= 1
+
+    def note_error(self, error: Exception) -> None:
+        """Erreur de quota : plus de doublons pendant HEDGE_COOLDOWN_S."""
+        if _is_quota_error(error):
+            with self._lock:
+                self.quota_until = time.monotonic() + HEDGE_COOLDOWN_S
+
+    def win(self) -> None:
+        with self._lock:
+            self.counters["hedge_wins"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+
+_tracker = _Tracker()
+_scope = threading.local()
+
+
+def _is_quota_error(error: Exception) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in _QUOTA_MARKERS)
+
+
+def _discard(response) -> None:
+    """Réponse perdante : un flux encore ouvert est fermé sans être lu."""
+    close = getattr(response, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception:
+            pass
+
+
+# ══════════════════════════════════════════════════════════════════════════
+#  APPEL DOUBLÉ
+# ══════════════════════════════════════════════════════════════════════════
+
+class _HedgedCall:
+    """Appel doublé : durée obtenue et durée de la requête d'origine"""
+
+    def __init__(self, started: float):
+        self.started = started
+        self.finished = None
+        self.primary_finished = None
+
+    def saved_s(self) -> float:
+        """Temps gagné ; minoré par l'heure actuelle si l'origine n'a pas fini."""
+        primary_end = self.primary_finished or time.perf_counter()
+        return max(primary_end - self.finished, 0.0)
+
+
+def hedged(key: str, request):
+    """
+    Exécute `request()` ; au-delà du délai appris pour `key`, une seconde
+    requête identique est lancée et la première réponse réussie est retournée.
+    Le doublon prend une place supplémentaire dans l'étape du pipeline de
+    l'appelant (SWARM_LLM_CONCURRENCY reste respecté) et la garde jusqu'à la
+    fin de la plus lente des deux requêtes.
+    Sans doublon possible (désactivé, délai pas encore appris, budget
+    épuisé, étape saturée), l'appel se comporte comme `request()`.
+    """
+    started = time.perf_counter()
+    delay = _tracker.delay(key) if HEDGE_ENABLED else None
+    if delay is None:
+        try:
+            response = request()
+        except Exception as e:
+            _tracker.note_error(e)
+            raise
+        _tracker.record(key, time.perf_counter() - started)
+        return response
+
+    call = _HedgedCall(started)
+    done = threading.Condition()
+    state = {"winner": None, "errors": [], "launched": 1, "running": 1, "release_slot": None}
+
+    def settled():
+        return state["winner"] is not None or len(state["errors"]) == state["launched"]
+
+    def attempt(role: str):
+        try:
+            response, error = request(), None
+        except Exception as e:
+            response, error = None, e
+        ended = time.perf_counter()
+        if error is not None:
+            _tracker.note_error(error)
+        if role == "primary" and error is None:
+            # Seule la requête d'origine nourrit la distribution apprise
+            _tracker.record(key, ended - started)
+        with done:
+            if role == "primary":
+                call.primary_finished = ended
+            else:
+                _tracker.release()
+            lost = error is None and state["winner"] is not None
+            if error is not None:
+                state["errors"].append(error)
+            elif not lost:
+                state["winner"] = (role, response)
+            state["running"] -= 1
+            release_slot = state["release_slot"] if state["running"] == 0 else None
+            done.notify_all()
+        if lost:
+            _discard(response)
+        if release_slot:
+            release_slot()
+
+    threading.Thread(target=attempt, args=("primary",), daemon=True).start()
+    with done:
+        done.wait_for(settled, timeout=delay)
+        hedge = not settled() and _reserve_hedge(state)
+    if hedge:
+        threading.Thread(target=attempt, args=("hedge",), daemon=True).start()
+    with done:
+        done.wait_for(settled)
+        winner, errors = state["winner"], state["errors"]
+    if winner is None:
+        raise errors[-1]
+
+    role, response = winner
+    call.finished = time.perf_counter()
+    if role == "hedge":
+        _tracker.win()
+        calls = getattr(_scope, "calls", None)
+        if calls is not None:
+            calls.append(call)
+    return response
+
+
+def _reserve_hedge(state: dict) -> bool:
+    """Place dans l'étape de l'appelant puis budget ; `state` mis à jour si accordé."""
+    release_slot = try_extra_slot()
+    if release_slot is None:
+        _tracker.refuse()
+        return False
+    if not _tracker.reserve():
+        release_slot()
+        return False
+    state["launched"] += 1
+    state["running"] += 1
+    state["release_slot"] = release_slot
+    return True
+
+
+# ══════════════════════════════════════════════════════════════════════════
+#  LATENCE PAR FICHIER
+# ══════════════════════════════════════════════════════════════════════════
+
+class FileLatency:
+    """Durée de traitement d'un fichier et temps gagné par ses doublons"""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.wall_s = 0.0
+        self.calls = []
+
+    def saved_s(self) -> float:
+        return sum(call.saved_s() for call in self.calls)
+
+
+@contextmanager
+def file_latency(filename: str):
+    """
+    Mesure le traitement d'un fichier ; les doublons gagnants lancés depuis
+    ce thread y sont rattachés (appels sur le chemin critique du fichier).
+    """
+    latency = FileLatency(filename)
+    previous = getattr(_scope, "calls", None)
+    _scope.calls = latency.calls
+    started = time.perf_counter()
+    try:
+        yield latency
+    finally:
+        latency.wall_s = time.perf_counter() - started
+        _scope.calls = previous
+
+
+def hedge_counters() -> dict:
+    """Compteurs cumulés (à comparer entre deux instants pour un run)."""
+    return _tracker.snapshot()
+
+
+def report(latencies: list, since: dict = None) -> None:
+    """p50 / p99 de latence par fichier, avec doublons et estimés sans."""
+    if not HEDGE_ENABLED or not latencies:
+        return
+    counters = hedge_counters()
+    run = {name: value - (since or {}).get(name, 0) for name, value in counters.items()}
+    with_hedge = [lat.wall_s for lat in latencies]
+    without = [lat.wall_s + lat.saved_s() for lat in latencies]
+    ratio = run["hedges"] / run["calls"] if run["calls"] else 0.0
+    print(f"\n[HEDGE] 🪃 {run['hedges']} doublon(s) pour {run['calls']} appel(s) LLM ({ratio:.0%}), "
+          f"{run['hedge_wins']} gagnant(s), {run['over_budget']} refusé(s) (budget / quota / étape saturée)")
+    for p in (50, 99):
+        print(f"[HEDGE] p{p} par fichier : {percentile(with_hedge, p):.1f}s avec doublons, "
+              f"~{percentile(without, p):.1f}s sans")
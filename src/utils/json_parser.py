@@ -0,0 +1,155 @@
+"""
+json_parser.py — Parsing tolérant des réponses JSON des LLM.
+Partagé par l'Auditor, le Judge et la phase DEBUG du Fixer :
+1. Extraction (balises ```json, texte avant/après l'objet)
+2. Réparation locale (virgules finales, réponse tronquée)
+3. Validation contre le schéma de l'agent (types, valeurs par défaut)
+"""
+
+import copy
+import json
+import re
+
+_FENCE = re.compile(r"```(?:json)?\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_MAX_REPAIR_CUTS = 20
+
+
+class JSONParseError(ValueError):
+    """Réponse impossible à interpréter comme l'objet JSON attendu."""
+
+
+def parse_json_response(raw: str, schema: dict = None) -> tuple[dict, bool]:
+    """
+    Extrait, répare si besoin et valide l'objet JSON d'une réponse LLM.
+
+    Schéma : {"champ": {"type": type | tuple, "required": bool,
+                        "default": valeur, "choices": set}}
+
+    Returns:
+        (données validées, True si une réparation structurelle a été nécessaire)
+    Raises:
+        JSONParseError si aucun objet exploitable n'est trouvé.
+    """
+    text = _extract(raw or "")
+    start = text.find("{")
+    if start == -1:
+        raise JSONParseError("Aucun objet JSON dans la réponse")
+
+    repaired = False
+    try:
+        # raw_decode ignore le texte qui suit l'objet (prose finale)
+        data, _ = json.JSONDecoder().raw_decode(text, start)
+    except json.JSONDecodeError:
+        data = _repair(text[start:])
+        repaired = True
+
+    if not isinstance(data, dict):
+        raise JSONParseError("La réponse JSON n'est pas un objet")
+
+    return (validate(data, schema) if schema else data), repaired
+
+
+def validate(data: dict, schema: dict) -> dict:
+    """Applique le schéma : valeurs par défaut, conversions simples, choix autorisés."""
+    result = dict(data)
+    for field, rules in schema.items():
+        expected = rules.get("type", object)
+        value = result.get(field)
+
+        if value is None:
+            if rules.get("required"):
+                raise JSONParseError(f"Champ obligatoire manquant : {field}")
+            if "default" in rules:
+                # Copie : une valeur mutable ([], {}) ne doit pas être partagée entre réponses
+                result[field] = copy.deepcopy(rules["default"])
+            continue
+
+        value = _coerce(value, expected)
+        if not isinstance(value, expected):
+            raise JSONParseError(f"Type invalide pour {field} : {type(value).__name__}")
+
+        choices = rules.get("choices")
+        if choices:
+            if isinstance(value, str):
+                value = value.strip().upper()
+            if value not in choices:
+                raise JSONParseError(f"Valeur invalide pour {field} : {value!r}")
+
+        if expected is list and rules.get("items") is dict:
+            value = [item for item in value if isinstance(item, dict)]
+
+        result[field] = value
+    return result
+
+
+# ══════════════════════════════════════════════════════════════════════════
+#  UTILITAIRES
+# ══════════════════════════════════════════════════════════════════════════
+
+def _extract(raw: str) -> str:
+    """Contenu du premier bloc ``` s'il contient un objet, sinon le texte brut."""
+    match = _FENCE.search(raw)
+    if match and "{" in match.group(1):
+        return match.group(1).strip()
+    return raw.strip()
+
+
+def _coerce(value, expected):
+    """Conversions tolérées : "7.5" → 7.5, "true" → True, 7 → 7.0."""
+    if isinstance(value, expected):
+        return value
+    if expected in (float, (int, float)) and isinstance(value, str):
+        try:
+            return float(value.split("/")[0])
+        except ValueError:
+            return value
+    if expected is bool and isinstance(value, str) and value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    return value
+
+
+def _close_structures(text: str) -> str:
+    """Ferme la chaîne, les objets et tableaux laissés ouverts par une troncature."""
+    stack = []
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    if in_string:
+        text += '"'
+    text = re.sub(r"[,:\s]+$", "", text)
+    closers = "".join("}" if c == "{" else "]" for c in reversed(stack))
+    return _TRAILING_COMMA.sub(r"\1", text + closers)
+
+
+def _repair(text: str):
+    """
+    Réparation locale : ferme les structures ouvertes ; si le résultat est
+    encore invalide (clé sans valeur, nombre coupé...), recule jusqu'à la
+    virgule précédente et recommence.
+    """
+    candidate = text
+    for _ in range(_MAX_REPAIR_CUTS):
+        try:
+            data, _ = json.JSONDecoder().raw_decode(_close_structures(candidate))
+            return data
+        except json.JSONDecodeError:
+            cut = candidate.rfind(",")
+            if cut <= 0:
+                break
+            candidate = candidate[:cut]
+    raise JSONParseError("JSON irréparable")
@@ -0,0 +1,123 @@
+"""
+lint_worker.py — Moteur pylint maintenu chaud pour le mode serveur.
+Chaque worker est un processus `python -m src.utils.lint_worker` qui garde
+pylint importé et lit les chemins à analyser sur son entrée standard (une
+requête JSON par ligne, une réponse JSON par ligne). Un fichier coûte
+alors quelques dizaines de millisecondes au lieu d'un démarrage complet
+de l'interpréteur et de pylint.
+"""
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+from src.utils.output_capture import BoundedCapture
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+_INSTALLED_PREFIXES = tuple({sys.prefix, sys.base_prefix, sys.exec_prefix})
+
+
+# ══════════════════════════════════════════════════════════════════════════
+#  CÔTÉ WORKER (processus enfant)
+# ══════════════════════════════════════════════════════════════════════════
+
+def _lint(abs_path: str, options: list[str]) -> dict:
+    from astroid import MANAGER
+    from pylint.lint import Run
+    from pylint.reporters.text import TextReporter
+
+    # Seuls la bibliothèque standard et les paquets installés restent en cache :
+    # les modules du projet analysé ont pu changer depuis la requête précédente
+    for name, module in list(MANAGER.astroid_cache.items()):
+        module_file = getattr(module, "file", None)
+        if module_file and not module_file.startswith(_INSTALLED_PREFIXES):
+            MANAGER.astroid_cache.pop(name, None)
+
+    # Le rapport texte est capturé (mémoire bornée) : --output-format le redirigerait vers stdout
+    options = [o for o in options if not o.startswith("--output-format")]
+    out = BoundedCapture("pylint")
+    run = Run([abs_path, "--persistent=n", *options], reporter=TextReporter(out), exit=False)
+    out.close()
+    return {"stdout": out.getvalue(), "returncode": run.linter.msg_status}
+
+
+def main():
+    # Canal réservé au protocole : ce que pylint écrirait sur stdout part sur stderr
+    protocol, sys.stdout = sys.stdout, sys.stderr
+    for line in sys.stdin:
+        request = json.loads(line)
+        try:
+            response = _lint(request["path"], request.get("options", []))
+        except Exception as e:  # pylint ne doit jamais faire tomber le worker
+            response = {"stdout": "", "error": f"{type(e).__name__}: {e}", "returncode": -1}
+        protocol.write(json.dumps(response) + "\n")
+        protocol.flush()
+
+
+# ══════════════════════════════════════════════════════════════════════════
+#  CÔTÉ CLIENT (processus principal)
+# ══════════════════════════════════════════════════════════════════════════
+
+class _Worker:
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "src.utils.lint_worker"], cwd=_PROJECT_ROOT,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", bufsize=1
+        )
+        self.responses = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            self.responses.put(line)
+        self.responses.put(None)  # processus terminé
+
+    def request(self, payload: dict, timeout: float) -> dict:
+        self.process.stdin.write(json.dumps(payload) + "\n")
+        self.process.stdin.flush()
+        line = self.responses.get(timeout=timeout)
+        if line is None:
+            raise RuntimeError("worker pylint terminé")
+        return json.loads(line)
+
+    def close(self):
+        self.process.kill()
+        self.process.wait()
+
+
+class WarmLinter:
+    """Pool de `size` workers pylint ; un worker en échec est remplacé."""
+
+    def __init__(self, size: int):
+        self._idle = queue.Queue()
+        for _ in range(max(size, 1)):
+            self._idle.put(_Worker())
+
+    def lint(self, abs_path: str, options: list[str], timeout: float = 60):
+        """
+        {"stdout", "returncode"} comme un `python -m pylint`, ou None si le
+        worker a échoué (l'appelant se rabat alors sur un sous-processus).
+        """
+        worker = self._idle.get()
+        try:
+            response = worker.request({"path": abs_path, "options": options}, timeout)
+        except (queue.Empty, RuntimeError, OSError, ValueError):
+            worker.close()
+            worker, response = _Worker(), None
+        finally:
+            self._idle.put(worker)
+        if response is None or response.get("error"):
+            return None
+        return response
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get().close()
+
+
+if __name__ == "__main__":
+    main()
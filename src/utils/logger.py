@@ -1,10 +1,30 @@
+import hashlib
 import json
 import os
+import re
+import threading
 import uuid
 from datetime import datetime
 from enum import Enum
 
-LOG_FILE = os.path.join("logs", "experiment_data.json")
+# En mode shardé, chaque worker écrit dans son propre segment (SWARM_LOG_FILE)
+LOG_FILE = os.getenv("SWARM_LOG_FILE", os.path.join("logs", "experiment_data.json"))
+
+# ─── Stockage des blobs (contenu adressé par hash) ──────────────────────────
+# Les gros champs texte (prompts, réponses) sont écrits une seule fois dans
+# logs/blobs/<sha256>.txt ; l'entrée de log ne garde qu'une référence.
+BLOB_DIR = os.path.join("logs", "blobs")
+BLOB_MIN_SIZE = 256
+BLOBS_ENABLED = os.getenv("SWARM_LOG_BLOBS", "1") != "0"
+
+# Les blocs ``` (code source, tests) sont stockés séparément du texte qui les
+# entoure : le même code cité par l'Auditor, le Fixer et le Judge → un seul blob.
+_FENCED_BLOCK = re.compile(r"(```[^\n]*\n.*?```)", re.DOTALL)
+
+_known_blobs = set()
+
+# Lecture-modification-écriture du journal : agents appelés depuis plusieurs threads
+_log_lock = threading.Lock()
 
 
 class ActionType(str, Enum):
@@ -17,6 +37,129 @@ class ActionType(str, Enum):
 ALLOWED_STATUS = {"SUCCESS", "FAILURE"}
 
 
+def _write_blob(text: str) -> str:
+    """Écrit `text` dans le blob store (si absent) et retourne son hash."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    if digest in _known_blobs:
+        return digest
+
+    path = os.path.join(BLOB_DIR, f"{digest}.txt")
+    if not os.path.exists(path):
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    _known_blobs.add(digest)
+    return digest
+
+
+def _read_blob(digest: str) -> str:
+    path = os.path.join(BLOB_DIR, f"{digest}.txt")
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _store_text(text: str):
+    """Remplace un texte long par une référence {"$blob"} ou {"$parts"}."""
+    parts = [p for p in _FENCED_BLOCK.split(text) if p]
+    refs = [
+        {"$blob": _write_blob(p)} if len(p) >= BLOB_MIN_SIZE else p
+        for p in parts
+    ]
+    if len(refs) == 1 and isinstance(refs[0], dict):
+        return refs[0]
+    return {"$parts": refs}
+
+
+def _rehydrate_value(value):
+    """Inverse de _store_text (les valeurs non référencées sont inchangées)."""
+    if isinstance(value, dict):
+        if set(value) == {"$blob"}:
+            return _read_blob(value["$blob"])
+        if set(value) == {"$parts"}:
+            return "".join(_rehydrate_value(p) for p in value["$parts"])
+    return value
+
+
+def rehydrate_entry(entry: dict) -> dict:
+    """Retourne une copie de l'entrée avec les références remplacées par leur contenu."""
+    details = {k: _rehydrate_value(v) for k, v in entry.get("details", {}).items()}
+    return {**entry, "details": details}
+
+
+def read_experiment_log(log_file: str = None, rehydrate: bool = True) -> list[dict]:
+    """
+    Lit le log d'expérience et réhydrate les références vers le blob store.
+    Les entrées anciennes (texte en ligne) sont retournées telles quelles.
+    `rehydrate=False` : références laissées telles quelles (lecture des seuls
+    champs courts, sans charger les blobs).
+    """
+    entries = _read_raw_log(log_file or LOG_FILE)
+    return [rehydrate_entry(e) for e in entries] if rehydrate else entries
+
+
+def _read_raw_log(log_file: str) -> list:
+    if not os.path.exists(log_file):
+        return []
+    try:
+        with open(log_file, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+            return json.loads(content) if content else []
+    except json.JSONDecodeError:
+        return []
+
+
+def _load_for_append(log_file: str) -> list:
+    """
+    Journal à compléter ; un fichier illisible est mis de côté (.corrupt)
+    au lieu d'être écrasé par une liste vide.
+    """
+    if not os.path.exists(log_file):
+        return []
+    try:
+        with open(log_file, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        return json.loads(content) if content else []
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        backup = f"{log_file}.{datetime.now():%Y%m%d%H%M%S}.corrupt"
+        os.replace(log_file, backup)
+        print(f"[LOG] ⚠️  Journal illisible mis de côté : {backup}")
+        return []
+
+
+def _write_log(log_file: str, data: list) -> None:
+    """Écriture atomique : un lecteur ne voit jamais un journal à moitié écrit."""
+    tmp_path = f"{log_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, log_file)
+
+
+def merge_log_segments(segment_files: list[str]) -> int:
+    """
+    Ajoute au log principal les entrées des segments (ordre chronologique),
+    puis supprime les segments. Les références vers les blobs restent valides :
+    le blob store est partagé. Retourne le nombre d'entrées fusionnées.
+    """
+    merged = []
+    for segment in segment_files:
+        merged.extend(_read_raw_log(segment))
+    merged.sort(key=lambda e: e.get("timestamp", ""))
+
+    if merged:
+        os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+        with _log_lock:
+            _write_log(LOG_FILE, _load_for_append(LOG_FILE) + merged)
+
+    for segment in segment_files:
+        if os.path.exists(segment):
+            os.remove(segment)
+
+    return len(merged)
+
+
 def log_experiment(
     agent_name: str,
     model_used: str,
@@ -48,7 +191,13 @@ def log_experiment(
         )
 
     # --- 4. Prepare entry ---
-    os.makedirs("logs", exist_ok=True)
+    os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+
+    if BLOBS_ENABLED:
+        details = {
+            k: _store_text(v) if isinstance(v, str) and len(v) >= BLOB_MIN_SIZE else v
+            for k, v in details.items()
+        }
 
     entry = {
         "id": str(uuid.uuid4()),
@@ -60,18 +209,10 @@ def log_experiment(
         "status": status
     }
 
-    # --- 5. Read existing data ---
-    data = []
-    if os.path.exists(LOG_FILE):
-        try:
-            with open(LOG_FILE, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                if content:
-                    data = json.loads(content)
-        except json.JSONDecodeError:
-            data = []
-
-    # --- 6. Write ---
-    data.append(entry)
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    with _log_lock:
+        # --- 5. Read existing data (brut : les références restent des références) ---
+        data = _load_for_append(LOG_FILE)
+
+        # --- 6. Write ---
+        data.append(entry)
+        _write_log(LOG_FILE, data)
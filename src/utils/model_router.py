@@ -0,0 +1,66 @@
+"""
+model_router.py — Choix du modèle Gemini par appel.
+Modèle léger pour les appels simples (verdict, fichiers presque propres),
+modèle standard par défaut, escalade vers un modèle plus fort à chaque
+itération échouée.
+"""
+
+import os
+
+from src.utils.gemini_client import MODEL_NAME
+
+# ─── Niveaux de modèles (surchargeables via .env) ───────────────────────────
+TIER_ORDER = ["lite", "standard", "strong"]
+MODEL_TIERS = {
+    "lite": os.getenv("SWARM_MODEL_LITE", "models/gemini-2.5-flash-lite"),
+    "standard": os.getenv("SWARM_MODEL_STANDARD", MODEL_NAME),
+    "strong": os.getenv("SWARM_MODEL_STRONG", "models/gemini-2.5-pro"),
+}
+ROUTING_ENABLED = os.getenv("SWARM_MODEL_ROUTING", "1") != "0"
+
+# Niveau de base par site d'appel
+BASE_TIERS = {
+    "audit": "standard",
+    "fix": "standard",
+    "debug": "standard",
+    "test_generation": "standard",
+    "verdict": "lite",
+}
+
+# Types de problèmes qui demandent un vrai raisonnement
+HARD_ISSUE_TYPES = {"logic_error", "semantic_error", "design_flaw", "test_failure",
+                    "resource_exhaustion"}
+EASY_SCORE_THRESHOLD = 8.0
+
+
+def route(call_site: str, pylint_score: float = None, issues: list = None,
+          iteration: int = 0) -> str:
+    """
+    Retourne le nom du modèle à utiliser pour `call_site`.
+
+    Signaux :
+    - pylint_score élevé sans problème difficile → un niveau en dessous
+    - iteration k (k-ième nouvelle tentative) → k niveaux au-dessus
+    """
+    if not ROUTING_ENABLED:
+        return MODEL_NAME
+
+    level = TIER_ORDER.index(BASE_TIERS.get(call_site, "standard"))
+
+    issues = issues or []
+    hard = any(
+        i.get("severity") == "critical" or i.get("type") in HARD_ISSUE_TYPES
+        for i in issues if isinstance(i, dict)
+    )
+    easy = (
+        iteration == 0
+        and not hard
+        and pylint_score is not None
+        and pylint_score >= EASY_SCORE_THRESHOLD
+    )
+    if easy and call_site in ("audit", "fix"):
+        level -= 1
+
+    level += iteration
+    level = max(0, min(level, len(TIER_ORDER) - 1))
+    return MODEL_TIERS[TIER_ORDER[level]]
@@ -0,0 +1,179 @@
+"""
+output_capture.py — Capture en flux, à mémoire bornée, de la sortie d'un sous-processus.
+La sortie complète part dans un fichier de débordement (<projet>/logs/spill/) dès
+qu'elle dépasse le début gardé en mémoire ; en mémoire ne restent que :
+- le début (CAPTURE_HEAD_KB) et la fin (CAPTURE_TAIL_KB) de la sortie
+- les sections d'échec (FAILURES / ERRORS de pytest, tracebacks, erreurs
+  pylint) sorties de la fin, dans la limite de CAPTURE_SECTIONS_KB
+Le texte rendu garde l'ordre d'origine et signale les lignes omises.
+"""
+
+import collections
+import itertools
+import os
+import re
+import threading
+import time
+
+CAPTURE_HEAD_KB = int(os.getenv("SWARM_CAPTURE_HEAD_KB", "16"))
+CAPTURE_TAIL_KB = int(os.getenv("SWARM_CAPTURE_TAIL_KB", "32"))
+CAPTURE_SECTIONS_KB = int(os.getenv("SWARM_CAPTURE_SECTIONS_KB", "32"))
+# Ligne sans fin : découpée en morceaux de cette taille
+MAX_LINE_CHARS = 4096
+# Ancré à la racine du projet : même dossier quel que soit le répertoire courant
+# (les workers pylint tournent depuis la racine, main.py depuis n'importe où)
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SPILL_DIR = os.path.join(_PROJECT_ROOT, "logs", "spill")
+# Fichiers de débordement conservés par processus (les siens seulement : une
+# sortie déjà retournée par un autre processus garde son fichier)
+SPILL_KEEP = 50
+# Au-delà, un fichier de débordement est supprimé, quel que soit son processus
+SPILL_MAX_AGE_S = 24 * 3600
+
+# Début d'une section d'échec (pytest : bloc FAILURES / ERRORS, en-tête d'un
+# test en échec) / ce qui la termine (autre bloc, sortie capturée du test)
+_SECTION_START = re.compile(r"^(=+ (FAILURES|ERRORS|short test summary info) =+|_{3,} .+ _{3,})\s*$")
+_SECTION_END = re.compile(r"^(=+ .+ =+|-+ Captured .+ -+)\s*$")
+# Lignes utiles hors section : traceback, exception, erreur / fatal pylint
+_FAILURE_LINE = re.compile(
+    r"^Traceback \(most recent call last\)|^\w*(Error|Exception)\b|^E\s|"
+    r"^(FAILED|ERROR) |:\d+:\d+: [EF]\d{4}:|File too large"
+)
+
+_spill_ids = itertools.count(1)
+_spill_lock = threading.Lock()
+
+
+class BoundedCapture:
+    """
+    Tampon de sortie à plafond mémoire fixe, utilisable comme fichier texte
+    (`write`) : début, fin et sections d'échec gardés, le reste sur disque.
+    """
+
+    def __init__(self, name: str = "capture"):
+        self.name = name
+        self.head = []                   # (index, ligne)
+        self.tail = collections.deque()  # (index, ligne, dans une section d'échec)
+        self.sections = []               # (index, ligne) sortis de la fin
+        self.total_chars = 0
+        self.total_lines = 0
+        self.spill_path = None
+        self._spill = None
+        self._partial = ""
+        self._head_size = self._tail_size = self._sections_size = 0
+        self._in_section = False
+
+    def write(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._spill is None and self.total_chars + len(text) > CAPTURE_HEAD_KB * 1024:
+            self._open_spill()
+        if self._spill is not None:
+            self._spill.write(text)
+        self.total_chars += len(text)
+
+        self._partial += text
+        *lines, self._partial = self._partial.split("\n")
+        for line in lines:
+            self._add_line(line + "\n")
+        while len(self._partial) > MAX_LINE_CHARS:
+            self._add_line(self._partial[:MAX_LINE_CHARS] + "\n")
+            self._partial = self._partial[MAX_LINE_CHARS:]
+        return len(text)
+
+    def flush(self) -> None:
+        if self._spill is not None:
+            self._spill.flush()
+
+    def close(self) -> None:
+        if self._partial:
+            self._add_line(self._partial)
+            self._partial = ""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    @property
+    def truncated(self) -> bool:
+        kept = len(self.head) + len(self.tail) + len(self.sections)
+        return kept < self.total_lines
+
+    def getvalue(self) -> str:
+        """Lignes gardées dans l'ordre d'origine, trous signalés."""
+        kept = sorted(self.head + [(i, line) for i, line, _ in self.tail] + self.sections)
+        parts, expected = [], 0
+        for index, line in kept:
+            if index > expected:
+                parts.append(f"[... {index - expected} ligne(s) omise(s) ...]\n")
+            parts.append(line)
+            expected = index + 1
+        if self.truncated and self.spill_path:
+            parts.append(f"[Sortie complète ({self.total_chars // 1024} Ko) : {self.spill_path}]\n")
+        return "".join(parts)
+
+    def stats(self) -> dict:
+        return {"chars": self.total_chars, "lines": self.total_lines,
+                "truncated": self.truncated, "spill_path": self.spill_path}
+
+    def _add_line(self, line: str) -> None:
+        index = self.total_lines
+        self.total_lines += 1
+        if _SECTION_START.match(line):
+            self._in_section = True
+        elif self._in_section and _SECTION_END.match(line):
+            self._in_section = False
+
+        if self._head_size + len(line) <= CAPTURE_HEAD_KB * 1024:
+            self.head.append((index, line))
+            self._head_size += len(line)
+            return
+        self.tail.append((index, line, self._in_section))
+        self._tail_size += len(line)
+
+        # Ligne poussée hors de la fin : gardée seulement si elle décrit un échec
+        while self._tail_size > CAPTURE_TAIL_KB * 1024 and len(self.tail) > 1:
+            old_index, old_line, in_section = self.tail.popleft()
+            self._tail_size -= len(old_line)
+            if (in_section or _FAILURE_LINE.search(old_line)) and \
+                    self._sections_size + len(old_line) <= CAPTURE_SECTIONS_KB * 1024:
+                self.sections.append((old_index, old_line))
+                self._sections_size += len(old_line)
+
+    def _open_spill(self) -> None:
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        with _spill_lock:
+            self.spill_path = os.path.join(SPILL_DIR, f"{os.getpid()}_{next(_spill_ids)}_{self.name}.log")
+            _prune_spills()
+        self._spill = open(self.spill_path, "w", encoding="utf-8", errors="replace")
+        # Tout ce qui a été reçu jusqu'ici est encore dans le début
+        self._spill.write("".join(line for _, line in self.head) + self._partial)
+
+
+def _prune_spills() -> None:
+    """Fichiers de ce processus au-delà de SPILL_KEEP, et tous ceux trop anciens."""
+    own_prefix = f"{os.getpid()}_"
+    expired_before = time.time() - SPILL_MAX_AGE_S
+    own, expired = [], []
+    try:
+        for entry in os.scandir(SPILL_DIR):
+            mtime = entry.stat().st_mtime
+            if mtime < expired_before:
+                expired.append(entry.path)
+            elif entry.name.startswith(own_prefix):
+                own.append((mtime, entry.path))
+    except OSError:
+        return
+    own.sort()
+    for path in expired + [path for _, path in own[:max(len(own) - SPILL_KEEP + 1, 0)]]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def excerpt(text: str, limit: int) -> str:
+    """Début et fin de `text` (au plus `limit` caractères) : le résumé final n'est pas perdu."""
+    if not text or len(text) <= limit:
+        return text
+    half = max((limit - 5) // 2, 0)
+    return f"{text[:half]}\n[…]\n{text[-half:]}" if half else text[:limit]
@@ -0,0 +1,209 @@
+"""
+prompt_builder.py — Budget de tokens et compaction du contexte des prompts.
+- Estimation du nombre de tokens par section
+- Dédoublonnage des messages pylint par identifiant (C0301, W0611...)
+- Compression des tracebacks / sorties pytest aux frames utiles
+- Suppression des commentaires et docstrings du code fourni pour contexte
+"""
+
+import io
+import os
+import re
+import tokenize
+
+# Approximation Gemini : ~4 caractères par token
+CHARS_PER_TOKEN = 4
+
+_PYLINT_LINE = re.compile(r"^.*?:\d+:\d+: ([A-Z]\d{4}): ")
+_FRAME_LINE = re.compile(r'^\s*File "([^"]+)", line \d+')
+_SHORT_FRAME_LINE = re.compile(r"^(\S+\.py):\d+: ")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation rapide (sans appel API) du nombre de tokens."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_middle(text: str, max_tokens: int) -> str:
+    """
+    Coupe le milieu d'un texte trop long : le début (contexte) et la fin
+    (résumé d'erreur, score) sont conservés.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    head = max_chars // 3
+    tail = max_chars - head
+    omitted = len(text) - head - tail
+    return f"{text[:head]}\n[... {omitted} caractères omis ...]\n{text[-tail:]}"
+
+
+# ══════════════════════════════════════════════════════════════════════════
+#  COMPACTEURS
+# ══════════════════════════════════════════════════════════════════════════
+
+def dedupe_pylint_messages(messages: str, max_per_id: int = 2) -> str:
+    """Garde `max_per_id` occurrences de chaque message pylint et compte le reste."""
+    kept = []
+    counts = {}
+    for line in messages.splitlines():
+        match = _PYLINT_LINE.match(line)
+        if not match:
+            if line.strip() and not set(line.strip()) <= {"-"}:
+                kept.append(line)
+            continue
+        msg_id = match.group(1)
+        counts[msg_id] = counts.get(msg_id, 0) + 1
+        if counts[msg_id] <= max_per_id:
+            kept.append(line)
+
+    extra = [f"{msg_id} : +{n - max_per_id} occurrence(s)"
+             for msg_id, n in counts.items() if n > max_per_id]
+    if extra:
+        kept.append("Occurrences supplémentaires : " + ", ".join(extra))
+    return "\n".join(kept)
+
+
+def compress_traceback(output: str, focus_files=()) -> str:
+    """
+    Réduit une sortie pytest / un traceback aux lignes utiles :
+    frames des fichiers suivis (`focus_files`) et dernière frame,
+    lignes d'erreur (E ...), résumé FAILED/ERROR et ligne finale.
+    Les frames de la bibliothèque standard / site-packages sont omises.
+    """
+    focus = {os.path.basename(f) for f in focus_files}
+    lines = output.splitlines()
+    kept = []
+    skipped = 0
+
+    def flush_skipped():
+        nonlocal skipped
+        if skipped:
+            kept.append(f"[... {skipped} ligne(s) omise(s) ...]")
+            skipped = 0
+
+    def is_focus(path):
+        return not focus or os.path.basename(path) in focus
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        frame = _FRAME_LINE.match(line)
+
+        if frame:
+            # Frame "File ..., line N" + ligne de code associée
+            block = [line]
+            if i + 1 < len(lines) and not _FRAME_LINE.match(lines[i + 1]):
+                block.append(lines[i + 1])
+            is_last = not any(_FRAME_LINE.match(l) for l in lines[i + len(block):])
+            if is_focus(frame.group(1)) or is_last:
+                flush_skipped()
+                kept.extend(block)
+            else:
+                skipped += len(block)
+            i += len(block)
+            continue
+
+        short_frame = _SHORT_FRAME_LINE.match(stripped)
+        if short_frame and is_focus(short_frame.group(1)):
+            # Frame courte (--tb=short) + lignes de code indentées qui suivent
+            flush_skipped()
+            kept.append(line)
+            i += 1
+            while i < len(lines) and lines[i].startswith("    "):
+                kept.append(lines[i])
+                i += 1
+            continue
+
+        useful = (
+            stripped.startswith(("E ", ">", "Traceback", "FAILED", "ERROR", "assert"))
+            or stripped.startswith("_") and stripped.endswith("_")
+            or (stripped.startswith("=") and any(w in stripped for w in ("failed", "passed", "error", "FAILURES")))
+            or re.match(r"^[\w.]*(Error|Exception|Interrupt)\b", stripped)
+        )
+        if useful:
+            flush_skipped()
+            kept.append(line)
+        elif stripped:
+            skipped += 1
+        i += 1
+
+    flush_skipped()
+    return "\n".join(kept) if kept else output
+
+
+def strip_comments_and_docstrings(code: str) -> str:
+    """
+    Supprime commentaires et docstrings d'un code fourni pour contexte.
+    Les numéros de ligne sont préservés (les diagnostics y font référence).
+    Retourne le code inchangé s'il ne peut pas être tokenisé.
+    """
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return code
+
+    lines = code.splitlines(keepends=True)
+    removals = []  # (ligne début, col début, ligne fin, col fin, remplacement)
+    prev_type = tokenize.INDENT
+    for tok in tokens:
+        if tok.type == tokenize.COMMENT:
+            removals.append((*tok.start, *tok.end, ""))
+        elif tok.type == tokenize.STRING and prev_type in (tokenize.INDENT, tokenize.NEWLINE, tokenize.DEDENT):
+            # Chaîne seule sur sa ligne en début de bloc : docstring
+            removals.append((*tok.start, *tok.end, "..."))
+        if tok.type not in (tokenize.NL, tokenize.COMMENT):
+            prev_type = tok.type
+
+    for start_row, start_col, end_row, end_col, repl in reversed(removals):
+        first = lines[start_row - 1]
+        last = lines[end_row - 1]
+        new_first = first[:start_col] + repl + last[end_col:]
+        if repl == "":
+            new_first = new_first.rstrip() + ("\n" if first.endswith("\n") else "")
+        # Lignes internes d'une docstring multi-ligne → lignes vides
+        lines[start_row - 1:end_row] = [new_first] + ["\n"] * (end_row - start_row)
+
+    return "".join(lines)
+
+
+# ══════════════════════════════════════════════════════════════════════════
+#  CONSTRUCTEUR DE PROMPT
+# ══════════════════════════════════════════════════════════════════════════
+
+class PromptBuilder:
+    """
+    Mesure et plafonne chaque section d'un prompt.
+
+        pb = PromptBuilder("AUDITOR")
+        pylint_ctx = pb.section("pylint", messages, max_tokens=300, compact=dedupe_pylint_messages)
+        user_prompt = f"... {pylint_ctx} ..."
+        stats = pb.finish(user_prompt)
+    """
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self.sections = {}  # nom -> (tokens bruts, tokens finaux)
+
+    def section(self, name: str, text: str, max_tokens: int = None, compact=None) -> str:
+        """Retourne le texte compacté puis plafonné à `max_tokens`."""
+        text = text or ""
+        final = compact(text) if compact else text
+        if max_tokens is not None:
+            final = truncate_middle(final, max_tokens)
+        self.sections[name] = (estimate_tokens(text), estimate_tokens(final))
+        return final
+
+    def finish(self, prompt: str) -> dict:
+        """Mesure le prompt final et affiche les tokens économisés."""
+        saved = sum(raw - final for raw, final in self.sections.values())
+        stats = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "prompt_tokens_saved": max(saved, 0),
+            "sections": {name: final for name, (_, final) in self.sections.items()}
+        }
+        if saved > 0:
+            print(f"[{self.tag}] ✂️  Prompt : ~{stats['prompt_tokens']} tokens "
+                  f"({saved} économisés)")
+        return stats
@@ -0,0 +1,169 @@
+"""
+sandbox.py — Gestionnaire de fichiers du sandbox.
+- Cache mémoire du contenu par fichier (invalidé par mtime/taille)
+- Écritures atomiques, ignorées quand le hash du contenu est inchangé
+- Copie d'entrées inchangées par hardlink / reflink plutôt que par copie
+- Notification des caches en aval quand un fichier change réellement
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+
+# ioctl Linux de clonage copy-on-write (btrfs, xfs...)
+_FICLONE = 0x40049409
+
+
+def content_digest(content: str) -> str:
+    """Hash SHA-256 d'un contenu texte."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class SandboxManager:
+    """Point unique de lecture/écriture des fichiers manipulés par les agents"""
+
+    def __init__(self):
+        self._cache = {}  # chemin absolu -> (mtime_ns, taille, digest, contenu)
+        self._listeners = []
+        self._lock = threading.Lock()
+        self.stats = {
+            "reads": 0,
+            "cache_hits": 0,
+            "writes": 0,
+            "writes_skipped": 0,
+            "links": 0,
+            "copies": 0
+        }
+
+    def subscribe(self, callback) -> None:
+        """`callback(abs_path)` est appelé après chaque changement réel d'un fichier."""
+        self._listeners.append(callback)
+
+    # ══════════════════════════════════════════════════════════════════════
+    #  LECTURE
+    # ══════════════════════════════════════════════════════════════════════
+
+    def read(self, path: str) -> str:
+        """Contenu du fichier, depuis le cache si le fichier n'a pas bougé."""
+        return self._entry(path)[3]
+
+    def digest(self, path: str) -> str:
+        """Hash du contenu du fichier (sans relire un fichier déjà en cache)."""
+        return self._entry(path)[2]
+
+    def _entry(self, path: str) -> tuple:
+        abs_path = os.path.abspath(path)
+        st = os.stat(abs_path)
+        with self._lock:
+            self.stats["reads"] += 1
+            entry = self._cache.get(abs_path)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self.stats["cache_hits"] += 1
+                return entry
+
+        with open(abs_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        entry = (st.st_mtime_ns, st.st_size, content_digest(content), content)
+        with self._lock:
+            self._cache[abs_path] = entry
+        return entry
+
+    # ══════════════════════════════════════════════════════════════════════
+    #  ÉCRITURE
+    # ══════════════════════════════════════════════════════════════════════
+
+    def write(self, path: str, content: str) -> bool:
+        """
+        Écrit `content` dans `path` sauf si le contenu est identique.
+        L'écriture passe par un fichier temporaire + os.replace : un fichier
+        lié (hardlink) à une entrée n'est jamais modifié en place.
+        Retourne True si le fichier a réellement changé.
+        """
+        abs_path = os.path.abspath(path)
+        digest = content_digest(content)
+        if self._current_digest(abs_path) == digest:
+            with self._lock:
+                self.stats["writes_skipped"] += 1
+            return False
+
+        os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+        tmp_path = f"{abs_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, abs_path)
+
+        st = os.stat(abs_path)
+        with self._lock:
+            self.stats["writes"] += 1
+            self._cache[abs_path] = (st.st_mtime_ns, st.st_size, digest, content)
+        self._notify(abs_path)
+        return True
+
+    def stage(self, src_path: str, dest_path: str) -> str:
+        """
+        Place `src_path` en `dest_path` sans copier les données si possible
+        (hardlink, sinon reflink, sinon copie). Ignoré si `dest_path` a déjà
+        le même contenu. Retourne le chemin absolu de destination.
+        """
+        abs_src = os.path.abspath(src_path)
+        abs_dest = os.path.abspath(dest_path)
+        if self._current_digest(abs_dest) == self.digest(abs_src):
+            with self._lock:
+                self.stats["writes_skipped"] += 1
+            return abs_dest
+
+        os.makedirs(os.path.dirname(abs_dest), exist_ok=True)
+        tmp_path = f"{abs_dest}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(abs_src, tmp_path)
+            kind = "links"
+        except OSError:
+            kind = "links" if self._reflink(abs_src, tmp_path) else "copies"
+            if kind == "copies":
+                shutil.copy2(abs_src, tmp_path)
+        os.replace(tmp_path, abs_dest)
+
+        with self._lock:
+            self.stats[kind] += 1
+            self._cache.pop(abs_dest, None)
+        self._notify(abs_dest)
+        return abs_dest
+
+    # ══════════════════════════════════════════════════════════════════════
+    #  UTILITAIRES
+    # ══════════════════════════════════════════════════════════════════════
+
+    def _current_digest(self, abs_path: str):
+        if not os.path.isfile(abs_path):
+            return None
+        try:
+            return self.digest(abs_path)
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def _notify(self, abs_path: str) -> None:
+        for callback in self._listeners:
+            callback(abs_path)
+
+    @staticmethod
+    def _reflink(src: str, dest: str) -> bool:
+        """Clone copy-on-write (Linux uniquement). Retourne False si non supporté."""
+        try:
+            import fcntl
+        except ImportError:
+            return False
+        try:
+            with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+                fcntl.ioctl(fdest.fileno(), _FICLONE, fsrc.fileno())
+            shutil.copystat(src, dest)
+            return True
+        except OSError:
+            if os.path.exists(dest):
+                os.remove(dest)
+            return False
+
+
+# Instance partagée par tools.py et les agents
+sandbox_manager = SandboxManager()
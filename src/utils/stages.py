@@ -0,0 +1,170 @@
+"""
+stages.py — Pools par étape du pipeline et contre-pression.
+Chaque étape a son propre nombre de places : les appels LLM (audit, fix,
+judge) sont bornés par le débit autorisé de l'API, les sous-processus
+(lint, test) par le nombre de cœurs. Un fichier qui attend une place garde
+son état en mémoire : le nombre de fichiers en vol est donc borné
+(admission) pour qu'une rafale d'audits rapides ne s'accumule pas.
+Profondeur d'attente et taux d'occupation sont mesurés par étape.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+CPU_COUNT = os.cpu_count() or 1
+# Appels LLM simultanés autorisés (quota / rate limit de l'API)
+LLM_CONCURRENCY = int(os.getenv("SWARM_LLM_CONCURRENCY", "4"))
+
+DEFAULT_SIZES = {
+    "audit": LLM_CONCURRENCY,
+    "fix": LLM_CONCURRENCY,
+    "judge": LLM_CONCURRENCY,    # génération de tests et verdict
+    "lint": CPU_COUNT,
+    "test": CPU_COUNT
+}
+
+
+class Stage:
+    """Places d'une étape, avec mesures d'attente et d'occupation"""
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = max(size, 1)
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.active = 0
+        self.max_waiting = 0
+        self.calls = 0
+        self.busy_s = 0.0
+        self.wait_s = 0.0
+
+    @contextmanager
+    def slot(self):
+        requested = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            # Étape saturée : le fichier rejoint la file d'attente
+            with self._lock:
+                self.waiting += 1
+                self.max_waiting = max(self.max_waiting, self.waiting)
+            self._slots.acquire()
+            with self._lock:
+                self.waiting -= 1
+        started = time.perf_counter()
+        with self._lock:
+            self.active += 1
+            self.wait_s += started - requested
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.calls += 1
+                self.busy_s += time.perf_counter() - started
+            self._slots.release()
+
+    def try_acquire(self):
+        """
+        Place prise sans attendre (requête LLM doublée) : retourne la fonction
+        qui la libère, ou None si l'étape est saturée.
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        started = time.perf_counter()
+        with self._lock:
+            self.active += 1
+
+        def release():
+            with self._lock:
+                self.active -= 1
+                self.calls += 1
+                self.busy_s += time.perf_counter() - started
+            self._slots.release()
+        return release
+
+    def snapshot(self, wall_s: float) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "active": self.active,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "calls": self.calls,
+                "wait_s": round(self.wait_s, 3),
+                "utilization": round(self.busy_s / (self.size * wall_s), 3) if wall_s > 0 else 0.0
+            }
+
+
+class StagePools:
+    """Ensemble des étapes ; tailles surchargeables par SWARM_STAGE_<ÉTAPE>"""
+
+    def __init__(self, sizes: dict = None):
+        sizes = {**DEFAULT_SIZES, **(sizes or {})}
+        self.stages = {
+            name: Stage(name, int(os.getenv(f"SWARM_STAGE_{name.upper()}", size)))
+            for name, size in sizes.items()
+        }
+        self.started = time.perf_counter()
+
+    def admission_limit(self) -> int:
+        """
+        Fichiers en vol : de quoi occuper toutes les places LLM, plus une
+        marge pour les fichiers en lint/test ; au-delà, ils attendraient.
+        """
+        llm = sum(self.stages[s].size for s in ("audit", "fix", "judge") if s in self.stages)
+        return max(llm + CPU_COUNT, 1)
+
+    def metrics(self) -> dict:
+        wall_s = time.perf_counter() - self.started
+        return {name: stage.snapshot(wall_s) for name, stage in self.stages.items()}
+
+    def report(self) -> None:
+        print(f"\n[STAGES] {'Étape':<6} {'Places':>6} {'Appels':>7} {'Attente max':>11} "
+              f"{'Attente (s)':>11} {'Occupation':>10}")
+        for name, m in self.metrics().items():
+            print(f"[STAGES] {name:<6} {m['size']:>6} {m['calls']:>7} {m['max_waiting']:>11} "
+                  f"{m['wait_s']:>11.1f} {m['utilization']:>9.0%}")
+
+
+# ─── Pools actifs (aucune limite tant que configure_stages n'est pas appelé) ─
+_pools = None
+# Étape dont le thread courant occupe une place
+_current = threading.local()
+
+
+def configure_stages(sizes: dict = None) -> StagePools:
+    """Active des pools neufs pour le run en cours et les retourne."""
+    global _pools
+    _pools = StagePools(sizes)
+    return _pools
+
+
+@contextmanager
+def stage(name: str):
+    """Occupe une place de l'étape `name` (sans effet hors pipeline configuré)."""
+    pools = _pools
+    if pools is None or name not in pools.stages:
+        yield
+        return
+    previous = getattr(_current, "name", None)
+    _current.name = name
+    try:
+        with pools.stages[name].slot():
+            yield
+    finally:
+        _current.name = previous
+
+
+def try_extra_slot():
+    """
+    Place supplémentaire, sans attendre, dans l'étape occupée par le thread
+    courant (requête doublée) : fonction de libération, ou None si l'étape
+    est saturée. Hors étape ou hors pipeline configuré, rien n'est borné.
+    """
+    pools = _pools
+    name = getattr(_current, "name", None)
+    if pools is None or name not in pools.stages:
+        return lambda: None
+    return pools.stages[name].try_acquire()
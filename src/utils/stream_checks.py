@@ -0,0 +1,85 @@
+"""
+stream_checks.py — Vérifications incrémentales des réponses LLM en streaming.
+Chaque fonction reçoit le texte reçu jusqu'ici et retourne None (attendre
+la suite), "useful" (contenu exploitable) ou la raison d'un abandon.
+- Code Python (Fixer) : prose au lieu de code, autre langage, erreur de
+  tokenisation sur les lignes déjà complètes
+- JSON (Auditor) : objet attendu, problèmes extraits au fil de l'eau
+"""
+
+import io
+import re
+import time
+import tokenize
+
+from src.utils.json_parser import parse_json_response, JSONParseError
+
+# Texte minimal avant de juger le format d'une réponse
+MIN_PREFIX_CHARS = 120
+
+_FENCE_OPEN = re.compile(r"```[\w+-]*[ \t]*\n")
+_PYTHON_START = re.compile(
+    r"^(#|@|\"\"\"|'''|import |from |def |async |class |if |for |while |try:|with |"
+    r"[A-Za-z_][\w.]*\s*(=|\(|:|\[)|print\()"
+)
+_OTHER_LANGUAGE = re.compile(
+    r"^\s*(#include\b|public (static )?(class|void)\b|function\s+\w+\s*\(|"
+    r"(const|let|var)\s+\w+\s*=|package\s+\w+;|using\s+System|fn\s+\w+\s*\()",
+    re.MULTILINE
+)
+
+
+def python_code_check(text: str):
+    """Abandonne une réponse qui n'est pas (le début d')un module Python."""
+    # Code entre balises : le texte qui précède la balise est ignoré
+    fence = _FENCE_OPEN.search(text)
+    code = text[fence.end():] if fence else text
+    complete = code[:code.rfind("\n") + 1] if "\n" in code else ""
+    if not complete.strip() or (not fence and len(code.strip()) < MIN_PREFIX_CHARS):
+        return None  # une introduction courte peut précéder une balise ```
+
+    first_line = next((line.strip() for line in code.splitlines() if line.strip()), "")
+    if not _PYTHON_START.match(first_line):
+        return "prose au lieu de code"
+    if _OTHER_LANGUAGE.search(complete):
+        return "langage autre que Python"
+
+    # Lignes complètes : seule une instruction multi-ligne ouverte est tolérée
+    try:
+        for _ in tokenize.generate_tokens(io.StringIO(complete.split("```")[0]).readline):
+            pass
+    except tokenize.TokenError:
+        pass
+    except (IndentationError, SyntaxError) as e:
+        return f"code non tokenisable ({e.msg})"
+    return "useful"
+
+
+class JSONIssuesCheck:
+    """
+    Vérification d'une réponse JSON de l'Auditor : objet attendu, et
+    problèmes ("issues") extraits au fil de l'eau par réparation du préfixe.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.issues = []
+        self.first_issue_s = None
+
+    def __call__(self, text: str):
+        stripped = text.lstrip()
+        if "{" not in stripped[:MIN_PREFIX_CHARS]:
+            return "prose au lieu de JSON" if len(stripped) >= MIN_PREFIX_CHARS else None
+
+        try:
+            data, _ = parse_json_response(stripped)
+        except JSONParseError:
+            return None
+        issues = data.get("issues")
+        # Le dernier problème peut être tronqué : seuls les précédents sont sûrs
+        complete = issues[:-1] if isinstance(issues, list) else []
+        if len(complete) > len(self.issues):
+            self.issues = [i for i in complete if isinstance(i, dict)]
+            if self.first_issue_s is None:
+                self.first_issue_s = round(time.perf_counter() - self.started, 3)
+        return "useful"
@@ -0,0 +1,163 @@
+"""
+test_impact.py — Sélection des tests impactés par une correction.
+- Diff AST entre deux versions d'un module : fonctions / méthodes modifiées
+- Références de chaque test généré (noms et attributs utilisés, via les
+  fonctions utilitaires du fichier de test)
+- Sélection des tests qui touchent une fonction modifiée
+"""
+
+import ast
+
+# Code de niveau module (imports, constantes...) : tous les tests sont concernés
+MODULE_LEVEL = "<module>"
+
+
+def function_fingerprints(code: str) -> dict:
+    """
+    Empreinte AST (sans positions) de chaque fonction et méthode du module :
+    {"f": ..., "Classe.methode": ..., "<module>": ...}.
+    Lève SyntaxError si le code ne se parse pas.
+    """
+    tree = ast.parse(code)
+    fingerprints = {}
+    module_level = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            fingerprints[node.name] = ast.dump(node)
+        elif isinstance(node, ast.ClassDef):
+            class_level = []
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    fingerprints[f"{node.name}.{item.name}"] = ast.dump(item)
+                else:
+                    class_level.append(ast.dump(item))
+            fingerprints[node.name] = "\n".join(class_level + [ast.dump(b) for b in node.bases])
+        else:
+            module_level.append(ast.dump(node))
+    fingerprints[MODULE_LEVEL] = "\n".join(module_level)
+    return fingerprints
+
+
+def changed_symbols(old_code: str, new_code: str):
+    """
+    Fonctions / méthodes / classes ajoutées, supprimées ou modifiées entre
+    deux versions. Retourne None si l'une des versions ne se parse pas.
+    """
+    try:
+        old = function_fingerprints(old_code)
+        new = function_fingerprints(new_code)
+    except SyntaxError:
+        return None
+    return {name for name in old.keys() | new.keys() if old.get(name) != new.get(name)}
+
+
+def test_references(test_code: str) -> dict:
+    """
+    {node id pytest relatif ("test_x" ou "TestC::test_x"): noms référencés}.
+    Les références des fonctions utilitaires du fichier de test (helpers,
+    fixtures) sont propagées aux tests qui les appellent.
+    """
+    tree = ast.parse(test_code)
+    classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+
+    local = {}   # fonction du fichier de test -> noms référencés
+    tests = {}   # node id -> fonction
+    owners = {}  # méthode -> classes où chercher ses appels self.x() (classe et bases du fichier)
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            local[node.name] = _referenced_names(node)
+            if node.name.startswith("test"):
+                tests[node.name] = node.name
+        elif isinstance(node, ast.ClassDef):
+            collected = node.name.startswith("Test") or _is_testcase(node, classes)
+            # Méthodes héritées des classes du fichier : collectées par pytest sous cette classe
+            chain = _class_chain(node, classes)
+            for owner in chain:
+                for item in owner.body:
+                    if not isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        continue
+                    key = f"{owner.name}.{item.name}"
+                    local[key] = _referenced_names(item)
+                    owners.setdefault(key, [c.name for c in _class_chain(owner, classes)])
+                    node_id = f"{node.name}::{item.name}"
+                    if collected and item.name.startswith("test") and node_id not in tests:
+                        tests[node_id] = key
+
+    references = {}
+    for node_id, key in tests.items():
+        names = set()
+        pending = [key]
+        seen = set()
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            names |= local[current]
+            for name in local[current]:
+                candidates = [name] + [f"{owner}.{name}" for owner in owners.get(current, [])]
+                pending.extend(c for c in candidates if c in local)
+        references[node_id] = names
+    return references
+
+
+def select_tests(test_code: str, changed: set):
+    """
+    Tests du fichier qui référencent un symbole modifié.
+    Retourne None si tous les tests doivent tourner (code de niveau module
+    modifié, diff inconnu, fichier de test illisible).
+    """
+    if changed is None or MODULE_LEVEL in changed:
+        return None
+    try:
+        references = test_references(test_code)
+    except SyntaxError:
+        return None
+
+    # "Classe.methode" → la classe et la méthode peuvent être référencées
+    short_names = set()
+    for name in changed:
+        short_names.update(name.split("."))
+    return [node_id for node_id, names in references.items() if names & short_names]
+
+
+def _base_names(node: ast.ClassDef) -> list[str]:
+    """Noms des classes de base ("unittest.TestCase" → "TestCase")."""
+    names = []
+    for base in node.bases:
+        if isinstance(base, ast.Name):
+            names.append(base.id)
+        elif isinstance(base, ast.Attribute):
+            names.append(base.attr)
+    return names
+
+
+def _class_chain(node: ast.ClassDef, classes: dict) -> list:
+    """La classe puis ses bases définies dans le même fichier (ordre de résolution simplifié)."""
+    chain, pending = [], [node]
+    while pending:
+        current = pending.pop(0)
+        if current in chain:
+            continue
+        chain.append(current)
+        pending.extend(classes[name] for name in _base_names(current)
+                       if name in classes and classes[name] is not current)
+    return chain
+
+
+def _is_testcase(node: ast.ClassDef, classes: dict) -> bool:
+    """Sous-classe de unittest.TestCase (directe ou via une classe du fichier) : collectée quel que soit son nom."""
+    return any(name in ("TestCase", "IsolatedAsyncioTestCase")
+               for owner in _class_chain(node, classes) for name in _base_names(owner))
+
+
+def _referenced_names(func: ast.AST) -> set:
+    """Noms (variables, appels, attributs, arguments) utilisés dans une fonction."""
+    # Arguments inclus : fixtures définies dans le fichier de test
+    names = {arg.arg for arg in func.args.args}
+    for node in ast.walk(func):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.Attribute):
+            names.add(node.attr)
+    return names
@@ -5,8 +5,23 @@ Sécurité : aucune écriture hors du dossier sandbox autorisée.
 """
 
 import os
+import re
+import signal
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource  # POSIX uniquement : pas de limites sous Windows
+except ImportError:
+    resource = None
+
+from src.utils.output_capture import BoundedCapture
+from src.utils.sandbox import sandbox_manager
+from src.utils.stages import stage
+from src.utils.test_impact import test_references
 
 
 # ─── Résolution du dossier sandbox autorisé ─────────────────────────────────
@@ -15,6 +30,10 @@ _PROJECT_ROOT = os.path.abspath(
 )
 SANDBOX_ROOT = os.path.join(_PROJECT_ROOT, "sandbox")
 
+# Dossier de sortie des fichiers corrigés (sous-arbre propre à chaque worker
+# en mode shardé, via SWARM_SANDBOX_SUBDIR)
+SANDBOX_OUTPUT_DIR = os.path.join(SANDBOX_ROOT, os.getenv("SWARM_SANDBOX_SUBDIR", ""))
+
 
 # ─── Sécurité : vérifier qu'un chemin reste dans le sandbox ─────────────────
 def _assert_in_sandbox(path: str) -> str:
@@ -33,17 +52,17 @@ def read_file(filepath: str) -> str:
     abs_path = os.path.abspath(filepath)
     if not os.path.isfile(abs_path):
         raise FileNotFoundError(f"[TOOLS] Fichier introuvable : {abs_path}")
-    with open(abs_path, "r", encoding="utf-8") as f:
-        return f.read()
+    return sandbox_manager.read(abs_path)
 
 
 # ─── Écriture d'un fichier (uniquement dans le sandbox) ─────────────────────
-def write_file(filepath: str, content: str) -> None:
-    """Écrit du contenu dans un fichier — uniquement dans le sandbox."""
+def write_file(filepath: str, content: str) -> bool:
+    """
+    Écrit du contenu dans un fichier — uniquement dans le sandbox.
+    Retourne False si le contenu était déjà identique (écriture ignorée).
+    """
     safe = _assert_in_sandbox(filepath)
-    os.makedirs(os.path.dirname(safe), exist_ok=True)
-    with open(safe, "w", encoding="utf-8") as f:
-        f.write(content)
+    return sandbox_manager.write(safe, content)
 
 
 # ─── Liste des fichiers Python dans un dossier ──────────────────────────────
@@ -57,74 +76,389 @@ def list_python_files(directory: str) -> list[str]:
     return sorted(py_files)
 
 
+# ─── Cache des résultats pylint (par hash du contenu) ────────────────────────
+_pylint_cache = {}  # chemin absolu -> (digest, résultat)
+_pylint_lock = threading.Lock()
+_PYLINT_MESSAGE = re.compile(r":\d+:\d+: [CRWEF]\d{4}:", re.MULTILINE)
+
+
+def _invalidate_pylint(abs_path: str) -> None:
+    with _pylint_lock:
+        _pylint_cache.pop(abs_path, None)
+
+
+sandbox_manager.subscribe(_invalidate_pylint)
+
+
 # ─── Exécution de pylint sur un fichier ──────────────────────────────────────
 def run_pylint(filepath: str) -> dict:
     """
     Lance pylint sur `filepath`.
     Retourne { "score": float, "messages": str, "returncode": int }
+    Un fichier dont le contenu n'a pas changé n'est pas ré-analysé.
     """
     abs_path = os.path.abspath(filepath)
-    cmd = [
-        sys.executable, "-m", "pylint",
-        abs_path,
-        "--output-format=text",
-        "--disable=C0114,C0115,C0116"   # on ignore les docstrings manquantes en score
-    ]
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-    except subprocess.TimeoutExpired:
-        return {"score": 0.0, "messages": "Timeout", "returncode": -1}
+        digest = sandbox_manager.digest(abs_path)
+    except (OSError, UnicodeDecodeError):
+        digest = None
+    with _pylint_lock:
+        cached = _pylint_cache.get(abs_path)
+    if digest and cached and cached[0] == digest:
+        return dict(cached[1])
+
+    with stage("lint"):
+        result = _run_pylint_uncached(abs_path)
+    if digest and result["returncode"] != -1:
+        with _pylint_lock:
+            _pylint_cache[abs_path] = (digest, result)
+    return dict(result)
+
+
+def count_pylint_messages(messages: str) -> int:
+    """Nombre de messages pylint (lignes `fichier:ligne:col: CODE: ...`)."""
+    return len(_PYLINT_MESSAGE.findall(messages))
+
+
+PYLINT_OPTIONS = ["--output-format=text", "--disable=C0114,C0115,C0116"]  # docstrings ignorées en score
+
+# Moteur pylint chaud (mode serveur) : None = un sous-processus par analyse
+_warm_linter = None
+
+
+def enable_warm_lint(workers: int = None) -> None:
+    """Garde `workers` processus pylint chargés pour les analyses suivantes."""
+    global _warm_linter
+    from src.utils.lint_worker import WarmLinter
+    if _warm_linter is None:
+        _warm_linter = WarmLinter(workers or os.cpu_count() or 1)
+
+
+def disable_warm_lint() -> None:
+    """Arrête les processus pylint gardés chauds."""
+    global _warm_linter
+    if _warm_linter is not None:
+        _warm_linter.close()
+        _warm_linter = None
+
+
+def _run_pylint_uncached(abs_path: str) -> dict:
+    if _warm_linter is not None:
+        response = _warm_linter.lint(abs_path, PYLINT_OPTIONS)
+        if response is not None:
+            return {
+                "score": _parse_pylint_score(response["stdout"]),
+                "messages": response["stdout"],
+                "returncode": response["returncode"]
+            }
+
+    cmd = [sys.executable, "-m", "pylint", abs_path, *PYLINT_OPTIONS]
+    try:
+        run = run_limited(cmd, timeout=60, limits=False, name="pylint")
     except FileNotFoundError:
         return {"score": 0.0, "messages": "pylint not installed", "returncode": -1}
+    if run["resource_error"] == "timeout":
+        return {"score": 0.0, "messages": "Timeout", "returncode": -1}
 
-    # Extraction du score (dernière ligne typique : "Rated at X.00/10")
+    return {
+        "score": _parse_pylint_score(run["output"]),
+        "messages": run["output"],
+        "returncode": run["returncode"]
+    }
+
+
+def _parse_pylint_score(stdout: str) -> float:
+    """Extraction du score (dernière ligne typique : "Rated at X.00/10")."""
     score = 0.0
-    for line in result.stdout.splitlines():
+    for line in stdout.splitlines():
         if "Rated at" in line or "rated at" in line:
             try:
                 parts = line.lower().split("rated at")[1].split("/")[0].strip()
                 score = float(parts)
             except (IndexError, ValueError):
                 pass
-
-    return {
-        "score": score,
-        "messages": result.stdout + result.stderr,
-        "returncode": result.returncode
-    }
+    return score
 
 
 # ─── Exécution de pytest sur un fichier ou dossier ──────────────────────────
-def run_pytest(target: str) -> dict:
+# Répartition des tests d'un gros fichier sur plusieurs processus pytest
+PYTEST_WORKERS = int(os.getenv("SWARM_PYTEST_WORKERS", str(os.cpu_count() or 1)))
+PYTEST_PARALLEL_MIN_TESTS = int(os.getenv("SWARM_PYTEST_PARALLEL_MIN_TESTS", "16"))
+PYTEST_TIMEOUT = 120
+
+
+def run_pytest(target: str, extra_paths: list[str] = None, selection: list[str] = None,
+               fail_fast: bool = False) -> dict:
     """
     Lance pytest sur `target` (fichier ou dossier).
-    Retourne { "passed": bool, "output": str, "returncode": int }
+    `extra_paths` : dossiers ajoutés au PYTHONPATH (modules voisins).
+    `selection` : node ids relatifs à `target` ("test_x", "TestC::test_x")
+    pour n'exécuter que ces tests ; `fail_fast` : arrêt au premier échec (-x).
+    Un fichier d'au moins PYTEST_PARALLEL_MIN_TESTS tests est réparti en
+    lots exécutés en parallèle (même timeout, sorties concaténées).
+    Retourne { "passed", "output", "returncode", "resource_error", "usage",
+    "capture" } (mêmes clés avec ou sans lots, voir run_limited).
     """
     abs_path = os.path.abspath(target)
-    cmd = [sys.executable, "-m", "pytest", abs_path, "-v", "--tb=short"]
+    env = None
+    if extra_paths:
+        env = dict(os.environ)
+        paths = [os.path.abspath(p) for p in extra_paths]
+        if env.get("PYTHONPATH"):
+            paths.append(env["PYTHONPATH"])
+        env["PYTHONPATH"] = os.pathsep.join(paths)
+
+    # Estimation statique d'abord : la collecte pytest n'est payée que pour un gros fichier
+    node_ids = selection or _static_test_ids(abs_path)
+    num_chunks = _num_chunks(len(node_ids))
+    if num_chunks >= 2 and not selection:
+        # Node ids réels (classes unittest.TestCase, paramétrage...) ; collecte
+        # douteuse → fichier entier en un seul lot plutôt que des tests oubliés
+        node_ids = _collect_test_ids(abs_path, env) or []
+        num_chunks = _num_chunks(len(node_ids))
+    if num_chunks < 2:
+        targets = [f"{abs_path}::{node_id}" for node_id in selection] if selection else [abs_path]
+        return _run_pytest_once(targets, fail_fast, env)
+
+    # Round-robin : les tests d'une même fonction se retrouvent dans des lots différents
+    chunks = [node_ids[i::num_chunks] for i in range(num_chunks)]
+    with ThreadPoolExecutor(max_workers=num_chunks) as executor:
+        runs = list(executor.map(
+            lambda chunk: _run_pytest_once([f"{abs_path}::{n}" for n in chunk], fail_fast, env),
+            chunks
+        ))
+
+    output = "\n".join(
+        f"─── Lot {i}/{num_chunks} ({len(chunk)} tests) ───\n{run['output']}"
+        for i, (chunk, run) in enumerate(zip(chunks, runs), 1)
+    )
+    failed = [run["returncode"] for run in runs if not run["passed"]]
+    return {
+        "passed": not failed,
+        "output": output,
+        "returncode": failed[0] if failed else 0,
+        "resource_error": next((run["resource_error"] for run in runs if run["resource_error"]), None),
+        "usage": _merge_usage([run["usage"] for run in runs]),
+        "capture": _merge_capture([run["capture"] for run in runs])
+    }
+
+
+def _merge_usage(usages: list[dict]) -> dict:
+    """Lots parallèles : CPU cumulé, pic mémoire et durée du lot le plus lent."""
+    merged = {"wall_s": max(u.get("wall_s", 0.0) for u in usages)}
+    if any("cpu_s" in u for u in usages):
+        merged["cpu_s"] = round(sum(u.get("cpu_s", 0.0) for u in usages), 3)
+        merged["max_rss_mb"] = max(u.get("max_rss_mb", 0.0) for u in usages)
+    return merged
+
+
+def _merge_capture(captures: list[dict]) -> dict:
+    """Captures des lots : tailles cumulées, premier fichier de débordement."""
+    return {
+        "chars": sum(c["chars"] for c in captures),
+        "lines": sum(c["lines"] for c in captures),
+        "truncated": any(c["truncated"] for c in captures),
+        "spill_path": next((c["spill_path"] for c in captures if c["spill_path"]), None)
+    }
+
+
+def _run_pytest_once(targets: list[str], fail_fast: bool, env) -> dict:
+    cmd = [sys.executable, "-m", "pytest", *targets, "-v", "--tb=short"]
+    if fail_fast:
+        cmd.append("-x")
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-    except subprocess.TimeoutExpired:
-        return {"passed": False, "output": "Timeout", "returncode": -1}
+        with stage("test"):
+            run = run_limited(cmd, timeout=PYTEST_TIMEOUT, env=env, name="pytest")
     except FileNotFoundError:
         return {"passed": False, "output": "pytest not installed", "returncode": -1}
 
+    if run["resource_error"] == "timeout":
+        output = "Timeout"
+    elif run["resource_error"]:
+        output = f"{run['output']}\nRESOURCE LIMIT EXCEEDED : {run['resource_error']}"
+    else:
+        output = run["output"]
+    return {
+        "passed": run["returncode"] == 0,
+        "output": output,
+        "returncode": -1 if run["resource_error"] == "timeout" else run["returncode"],
+        "resource_error": run["resource_error"],
+        "usage": run["usage"],
+        "capture": run["capture"]
+    }
+
+
+def _num_chunks(num_tests: int) -> int:
+    """Nombre de lots pour `num_tests` tests (< 2 : pas de répartition)."""
+    if num_tests < PYTEST_PARALLEL_MIN_TESTS:
+        return 0
+    return min(PYTEST_WORKERS, num_tests // max(PYTEST_PARALLEL_MIN_TESTS // 2, 1))
+
+
+def _static_test_ids(abs_path: str) -> list[str]:
+    """
+    Tests d'un fichier par analyse statique : fonctions test* et méthodes
+    des classes Test* seulement, donc une estimation (jamais exécutée telle quelle).
+    """
+    if not os.path.isfile(abs_path):
+        return []
+    try:
+        return list(test_references(sandbox_manager.read(abs_path)))
+    except (SyntaxError, UnicodeDecodeError):
+        return []
+
+
+def _collect_test_ids(abs_path: str, env) -> list[str] | None:
+    """
+    Node ids relatifs au fichier, d'après `pytest --collect-only -q`.
+    None si la collecte échoue ou ne correspond pas au fichier demandé.
+    """
+    cmd = [sys.executable, "-m", "pytest", abs_path, "--collect-only", "-q", "-p", "no:cacheprovider"]
+    try:
+        with stage("test"):
+            run = run_limited(cmd, timeout=PYTEST_TIMEOUT, env=env, name="collect")
+    except FileNotFoundError:
+        return None
+    if run["returncode"] != 0 or run["capture"]["truncated"]:
+        return None
+
+    basename = os.path.basename(abs_path)
+    node_ids = []
+    for line in run["output"].splitlines():
+        path, sep, node_id = line.strip().partition("::")
+        if not sep:
+            continue
+        if os.path.basename(path) != basename:
+            return None
+        node_ids.append(node_id)
+    return node_ids or None
+
+
+# ─── Exécution sous limites de ressources ──────────────────────────────────
+# Taille des lectures du tube de sortie (la capture elle-même est bornée)
+CAPTURE_READ_CHARS = 64 * 1024
+# Code et tests générés par le LLM : une boucle infinie ou une allocation
+# démesurée ne doit pas monopoliser la machine partagée par les workers
+LIMIT_CPU_S = int(os.getenv("SWARM_LIMIT_CPU_S", "60"))
+LIMIT_MEMORY_MB = int(os.getenv("SWARM_LIMIT_MEMORY_MB", "1024"))
+LIMIT_FSIZE_MB = int(os.getenv("SWARM_LIMIT_FSIZE_MB", "64"))
+
+# Explication transmise au Fixer quand une exécution est arrêtée
+RESOURCE_ERROR_HINTS = {
+    "timeout": "délai dépassé (boucle infinie ou attente bloquante ?)",
+    "cpu_limit": "limite de temps CPU dépassée (boucle infinie, récursion ou algorithme trop coûteux ?)",
+    "memory_limit": "limite mémoire dépassée (allocation démesurée ou structure qui grossit sans fin ?)",
+    "file_size_limit": "limite de taille de fichier dépassée (écriture sans fin ?)"
+}
+
+
+# Lanceur exécuté dans l'enfant : pose les rlimits puis se remplace par la
+# commande (exec, même pid). Pas de preexec_fn : run_limited est appelé depuis
+# des threads, et un fork suivi de code Python peut s'y bloquer sur un verrou.
+# Limite CPU souple → SIGXCPU (identifiable) ; la dure ne sert que de filet.
+_LIMITS_LAUNCHER = """\
+import os, resource, sys
+cpu_s, memory_mb, fsize_mb = (int(v) for v in sys.argv[1:4])
+if cpu_s > 0:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_s, cpu_s + 5))
+for rlimit, size_mb in ((resource.RLIMIT_AS, memory_mb), (resource.RLIMIT_FSIZE, fsize_mb)):
+    if size_mb > 0:
+        resource.setrlimit(rlimit, (size_mb * 1024 * 1024,) * 2)
+os.execvp(sys.argv[4], sys.argv[4:])
+"""
+
+
+def _with_limits(cmd: list[str]) -> list[str]:
+    """`cmd` précédée du lanceur qui lui applique les rlimits (POSIX)."""
+    return [sys.executable, "-c", _LIMITS_LAUNCHER,
+            str(LIMIT_CPU_S), str(LIMIT_MEMORY_MB), str(LIMIT_FSIZE_MB), *cmd]
+
+
+def run_limited(cmd: list[str], timeout: float, env=None, limits: bool = True,
+                name: str = "run") -> dict:
+    """
+    Lance `cmd` dans son propre groupe de processus, sous rlimits (POSIX)
+    si `limits`. Au timeout, tout le groupe est tué (pas d'enfant orphelin).
+    La sortie est lue en flux dans une BoundedCapture : mémoire plafonnée
+    quelle que soit la taille de la sortie, intégralité dans logs/spill/.
+    Retourne { "returncode", "output", "resource_error", "usage", "capture" } avec
+    resource_error ∈ {None, "timeout", "cpu_limit", "memory_limit", "file_size_limit"},
+    usage = {"wall_s", "cpu_s", "max_rss_mb"} et capture = BoundedCapture.stats().
+    """
+    posix = resource is not None and hasattr(os, "wait4")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        _with_limits(cmd) if posix and limits else cmd,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env,
+        encoding="utf-8", errors="replace", start_new_session=posix
+    )
+
+    timed_out = threading.Event()
+
+    def kill_group():
+        timed_out.set()
+        try:
+            if posix:
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    capture = BoundedCapture(name)
+    timer = threading.Timer(timeout, kill_group)
+    timer.start()
+    try:
+        while True:
+            chunk = process.stdout.read(CAPTURE_READ_CHARS)
+            if not chunk:
+                break
+            capture.write(chunk)
+        process.stdout.close()
+        capture.close()
+        if posix:
+            _, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            usage = {"cpu_s": round(rusage.ru_utime + rusage.ru_stime, 3),
+                     "max_rss_mb": round(rusage.ru_maxrss / 1024, 1)}  # ru_maxrss en Ko (Linux)
+        else:
+            process.wait()
+            usage = {}
+    finally:
+        timer.cancel()
+    usage["wall_s"] = round(time.perf_counter() - started, 3)
+
+    output = capture.getvalue()
     return {
-        "passed": result.returncode == 0,
-        "output": result.stdout + result.stderr,
-        "returncode": result.returncode
+        "returncode": process.returncode,
+        "output": output,
+        "resource_error": _classify_resource_error(process.returncode, output, usage,
+                                                   timed_out.is_set()),
+        "usage": usage,
+        "capture": capture.stats()
     }
 
 
+def _classify_resource_error(returncode: int, output: str, usage: dict, timed_out: bool):
+    if timed_out:
+        return "timeout"
+    if returncode == -getattr(signal, "SIGXCPU", -1) or (
+            returncode == -signal.SIGKILL and usage.get("cpu_s", 0) >= LIMIT_CPU_S):
+        return "cpu_limit"
+    if returncode == -getattr(signal, "SIGXFSZ", -1) or "File too large" in output:
+        return "file_size_limit"
+    if returncode != 0 and "MemoryError" in output:
+        return "memory_limit"
+    return None
+
+
 # ─── Copie d'un fichier vers le sandbox ─────────────────────────────────────
 def copy_to_sandbox(src_path: str, dest_relative: str) -> str:
     """
     Copie un fichier source vers sandbox/<dest_relative>.
     Retourne le chemin complet dans le sandbox.
+    Hardlink/reflink si possible ; rien n'est fait si le contenu est identique.
     """
-    import shutil
     dest = os.path.join(SANDBOX_ROOT, dest_relative)
     _assert_in_sandbox(dest)
-    os.makedirs(os.path.dirname(dest), exist_ok=True)
-    shutil.copy2(src_path, dest)
-    return dest
+    return sandbox_manager.stage(src_path, dest)
@@ -0,0 +1,124 @@
+"""
+workspace.py — Espace de travail isolé par fichier et par itération.
+Chaque itération a son propre dossier, peuplé par hardlinks depuis
+l'itération précédente (copy-on-write : toute écriture passe par
+SandboxManager, qui remplace le lien au lieu de modifier le fichier).
+La meilleure version est ensuite promue atomiquement dans le sandbox.
+"""
+
+import os
+import shutil
+
+from src.utils.sandbox import sandbox_manager
+from src.utils.tools import SANDBOX_OUTPUT_DIR, _assert_in_sandbox
+
+WORK_DIR_NAME = ".work"
+
+
+class Workspace:
+    """Dossiers sandbox/.work/<module>/iter_<k>/ d'un fichier"""
+
+    def __init__(self, filename: str, output_dir: str = SANDBOX_OUTPUT_DIR, resume: bool = False):
+        self.filename = filename
+        self.output_dir = os.path.abspath(output_dir)
+        self.root = _assert_in_sandbox(
+            os.path.join(self.output_dir, WORK_DIR_NAME, os.path.splitext(filename)[0])
+        )
+        self.records = []  # [{"iteration", "passed", "score"}]
+        if not resume:
+            self.cleanup()
+
+    def iteration_dir(self, k: int) -> str:
+        return os.path.join(self.root, f"iter_{k}")
+
+    def file_path(self, k: int) -> str:
+        """Chemin du fichier traité dans l'itération `k`."""
+        return os.path.join(self.iteration_dir(k), self.filename)
+
+    def new_iteration(self, k: int) -> str:
+        """
+        Crée le dossier de l'itération `k`, avec des liens vers les fichiers
+        de l'itération `k-1` (code corrigé, tests générés).
+        Retourne le chemin du fichier traité dans cette itération.
+        """
+        if k > 0:
+            self._link_files(self.iteration_dir(k - 1), self.iteration_dir(k))
+        else:
+            os.makedirs(self.iteration_dir(k), exist_ok=True)
+        return self.file_path(k)
+
+    def candidate_path(self, k: int, i: int) -> str:
+        """
+        Crée un dossier pour le candidat `i` de l'itération `k` (mode best-of-N),
+        peuplé comme une nouvelle itération. Retourne le chemin du fichier.
+        """
+        cand_dir = os.path.join(self.root, f"iter_{k}_cand_{i}")
+        if k > 0:
+            self._link_files(self.iteration_dir(k - 1), cand_dir)
+        else:
+            os.makedirs(cand_dir, exist_ok=True)
+        return os.path.join(cand_dir, self.filename)
+
+    def adopt_candidate(self, k: int, candidate_file: str) -> str:
+        """
+        Le candidat retenu devient l'itération `k` (liens vers son code et ses
+        tests), puis les dossiers candidats de `k` sont supprimés.
+        """
+        self._link_files(os.path.dirname(candidate_file), self.iteration_dir(k))
+
+        for name in os.listdir(self.root):
+            if name.startswith(f"iter_{k}_cand_"):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        return self.file_path(k)
+
+    def record(self, k: int, passed: bool, score: float) -> None:
+        """Enregistre le résultat du Judge pour l'itération `k`."""
+        self.records = [r for r in self.records if r["iteration"] != k]
+        self.records.append({"iteration": k, "passed": passed, "score": score or 0.0})
+
+    def best_iteration(self):
+        """Itération à promouvoir : tests OK d'abord, puis score pylint, puis la plus récente."""
+        candidates = [r for r in self.records if os.path.isfile(self.file_path(r["iteration"]))]
+        if not candidates:
+            return None
+        best = max(candidates, key=lambda r: (r["passed"], r["score"], r["iteration"]))
+        return best["iteration"]
+
+    def promote(self):
+        """
+        Publie la meilleure version (et ses tests) dans le dossier de sortie.
+        Chaque fichier est remplacé atomiquement (lien temporaire + os.replace).
+        Retourne le chemin final, ou None si aucune itération n'est disponible.
+        """
+        k = self.best_iteration()
+        if k is None:
+            return None
+
+        test_name = f"test_{self.filename}"
+        test_src = os.path.join(self.iteration_dir(k), test_name)
+        if os.path.isfile(test_src):
+            sandbox_manager.stage(test_src, os.path.join(self.output_dir, test_name))
+
+        final_path = os.path.join(self.output_dir, self.filename)
+        sandbox_manager.stage(self.file_path(k), final_path)
+        print(f"[WORKSPACE] 📦 Itération {k + 1} promue : {final_path}")
+        return final_path
+
+    @staticmethod
+    def _link_files(src_dir: str, dest_dir: str) -> None:
+        """Peuple `dest_dir` de liens vers les fichiers de `src_dir`."""
+        os.makedirs(dest_dir, exist_ok=True)
+        if not os.path.isdir(src_dir):
+            return
+        for name in os.listdir(src_dir):
+            src = os.path.join(src_dir, name)
+            if os.path.isfile(src) and not name.endswith(".tmp"):
+                sandbox_manager.stage(src, os.path.join(dest_dir, name))
+
+    def cleanup(self) -> None:
+        """Supprime les dossiers d'itération (des liens : suppression peu coûteuse)."""
+        shutil.rmtree(self.root, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(self.root))  # .work/ si plus aucun fichier en cours
+        except OSError:
+            pass
@@ -0,0 +1,71 @@
+"""Pré-audit par lots, fenêtre par fenêtre (src/orchestration/pipeline.py)."""
+
+import pytest
+
+from src.orchestration import pipeline
+from src.orchestration.checkpoint import Checkpoint
+from src.utils.fix_store import FixStore
+
+FILES = [f"m{i}.py" for i in range(1, 6)]
+
+
+class FakeAuditor:
+    def __init__(self):
+        self.batches = []
+
+    def analyze_files_batch(self, paths):
+        self.batches.append(sorted(p.rsplit("/", 1)[-1] for p in paths))
+        return {p: {"issues": [], "summary": "ok"} for p in paths}
+
+
+@pytest.fixture
+def target(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "BATCH_WINDOW", 2)
+    directory = tmp_path / "cible"
+    directory.mkdir()
+    for i, name in enumerate(FILES, 1):
+        (directory / name).write_text(f"def f{i}(x):\n    return x + {i}\n", encoding="utf-8")
+    return str(directory)
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    return str(tmp_path / "checkpoint.jsonl")
+
+
+def test_windows_are_audited_on_demand(target):
+    auditor = FakeAuditor()
+    batch = pipeline._WindowedAudit(auditor, target, FILES)
+    assert auditor.batches == []
+    assert batch.analysis_for("m1.py") == {"issues": [], "summary": "ok"}
+    assert auditor.batches == [["m1.py", "m2.py"]]
+    batch.analysis_for("m2.py")
+    assert auditor.batches == [["m1.py", "m2.py"]]
+    batch.analysis_for("m3.py")
+    assert auditor.batches == [["m1.py", "m2.py"], ["m3.py", "m4.py"]]
+
+
+def test_fix_store_hits_are_not_audited(target, tmp_path):
+    store = FixStore(str(tmp_path / "fix_store.json"))
+    with open(f"{target}/m2.py", encoding="utf-8") as f:
+        store.record(f.read(), "def f2(x):\n    return x\n", "m2.py")
+    auditor = FakeAuditor()
+    batch = pipeline._WindowedAudit(auditor, target, FILES, fix_store=store)
+    batch.analysis_for("m1.py")
+    assert auditor.batches == [["m1.py"]]
+    assert batch.analysis_for("m2.py") is None
+
+
+def test_audits_are_checkpointed_as_they_return(target, checkpoint_path):
+    checkpoint = Checkpoint(target, path=checkpoint_path)
+    pipeline._WindowedAudit(FakeAuditor(), target, FILES, checkpoint).analysis_for("m1.py")
+
+    # Run interrompu : les audits de la fenêtre sont déjà sur disque
+    resumed = Checkpoint(target, resume=True, path=checkpoint_path)
+    assert resumed.get("m2.py") == {"stage": "audited", "analysis": {"issues": [], "summary": "ok"}}
+
+    auditor = FakeAuditor()
+    batch = pipeline._WindowedAudit(auditor, target, FILES, resumed)
+    assert batch.analysis_for("m2.py") is None
+    batch.analysis_for("m5.py")
+    assert auditor.batches == [["m5.py"]]
@@ -0,0 +1,103 @@
+"""Reprise d'un run interrompu (src/orchestration/checkpoint.py)."""
+
+import json
+
+import pytest
+
+from src.orchestration.checkpoint import Checkpoint
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "logs" / "checkpoint.jsonl")
+
+
+@pytest.fixture
+def target(tmp_path):
+    directory = tmp_path / "cible"
+    directory.mkdir()
+    return str(directory)
+
+
+def _run(target, journal):
+    """Un run interrompu : un fichier terminé, un autre arrêté après un verdict."""
+    checkpoint = Checkpoint(target, path=journal)
+    checkpoint.update("a.py", stage="audited", analysis={"issues": [{"id": 1}]})
+    checkpoint.update("a.py", stage="fixed", iteration=1)
+    checkpoint.update("a.py", stage="judged", iteration=1, success=True, feedback="")
+    checkpoint.update("a.py", stage="done", result={"success": True, "iterations": 1})
+    checkpoint.update("b.py", stage="audited", analysis={"issues": []})
+    checkpoint.update("b.py", stage="judged", iteration=2, success=False, feedback="2 tests échoués")
+    return checkpoint
+
+
+# ─── Reprise ────────────────────────────────────────────────────────────────
+
+def test_resume_round_trip(target, journal):
+    before = _run(target, journal)
+    resumed = Checkpoint(target, resume=True, path=journal)
+    for filename in ("a.py", "b.py"):
+        assert resumed.get(filename) == before.get(filename)
+
+
+def test_resume_keeps_latest_fields(target, journal):
+    _run(target, journal)
+    state = Checkpoint(target, resume=True, path=journal).get("b.py")
+    assert state["stage"] == "judged"
+    assert state["iteration"] == 2
+    assert state["success"] is False
+    assert state["analysis"] == {"issues": []}
+
+
+def test_updates_after_resume_are_kept(target, journal):
+    _run(target, journal)
+    Checkpoint(target, resume=True, path=journal).update("b.py", stage="done", result={"success": False})
+    state = Checkpoint(target, resume=True, path=journal).get("b.py")
+    assert state["stage"] == "done"
+    assert state["feedback"] == "2 tests échoués"
+
+
+def test_unknown_file_is_empty(target, journal):
+    _run(target, journal)
+    assert Checkpoint(target, resume=True, path=journal).get("c.py") == {}
+
+
+def test_get_returns_a_copy(target, journal):
+    checkpoint = _run(target, journal)
+    checkpoint.get("a.py")["stage"] = "audited"
+    assert checkpoint.get("a.py")["stage"] == "done"
+
+
+# ─── Journal absent, étranger ou tronqué ────────────────────────────────────
+
+def test_without_resume_the_journal_is_reset(target, journal):
+    _run(target, journal)
+    assert Checkpoint(target, path=journal).get("a.py") == {}
+    assert Checkpoint(target, resume=True, path=journal).files == {}
+
+
+def test_missing_journal_starts_from_scratch(target, journal):
+    checkpoint = Checkpoint(target, resume=True, path=journal)
+    assert checkpoint.files == {}
+    checkpoint.update("a.py", stage="audited")
+    assert Checkpoint(target, resume=True, path=journal).get("a.py") == {"stage": "audited"}
+
+
+def test_journal_of_another_target_is_ignored(target, journal, tmp_path):
+    _run(target, journal)
+    other = tmp_path / "autre"
+    other.mkdir()
+    assert Checkpoint(str(other), resume=True, path=journal).files == {}
+
+
+def test_truncated_last_line_is_skipped(target, journal):
+    _run(target, journal)
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"file": "b.py", "stage": "done"})[:20])
+
+    resumed = Checkpoint(target, resume=True, path=journal)
+    assert resumed.get("b.py")["stage"] == "judged"
+
+    # Les ajouts suivants ne sont pas collés à la ligne tronquée
+    resumed.update("b.py", stage="done", result={"success": True})
+    assert Checkpoint(target, resume=True, path=journal).get("b.py")["stage"] == "done"
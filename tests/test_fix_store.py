@@ -0,0 +1,116 @@
+"""Mémoire des corrections validées (src/utils/fix_store.py)."""
+
+import pytest
+
+from src.utils.fix_store import FixStore, code_fingerprint
+
+BUGGY = '''"""Module de calcul."""
+
+def mean(values):
+    """Moyenne."""
+    total = 0
+    for v in values:
+        total += v
+    return total / len(values)  # ZeroDivisionError si vide
+'''
+
+FIXED = BUGGY.replace("return total / len(values)", "return total / len(values) if values else 0.0")
+
+# Même code : autres commentaires, docstrings et mise en page
+RESTYLED = '''
+# Un autre en-tête
+def mean( values ):
+    total = 0   # accumulateur
+
+    for v in values:
+        total += v
+    return (total / len(values))
+'''
+
+BROKEN = "def mean(values)\n    return sum(values) / len(values)\n"
+
+
+# ─── Normalisation AST ──────────────────────────────────────────────────────
+
+def test_fingerprint_is_stable():
+    assert code_fingerprint(BUGGY) == code_fingerprint(BUGGY)
+    assert code_fingerprint(BUGGY).startswith("ast:")
+
+
+def test_comments_docstrings_and_layout_are_ignored():
+    assert code_fingerprint(RESTYLED) == code_fingerprint(BUGGY)
+
+
+def test_class_docstring_is_ignored():
+    with_doc = 'class A:\n    """Doc."""\n    x = 1\n'
+    assert code_fingerprint(with_doc) == code_fingerprint("class A:\n    x = 1\n")
+
+
+def test_docstring_only_body():
+    assert code_fingerprint('def f():\n    """Doc."""\n') == code_fingerprint("def f():\n    pass\n")
+
+
+def test_other_strings_are_kept():
+    assert code_fingerprint('def f():\n    return "a"\n') != code_fingerprint('def f():\n    return "b"\n')
+
+
+def test_code_change_changes_fingerprint():
+    assert code_fingerprint(FIXED) != code_fingerprint(BUGGY)
+
+
+def test_renamed_identifier_changes_fingerprint():
+    # La correction mémorisée cite les noms d'origine : elle ne s'applique pas à un autre code
+    assert code_fingerprint(BUGGY.replace("total", "acc")) != code_fingerprint(BUGGY)
+
+
+# ─── Repli sur les tokens ───────────────────────────────────────────────────
+
+def test_unparsable_code_uses_tokens():
+    assert code_fingerprint(BROKEN).startswith("tok:")
+
+
+def test_token_fingerprint_ignores_comments_and_blank_lines():
+    commented = "# en-tête\ndef mean(values)  # sans ':'\n\n    return sum(values) / len(values)\n"
+    assert code_fingerprint(commented) == code_fingerprint(BROKEN)
+
+
+def test_untokenizable_code():
+    assert code_fingerprint('x = """jamais fermé\n') is None
+
+
+# ─── Store ──────────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "logs" / "fix_store.json")
+
+
+def test_lookup_matches_normalised_code(path):
+    store = FixStore(path)
+    store.record(BUGGY, FIXED, "stats.py")
+    assert store.lookup(RESTYLED) == FIXED
+    assert store.lookup(FIXED) is None
+
+
+def test_store_is_persisted_between_runs(path):
+    FixStore(path).record(BUGGY, FIXED, "stats.py")
+    store = FixStore(path)
+    assert store.lookup(BUGGY) == FIXED
+    store.record_hit(BUGGY)
+    assert next(iter(FixStore(path).entries.values()))["hits"] == 1
+
+
+def test_untokenizable_code_is_not_recorded(path):
+    store = FixStore(path)
+    store.record('x = """jamais fermé\n', "x = ''\n", "bad.py")
+    assert store.entries == {}
+    assert store.lookup('x = """jamais fermé\n') is None
+
+
+def test_shared_store_merges_workers(path):
+    first, second = FixStore(path), FixStore(path)
+    first.record(BUGGY, FIXED, "stats.py")
+    second.record(BROKEN, "def mean(values):\n    return 0\n", "broken.py")
+    merged = FixStore(path)
+    assert merged.lookup(BUGGY) == FIXED
+    assert merged.lookup(BROKEN) is not None
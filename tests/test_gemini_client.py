@@ -0,0 +1,80 @@
+"""Consommation des réponses LLM en streaming (src/utils/gemini_client.py)."""
+
+import types
+
+import pytest
+
+from src.utils import gemini_client
+from src.utils.gemini_client import StreamAborted, _consume_stream
+
+
+def _chunk(text):
+    part = types.SimpleNamespace(text=text)
+    return types.SimpleNamespace(candidates=[types.SimpleNamespace(content=types.SimpleNamespace(parts=[part]))])
+
+
+class FakeTransport:
+    """Itérateur gRPC du SDK : compte les chunks réellement lus"""
+
+    def __init__(self, texts):
+        self.texts = list(texts)
+        self.read = 0
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.cancelled or self.read == len(self.texts):
+            raise StopIteration
+        self.read += 1
+        return _chunk(self.texts[self.read - 1])
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeStreamResponse:
+    def __init__(self, texts):
+        self._iterator = FakeTransport(texts)
+
+    def __iter__(self):
+        return iter(self._iterator)
+
+
+def _stats():
+    return {"stream_first_chunk_s": None, "stream_first_useful_s": None,
+            "stream_aborts": 0, "stream_wasted_tokens": 0}
+
+
+def _refuse_prose(text):
+    return None if text.lstrip().startswith("{") else "hors format"
+
+
+def test_complete_stream():
+    response = FakeStreamResponse(['{"a"', ": 1}"])
+    assert _consume_stream(response, _refuse_prose, _stats(), 0.0) == '{"a": 1}'
+    assert response._iterator.cancelled is False
+
+
+def test_aborted_stream_is_cancelled():
+    response = FakeStreamResponse(["Bien sûr !", " Voici", " l'analyse", " complète"])
+    with pytest.raises(StreamAborted) as aborted:
+        _consume_stream(response, _refuse_prose, _stats(), 0.0)
+    assert aborted.value.args[0] == "hors format"
+    assert response._iterator.cancelled is True
+    assert response._iterator.read == 1
+
+
+def test_last_attempt_is_read_to_the_end():
+    response = FakeStreamResponse(["Bien sûr !", " {}"])
+    assert _consume_stream(response, _refuse_prose, _stats(), 0.0, can_abort=False) == "Bien sûr ! {}"
+
+
+def test_retry_after_abort(monkeypatch):
+    monkeypatch.setattr(gemini_client, "STREAMING_ENABLED", True)
+    responses = iter([FakeStreamResponse(["Bien sûr !", " ..."]), FakeStreamResponse(['{"a": 1}'])])
+    monkeypatch.setattr(gemini_client, "_generate", lambda *args, **kwargs: next(responses))
+    text, stats = gemini_client.call_gemini_stream("système", "question", check=_refuse_prose)
+    assert text == '{"a": 1}'
+    assert stats["stream_aborts"] == 1
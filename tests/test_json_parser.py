@@ -0,0 +1,148 @@
+"""Parsing tolérant des réponses JSON des LLM (src/utils/json_parser.py)."""
+
+import pytest
+
+from src.utils.json_parser import JSONParseError, parse_json_response, validate
+
+SCHEMA = {
+    "verdict": {"type": str, "required": True, "choices": {"PASS", "FAIL"}},
+    "score": {"type": (int, float)},
+    "ok": {"type": bool},
+    "lines": {"type": list, "default": []},
+    "issues": {"type": list, "items": dict, "default": []}
+}
+
+
+# ─── Extraction ─────────────────────────────────────────────────────────────
+
+def test_plain_object():
+    data, repaired = parse_json_response('{"a": 1}')
+    assert data == {"a": 1}
+    assert repaired is False
+
+
+def test_fenced_json_block():
+    raw = 'Voici le résultat :\n```json\n{"a": 1, "b": [1, 2]}\n```\nBonne journée.'
+    assert parse_json_response(raw)[0] == {"a": 1, "b": [1, 2]}
+
+
+def test_fence_without_language():
+    assert parse_json_response('```\n{"a": 1}\n```')[0] == {"a": 1}
+
+
+def test_unclosed_fence():
+    assert parse_json_response('```json\n{"a": 1}')[0] == {"a": 1}
+
+
+def test_fence_without_object_falls_back_to_raw_text():
+    raw = '```python\nx = 1\n```\n{"a": 2}'
+    assert parse_json_response(raw)[0] == {"a": 2}
+
+
+def test_prose_around_object():
+    data, repaired = parse_json_response('Analyse : {"a": 1} — fin de l\'analyse {pas du json}')
+    assert data == {"a": 1}
+    assert repaired is False
+
+
+@pytest.mark.parametrize("raw", ["", None, "pas de JSON ici", "[1, 2, 3]"])
+def test_no_object(raw):
+    with pytest.raises(JSONParseError):
+        parse_json_response(raw)
+
+
+# ─── Réparation ─────────────────────────────────────────────────────────────
+
+def test_trailing_commas_are_repaired():
+    data, repaired = parse_json_response('{"a": [1, 2,], "b": 3,}')
+    assert data == {"a": [1, 2], "b": 3}
+    assert repaired is True
+
+
+def test_truncated_response_is_closed():
+    data, repaired = parse_json_response('{"issues": [{"id": 1, "description": "variable non util')
+    assert repaired is True
+    assert data["issues"][0]["id"] == 1
+    assert data["issues"][0]["description"].startswith("variable non util")
+
+
+def test_truncated_after_key_drops_the_incomplete_pair():
+    data, _ = parse_json_response('{"a": 1, "b": 2, "c":')
+    assert data == {"a": 1, "b": 2}
+
+
+def test_truncated_number_inside_list():
+    data, _ = parse_json_response('{"lines": [10, 20, 3')
+    assert data["lines"][:2] == [10, 20]
+
+
+def test_escaped_quote_in_truncated_string():
+    data, _ = parse_json_response('{"msg": "il dit \\"bonjour')
+    assert data["msg"].startswith('il dit "bonjour')
+
+
+def test_irreparable():
+    with pytest.raises(JSONParseError):
+        parse_json_response('{::::}')
+
+
+# ─── Validation contre un schéma ────────────────────────────────────────────
+
+def test_required_field_missing():
+    with pytest.raises(JSONParseError):
+        validate({"score": 5}, SCHEMA)
+
+
+def test_choices_are_normalized():
+    assert validate({"verdict": " pass "}, SCHEMA)["verdict"] == "PASS"
+
+
+def test_choice_outside_allowed_values():
+    with pytest.raises(JSONParseError):
+        validate({"verdict": "MAYBE"}, SCHEMA)
+
+
+@pytest.mark.parametrize("raw_score, expected", [("7.5", 7.5), ("8/10", 8.0), (7, 7)])
+def test_score_coercion(raw_score, expected):
+    assert validate({"verdict": "PASS", "score": raw_score}, SCHEMA)["score"] == expected
+
+
+@pytest.mark.parametrize("raw_bool, expected", [("true", True), ("False", False), (True, True)])
+def test_bool_coercion(raw_bool, expected):
+    assert validate({"verdict": "PASS", "ok": raw_bool}, SCHEMA)["ok"] is expected
+
+
+def test_invalid_type():
+    with pytest.raises(JSONParseError):
+        validate({"verdict": "PASS", "score": "beaucoup"}, SCHEMA)
+
+
+def test_list_items_keep_only_objects():
+    data = validate({"verdict": "PASS", "issues": [{"id": 1}, "texte", 3, {"id": 2}]}, SCHEMA)
+    assert data["issues"] == [{"id": 1}, {"id": 2}]
+
+
+def test_unknown_fields_are_kept():
+    assert validate({"verdict": "FAIL", "extra": 1}, SCHEMA)["extra"] == 1
+
+
+def test_input_is_not_modified():
+    data = {"verdict": "pass"}
+    validate(data, SCHEMA)
+    assert data == {"verdict": "pass"}
+
+
+def test_mutable_defaults_are_not_shared():
+    first = validate({"verdict": "PASS"}, SCHEMA)
+    first["lines"].append(42)
+    first["issues"].append({"id": 1})
+    second = validate({"verdict": "PASS"}, SCHEMA)
+    assert second["lines"] == []
+    assert second["issues"] == []
+    assert SCHEMA["lines"]["default"] == []
+
+
+def test_parse_with_schema():
+    data, repaired = parse_json_response('```json\n{"verdict": "fail", "score": "3.5",}\n```', SCHEMA)
+    assert data == {"verdict": "FAIL", "score": 3.5, "lines": [], "issues": []}
+    assert repaired is True
@@ -0,0 +1,55 @@
+"""File de jobs du mode serveur (src/orchestration/server.py)."""
+
+import os
+
+import pytest
+
+from src.orchestration import server
+
+
+@pytest.fixture
+def target(tmp_path):
+    directory = tmp_path / "cible"
+    directory.mkdir()
+    (directory / "utils.py").write_text("def f():\n    return 1\n", encoding="utf-8")
+    return str(directory)
+
+
+# ─── Soumission ─────────────────────────────────────────────────────────────
+
+def test_submit_default_files(target):
+    job = server.JobServer().submit({"target_dir": target})
+    assert job.files == ["utils.py"]
+    assert job.events[-1]["event"] == "queued"
+
+
+@pytest.mark.parametrize("files", [
+    ["../utils.py"], ["sous/utils.py"], ["..\\utils.py"], ["/etc/passwd.py"],
+    ["utils.txt"], [".py"], [3], "utils.py", {"utils.py": 1},
+])
+def test_submit_rejects_paths_and_non_modules(target, files):
+    with pytest.raises(ValueError):
+        server.JobServer().submit({"target_dir": target, "files": files})
+
+
+def test_submit_missing_file(target):
+    with pytest.raises(ValueError):
+        server.JobServer().submit({"target_dir": target, "files": ["absent.py"]})
+
+
+# ─── Exécution ──────────────────────────────────────────────────────────────
+
+def test_output_setup_failure_fails_the_job(target, monkeypatch):
+    job_server = server.JobServer()
+    job = job_server.submit({"target_dir": target})
+
+    def refuse(*args, **kwargs):
+        raise PermissionError("sandbox en lecture seule")
+
+    monkeypatch.setattr(os, "makedirs", refuse)
+    job_server._run(job, agents=None)
+
+    assert job.status == "failed"
+    events = [event["event"] for event in job.stream()]
+    assert events == ["queued", "started", "failed"]
+    assert "PermissionError" in job.events[-1]["error"]
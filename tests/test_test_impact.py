@@ -0,0 +1,163 @@
+"""Sélection des tests impactés par une correction (src/utils/test_impact.py)."""
+
+from src.utils import test_impact
+from src.utils.test_impact import MODULE_LEVEL, changed_symbols, select_tests
+
+MODULE = '''
+import math
+
+RATE = 2
+
+def area(r):
+    return math.pi * r * r
+
+def perimeter(r):
+    return 2 * math.pi * r
+
+class Shape:
+    def scale(self, k):
+        return k * RATE
+'''
+
+TESTS = '''
+import unittest
+import pytest
+from geom import area, perimeter, Shape
+
+@pytest.fixture
+def shape():
+    return Shape()
+
+def _check_area(r):
+    assert area(r) > 0
+
+def test_area():
+    _check_area(1)
+
+def test_perimeter():
+    assert perimeter(1) > 0
+
+def test_scale(shape):
+    assert shape.scale(2) == 4
+
+class TestShape:
+    def test_scale_zero(self):
+        assert Shape().scale(0) == 0
+
+class CheckMath(unittest.TestCase):
+    def _round_area(self):
+        return round(area(1))
+
+    def test_b(self):
+        self.assertEqual(self._round_area(), 3)
+
+class MoreMath(CheckMath):
+    def test_c(self):
+        self.assertTrue(perimeter(2))
+
+class Helper:
+    def test_not_collected(self):
+        area(3)
+'''
+
+
+# ─── Diff AST ───────────────────────────────────────────────────────────────
+
+def test_identical_code_has_no_change():
+    assert changed_symbols(MODULE, MODULE) == set()
+
+
+def test_formatting_and_comments_are_ignored():
+    reformatted = MODULE.replace("return 2 * math.pi * r", "return 2*math.pi*r  # périmètre")
+    assert changed_symbols(MODULE, reformatted) == set()
+
+
+def test_function_body_change():
+    edited = MODULE.replace("math.pi * r * r", "math.pi * r ** 2")
+    assert changed_symbols(MODULE, edited) == {"area"}
+
+
+def test_method_change():
+    edited = MODULE.replace("k * RATE", "RATE * k")
+    assert changed_symbols(MODULE, edited) == {"Shape.scale"}
+
+
+def test_added_and_removed_functions():
+    edited = MODULE.replace("def perimeter(r):", "def circumference(r):")
+    assert changed_symbols(MODULE, edited) == {"perimeter", "circumference"}
+
+
+def test_module_level_change():
+    edited = MODULE.replace("RATE = 2", "RATE = 3")
+    assert changed_symbols(MODULE, edited) == {MODULE_LEVEL}
+
+
+def test_unparsable_version():
+    assert changed_symbols(MODULE, "def area(:") is None
+
+
+# ─── Références des tests ───────────────────────────────────────────────────
+
+def test_collected_node_ids():
+    assert set(test_impact.test_references(TESTS)) == {
+        "test_area", "test_perimeter", "test_scale",
+        "TestShape::test_scale_zero",
+        "CheckMath::test_b",
+        "MoreMath::test_c", "MoreMath::test_b",
+    }
+
+
+def test_helper_references_are_propagated():
+    assert "area" in test_impact.test_references(TESTS)["test_area"]
+
+
+def test_fixture_references_are_propagated():
+    assert "Shape" in test_impact.test_references(TESTS)["test_scale"]
+
+
+def test_testcase_subclass_is_collected_whatever_its_name():
+    references = test_impact.test_references(TESTS)
+    assert "area" in references["CheckMath::test_b"]
+    assert "Helper::test_not_collected" not in references
+
+
+def test_testcase_methods_are_inherited():
+    assert "area" in test_impact.test_references(TESTS)["MoreMath::test_b"]
+
+
+def test_direct_testcase_base():
+    code = "from unittest import TestCase\nclass Checks(TestCase):\n    def test_x(self):\n        f()\n"
+    assert test_impact.test_references(code) == {"Checks::test_x": {"self", "f"}}
+
+
+# ─── Sélection ──────────────────────────────────────────────────────────────
+
+def test_only_impacted_tests_are_selected():
+    selected = select_tests(TESTS, {"perimeter"})
+    assert sorted(selected) == ["MoreMath::test_c", "test_perimeter"]
+
+
+def test_selection_through_helpers_and_testcase():
+    selected = select_tests(TESTS, {"area"})
+    assert sorted(selected) == ["CheckMath::test_b", "MoreMath::test_b", "test_area"]
+
+
+def test_method_change_selects_by_class_and_method():
+    selected = select_tests(TESTS, {"Shape.scale"})
+    assert sorted(selected) == ["TestShape::test_scale_zero", "test_scale"]
+
+
+def test_unreferenced_change_selects_nothing():
+    assert select_tests(TESTS, {"volume"}) == []
+
+
+def test_module_level_change_runs_everything():
+    assert select_tests(TESTS, {MODULE_LEVEL, "area"}) is None
+
+
+def test_unknown_diff_runs_everything():
+    assert select_tests(TESTS, None) is None
+
+
+def test_unparsable_test_file_runs_everything():
+    assert select_tests("def test_x(:", {"area"}) is None
@@ -0,0 +1,44 @@
+"""Exécution de pytest par lots sous limites de ressources (src/utils/tools.py)."""
+
+import pytest
+
+from src.utils import tools
+
+TEST_FILE = '''
+def test_big(tmp_path):
+    (tmp_path / "out.bin").write_bytes(b"x" * (2 * 1024 * 1024))
+''' + "".join(f"\ndef test_ok_{i}():\n    assert True\n" for i in range(19))
+
+
+@pytest.fixture
+def test_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "LIMIT_FSIZE_MB", 1)
+    path = tmp_path / "test_many.py"
+    path.write_text(TEST_FILE, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_resource_error_survives_chunking(test_file, monkeypatch, workers):
+    monkeypatch.setattr(tools, "PYTEST_WORKERS", workers)
+    result = tools.run_pytest(test_file)
+    assert set(result) == {"passed", "output", "returncode", "resource_error", "usage", "capture"}
+    assert result["passed"] is False
+    assert result["resource_error"] == "file_size_limit"
+    assert ("Lot 1/2" in result["output"]) == (workers == 2)
+
+
+def test_merge_usage():
+    merged = tools._merge_usage([
+        {"wall_s": 1.0, "cpu_s": 0.5, "max_rss_mb": 30.0},
+        {"wall_s": 2.0, "cpu_s": 0.25, "max_rss_mb": 40.0},
+    ])
+    assert merged == {"wall_s": 2.0, "cpu_s": 0.75, "max_rss_mb": 40.0}
+
+
+def test_merge_capture():
+    merged = tools._merge_capture([
+        {"chars": 10, "lines": 2, "truncated": False, "spill_path": None},
+        {"chars": 5, "lines": 1, "truncated": True, "spill_path": "logs/spill/1.log"},
+    ])
+    assert merged == {"chars": 15, "lines": 3, "truncated": True, "spill_path": "logs/spill/1.log"}